@@ -0,0 +1,67 @@
+import asyncio
+from typing import ClassVar
+
+from upy import TableConfig, TableModel
+from tests.fake_driver import FakeConnection, rows
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    kind: str
+    amount: int
+
+
+def test_aggregate_expressions():
+    assert Table.id.count().sql == "count(table.id)"
+    assert Table.kind.count_distinct().sql == "count(DISTINCT table.kind)"
+    assert Table.amount.sum().sql == "sum(table.amount)"
+    assert Table.amount.min().sql == "min(table.amount)"
+    assert Table.amount.max().sql == "max(table.amount)"
+    assert Table.amount.avg().sql == "avg(table.amount)"
+
+
+def test_aggregate_comparison():
+    condition = Table.id.count() > 5
+    assert condition.sql == "count(table.id) > %s"
+    assert condition.params == [5]
+
+
+def test_group_by_having_select():
+    query = Table.objects.\
+        select(Table.kind, Table.amount.sum()).\
+        filter(Table.amount > 0).\
+        group_by(Table.kind).\
+        having(Table.id.count() > 1).\
+        build_select()
+    assert query.sql == (
+        "SELECT table.kind, sum(table.amount) FROM table WHERE table.amount > %s "
+        "GROUP BY table.kind HAVING count(table.id) > %s"
+    )
+    assert query.params == (0, 1)
+
+
+def test_aggregate_returns_dict():
+    connection = FakeConnection(rows({"total": 3, "amount": 30}))
+    result = asyncio.run(
+        Table.objects.filter(Table.kind == "a").aggregate(connection, total=Table.id.count(), amount=Table.amount.sum())
+    )
+    assert result == {"total": 3, "amount": 30}
+    assert connection.queries[0].sql == (
+        "SELECT count(table.id) AS total, sum(table.amount) AS amount FROM table WHERE table.kind = %s"
+    )
+
+
+def test_aggregate_grouped():
+    connection = FakeConnection(rows({"group_0": "a", "total": 2}, {"group_0": "b", "total": 1}))
+    result = asyncio.run(Table.objects.group_by(Table.kind).aggregate(connection, total=Table.id.count()))
+    assert result == {"a": {"total": 2}, "b": {"total": 1}}
+    assert connection.queries[0].sql == (
+        "SELECT table.kind AS group_0, count(table.id) AS total FROM table GROUP BY table.kind"
+    )
+
+
+def test_scalar():
+    connection = FakeConnection(rows({"value": 42}))
+    assert asyncio.run(Table.objects.scalar(connection, Table.amount.max())) == 42
+    assert connection.queries[0].sql == "SELECT max(table.amount) AS value FROM table"
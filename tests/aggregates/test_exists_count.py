@@ -0,0 +1,49 @@
+import asyncio
+import json
+from typing import ClassVar
+
+from upy import TableConfig, TableModel
+from tests.fake_driver import FakeConnection, rows
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    kind: str
+
+
+def test_build_exists():
+    query = Table.objects.filter(Table.kind == "a").build_exists()
+    assert query.sql == "SELECT EXISTS (SELECT 1 FROM table WHERE table.kind = %s) AS value"
+    assert query.params == ("a",)
+
+
+def test_build_count():
+    query = Table.objects.build_count(Table.kind == "a")
+    assert query.sql == "SELECT count(*) AS value FROM table WHERE table.kind = %s"
+
+
+def test_build_count_grouped():
+    query = Table.objects.group_by(Table.kind).build_count()
+    assert query.sql == "SELECT count(*) AS value FROM (SELECT 1 FROM table GROUP BY table.kind) AS counted"
+
+
+def test_build_approximate_count():
+    query = Table.objects.build_count(Table.kind == "a", approximate=True)
+    assert query.sql == "EXPLAIN (FORMAT JSON) SELECT 1 FROM table WHERE table.kind = %s"
+
+
+def test_exists():
+    assert asyncio.run(Table.objects.exists(FakeConnection(rows({"value": True}))))
+    assert not asyncio.run(Table.objects.exists(FakeConnection(rows({"value": False}))))
+
+
+def test_count():
+    assert asyncio.run(Table.objects.count(FakeConnection(rows({"value": 7})))) == 7
+
+
+def test_approximate_count():
+    plan = [{"Plan": {"Node Type": "Seq Scan", "Plan Rows": 1000}}]
+    assert asyncio.run(Table.objects.count(FakeConnection(rows({"QUERY PLAN": plan})), approximate=True)) == 1000
+    connection = FakeConnection(rows({"QUERY PLAN": json.dumps(plan)}))
+    assert asyncio.run(Table.objects.count(connection, approximate=True)) == 1000
@@ -0,0 +1,108 @@
+from itertools import repeat
+from typing import ClassVar
+
+from upy import BatchStatement, TableConfig, TableModel
+from upy.exceptions import InvalidBatchColumns, UndefinedPrimaryKey
+from upy.fields import TableField
+from upy.utils import columns_to_rows
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+
+
+class NoPkTable(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="no_pk")
+    id: int
+    name: str
+
+
+class ArrayColumn:
+    def __init__(self, values):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def tolist(self):
+        return list(self.values)
+
+
+def test_batch_insert():
+    query = Table.objects.build_batch({Table.id: [1, 2], Table.name: ("a", "b")})
+    assert query.sql == "INSERT INTO table (id, name) VALUES (%s, %s)"
+    assert query.params == ((1, "a"), (2, "b"))
+
+
+def test_batch_insert_from_array_like_columns():
+    query = Table.objects.build_batch({Table.id: ArrayColumn([1, 2]), Table.name: ArrayColumn(["a", "b"])})
+    assert query.params == ((1, "a"), (2, "b"))
+
+
+def test_batch_update_by_pk():
+    query = Table.objects.build_batch({Table.id: [1, 2], Table.name: ["a", "b"]}, BatchStatement.UPDATE)
+    assert query.sql == "UPDATE table SET table.name = %s WHERE table.id = %s"
+    assert query.params == (("a", 1), ("b", 2))
+
+
+def test_batch_fields_are_matched_by_alias(monkeypatch):
+    columns = {Table.id: [1, 2], Table.name: ["a", "b"]}
+    monkeypatch.setattr(TableField, "__hash__", lambda self: 0)
+    query = Table.objects.build_batch(columns, BatchStatement.UPDATE)
+    assert query.sql == "UPDATE table SET table.name = %s WHERE table.id = %s"
+    assert query.params == (("a", 1), ("b", 2))
+
+
+def test_batch_update_with_where():
+    query = Table.objects.\
+        filter((Table.name == "x") | (Table.name == "y")).\
+        build_batch({Table.id: [1, 2], Table.name: ["a", "b"]}, BatchStatement.UPDATE)
+    assert query.sql == "UPDATE table SET table.name = %s WHERE table.id = %s AND (table.name = %s OR table.name = %s)"
+    assert query.params == (("a", 1, "x", "y"), ("b", 2, "x", "y"))
+
+
+def test_batch_update_by_explicit_key():
+    query = NoPkTable.objects.build_batch(
+        {NoPkTable.name: ["a"], NoPkTable.id: [1]}, BatchStatement.UPDATE, key=[NoPkTable.name]
+    )
+    assert query.sql == "UPDATE no_pk SET no_pk.id = %s WHERE no_pk.name = %s"
+    assert query.params == ((1, "a"),)
+
+
+def test_batch_update_without_pk():
+    try:
+        NoPkTable.objects.build_batch({NoPkTable.id: [1], NoPkTable.name: ["a"]}, BatchStatement.UPDATE)
+    except Exception as exc:
+        assert isinstance(exc, UndefinedPrimaryKey)
+    else:
+        assert False
+
+
+def test_batch_delete():
+    query = Table.objects.build_batch({Table.id: [1, 2, 3]}, BatchStatement.DELETE)
+    assert query.sql == "DELETE FROM table WHERE table.id = %s"
+    assert query.params == ((1,), (2,), (3,))
+
+
+def test_batch_columns_with_different_length():
+    try:
+        Table.objects.build_batch({Table.id: [1, 2], Table.name: ["a"]})
+    except Exception as exc:
+        assert isinstance(exc, InvalidBatchColumns)
+    else:
+        assert False
+
+
+def test_batch_missing_key_column():
+    try:
+        Table.objects.build_batch({Table.name: ["a"]}, BatchStatement.UPDATE)
+    except Exception as exc:
+        assert isinstance(exc, InvalidBatchColumns)
+    else:
+        assert False
+
+
+def test_columns_to_rows_with_constants():
+    assert columns_to_rows([1, 2], repeat("x")) == ((1, "x"), (2, "x"))
@@ -0,0 +1,80 @@
+from typing import ClassVar
+
+from upy import TableConfig, TableModel
+from upy.exceptions import InvalidBatchColumns, UndefinedPrimaryKey
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+
+
+class NoPkTable(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="no_pk")
+    id: int
+    name: str
+
+
+def test_insert_rows():
+    queries = Table.objects.build_insert([{"id": 1, "name": "a"}, Table(id=2, name="b")])
+    assert len(queries) == 1
+    assert queries[0].sql == "INSERT INTO table (id, name) VALUES (%s, %s), (%s, %s)"
+    assert queries[0].params == (1, "a", 2, "b")
+
+
+def test_insert_rows_with_reordered_fields():
+    queries = Table.objects.build_insert([{"id": 1, "name": "a"}, {"name": "b", "id": 2}])
+    assert queries[0].sql == "INSERT INTO table (id, name) VALUES (%s, %s), (%s, %s)"
+    assert queries[0].params == (1, "a", 2, "b")
+
+
+def test_insert_chunked():
+    queries = Table.objects.build_insert([{"id": i, "name": str(i)} for i in range(5)], chunk_size=2)
+    assert [len(query.params) for query in queries] == [4, 4, 2]
+    assert queries[-1].sql == "INSERT INTO table (id, name) VALUES (%s, %s)"
+
+
+def test_insert_rows_with_different_fields():
+    try:
+        Table.objects.build_insert([{"id": 1, "name": "a"}, {"id": 2}])
+    except Exception as exc:
+        assert isinstance(exc, InvalidBatchColumns)
+    else:
+        assert False
+
+
+def test_upsert_default_conflict():
+    queries = Table.objects.build_upsert([{"id": 1, "name": "a"}])
+    assert queries[0].sql == (
+        "INSERT INTO table (id, name) VALUES (%s, %s) ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name"
+    )
+    assert queries[0].params == (1, "a")
+
+
+def test_upsert_do_nothing():
+    queries = Table.objects.build_upsert([{"id": 1, "name": "a"}], do_nothing=True)
+    assert queries[0].sql == "INSERT INTO table (id, name) VALUES (%s, %s) ON CONFLICT (id) DO NOTHING"
+
+
+def test_upsert_with_where():
+    queries = Table.objects.build_upsert(
+        [{"id": 1, "name": "a"}],
+        conflict=[Table.id],
+        update=[Table.name],
+        where=(Table.name != Table.name.excluded()) & (Table.id > 0),
+    )
+    assert queries[0].sql == (
+        "INSERT INTO table (id, name) VALUES (%s, %s) ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name "
+        "WHERE table.name <> EXCLUDED.name AND table.id > %s"
+    )
+    assert queries[0].params == (1, "a", 0)
+
+
+def test_upsert_without_pk():
+    try:
+        NoPkTable.objects.build_upsert([{"id": 1, "name": "a"}])
+    except Exception as exc:
+        assert isinstance(exc, UndefinedPrimaryKey)
+    else:
+        assert False
@@ -24,3 +24,20 @@ def test_conditions_compare_and():
 def test_conditions_compare_common():
     condition: ConditionGroup = ((Table.first == 1) | (Table.first == 2)) & ((Table.second == 3) | (Table.second == 4))
     assert condition.sql == "(table.first = %s OR table.first = %s) AND (table.second = %s OR table.second = %s)"
+
+
+def test_nested_operand_is_taken_before_change():
+    condition: ConditionGroup = ((Table.first == 1) | (Table.first == 2)) & (Table.second == 3)
+    nested, last = condition.operands
+    assert (nested.sql, nested.params) == ("table.first = %s OR table.first = %s", [1, 2])
+    assert (last.sql, last.params) == ("table.second = %s", [3])
+    assert condition.params == [1, 2, 3]
+
+
+def test_combining_keeps_original_group():
+    base: ConditionGroup = (Table.first == 1) & (Table.second == 2)
+    left = base & (Table.first == 3)
+    right = (Table.second == 4) | base
+    assert (base.sql, base.params, len(base.operands)) == ("table.first = %s AND table.second = %s", [1, 2], 2)
+    assert (left.sql, left.params) == ("table.first = %s AND table.second = %s AND table.first = %s", [1, 2, 3])
+    assert (right.sql, right.params) == ("table.second = %s OR table.first = %s AND table.second = %s", [4, 1, 2])
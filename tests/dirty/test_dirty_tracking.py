@@ -0,0 +1,113 @@
+import asyncio
+from typing import ClassVar
+
+import pytest
+
+from upy import Session, TableConfig, TableModel
+from upy.config import ShardMap
+from upy.exceptions import ImmutablePrimaryKey, UndefinedPrimaryKey
+from tests.fake_driver import FakeConnection, rows
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+    amount: int
+
+
+class Sharded(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(
+        tablename="sharded", pk="id", shard_key="tenant_id", shards=ShardMap(nodes=["a", "b"])
+    )
+    id: int
+    tenant_id: int
+    name: str
+
+
+class NoPk(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="no_pk")
+    id: int
+
+
+def load(**values):
+    connection = FakeConnection(rows({"id": 1, "name": "a", "amount": 1, **values}))
+    return asyncio.run(Table.objects.fetch(connection))[0]
+
+
+def test_hydrated_and_created_instances_are_clean():
+    assert not load().dirty_fields
+    assert not Table(id=1, name="a", amount=1).dirty_fields
+    assert Table.objects.build_update_for(load()) is None
+
+
+def test_update_contains_only_changed_fields():
+    instance = load()
+    instance.amount = 5
+    instance.amount = 6
+    assert instance.dirty_fields == {"amount"}
+
+    query = Table.objects.build_update_for(instance)
+    assert query.sql == "UPDATE table SET table.amount = %s WHERE table.id = %s"
+    assert query.params == (6, 1)
+
+
+def test_save_marks_instance_clean():
+    connection = FakeConnection()
+    instance = load()
+
+    assert not asyncio.run(instance.save(connection))
+    instance.name = "b"
+    assert asyncio.run(instance.save(connection))
+    assert not instance.dirty_fields
+    assert not asyncio.run(instance.save(connection))
+    assert len(connection.queries) == 1
+
+
+def test_sharded_update_targets_node():
+    instance = Sharded.model_construct(id=1, tenant_id=7, name="a")
+    instance.name = "b"
+    query = Sharded.objects.build_update_for(instance)
+    assert query.params == ("b", 1, 7)
+    assert query.nodes == {Sharded.config.shards.resolve(7)}
+
+
+def test_primary_key_changes_and_missing_pk():
+    instance = load()
+    instance.id = 2
+    with pytest.raises(ImmutablePrimaryKey):
+        Table.objects.build_update_for(instance)
+
+    with pytest.raises(UndefinedPrimaryKey):
+        Table.objects.__class__(NoPk).build_update_for(NoPk(id=1))
+
+
+def test_session_refresh_keeps_unsaved_changes():
+    connection = FakeConnection(rows({"id": 1, "name": "fresh", "amount": 2}))
+
+    async def main():
+        with Session():
+            instance = (await Table.objects.fetch(connection))[0]
+            instance.name = "changed"
+            await Table.objects.fetch(connection)
+            return instance
+
+    instance = asyncio.run(main())
+    assert (instance.name, instance.amount) == ("changed", 2)
+    assert instance.dirty_fields == {"name"}
+
+
+def test_fields_assigned_while_saving_stay_dirty():
+    instance = load()
+    instance.name = "b"
+    instance.amount = 2
+
+    class Connection(FakeConnection):
+        async def execute(self, query):
+            instance.name = "c"
+            await super().execute(query)
+
+    connection = Connection(rows())
+    assert asyncio.run(instance.save(connection))
+    assert connection.queries[0].params == ("b", 2, 1)
+    assert instance.dirty_fields == {"name"}
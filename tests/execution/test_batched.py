@@ -0,0 +1,102 @@
+import asyncio
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import ClassVar
+from uuid import uuid4
+
+import pytest
+
+from upy import TableConfig, TableModel
+from upy.exceptions import UndefinedPrimaryKey
+from upy.execution import BatchedRunner, FileCheckpointStore, MemoryCheckpointStore
+from tests.fake_driver import FakeConnection
+
+
+class Event(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="event", pk="id")
+    id: int
+    created: int
+
+
+class NoPk(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="no_pk")
+    id: int
+
+
+def make_table(count, fail_after=None):
+    table = {key: key % 2 for key in range(1, count + 1)}
+    calls = []
+
+    def handler(query):
+        if fail_after is not None and len(calls) == fail_after:
+            raise RuntimeError("interrupted")
+        *filters, size = query.params[-3:] if "id >" in query.sql else query.params[-2:]
+        after = filters[-1] if "id >" in query.sql else 0
+        keys = sorted(key for key, created in table.items() if created == 0 and key > after)[:size]
+        calls.append((after, size))
+        for key in keys:
+            del table[key]
+        return [{"id": key} for key in keys]
+
+    return table, calls, FakeConnection(handler)
+
+
+def test_delete_walks_rows_by_batches():
+    table, calls, connection = make_table(10)
+    runner = BatchedRunner(connection, batch_size=2, target_latency=None)
+    deleted = asyncio.run(runner.delete("purge", Event, Event.created == 0))
+    assert deleted == 5
+    assert all(created for created in table.values())
+    assert calls == [(0, 2), (4, 2), (8, 2), (10, 2)]
+    assert "ORDER BY event.id LIMIT %s) RETURNING event.id" in connection.queries[0].sql
+
+
+def test_batch_size_adapts_to_target_latency():
+    _, calls, connection = make_table(100)
+    runner = BatchedRunner(connection, batch_size=2, target_latency=10.0, max_batch_size=5)
+    asyncio.run(runner.delete("purge", Event, Event.created == 0))
+    assert [size for _, size in calls][:3] == [2, 4, 5]
+
+
+def test_interrupted_job_resumes_from_checkpoint(tmp_path):
+    store = FileCheckpointStore(tmp_path / "checkpoints.json")
+    table, _, connection = make_table(10, fail_after=2)
+    runner = BatchedRunner(connection, batch_size=2, target_latency=None, checkpoints=store)
+    with pytest.raises(RuntimeError):
+        asyncio.run(runner.delete("purge", Event, Event.created == 0))
+    assert store.load("purge") == 8
+
+    _, calls, resumed = make_table(10)
+    runner = BatchedRunner(resumed, batch_size=2, target_latency=None, checkpoints=store)
+    asyncio.run(runner.delete("purge", Event, Event.created == 0))
+    assert calls[0] == (8, 2)
+    assert store.load("purge") is None
+
+
+@pytest.mark.parametrize(
+    "key",
+    [7, "a", uuid4(), datetime(2024, 1, 2, 3, 4, tzinfo=timezone.utc), date(2024, 1, 2), Decimal("1.50")],
+)
+def test_file_checkpoint_keeps_key_type(tmp_path, key):
+    FileCheckpointStore(tmp_path / "checkpoints.json").save("job", key)
+    loaded = FileCheckpointStore(tmp_path / "checkpoints.json").load("job")
+    assert loaded == key
+    assert type(loaded) is type(key)
+
+
+def test_file_checkpoint_rejects_unsupported_key(tmp_path):
+    with pytest.raises(TypeError):
+        FileCheckpointStore(tmp_path / "checkpoints.json").save("job", (1, 2))
+
+
+def test_update_uses_same_batches():
+    _, _, connection = make_table(4)
+    runner = BatchedRunner(connection, batch_size=10, checkpoints=MemoryCheckpointStore())
+    assert asyncio.run(runner.update("touch", Event, Event.created == 0, values={"created": 1})) == 2
+    assert connection.queries[0].sql.startswith("UPDATE event SET event.created = %s WHERE event.id IN (SELECT")
+    assert connection.queries[0].params == (1, 0, 10)
+
+
+def test_table_without_pk():
+    with pytest.raises(UndefinedPrimaryKey):
+        asyncio.run(BatchedRunner(FakeConnection()).delete("purge", NoPk))
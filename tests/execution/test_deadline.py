@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+from upy.exceptions import DeadlineExceeded
+from upy.execution import DeadlineConnection, DeadlinePool, deadline, fingerprint
+from upy.utils import Query
+from tests.fake_driver import FakeConnection, FakePool
+
+QUERY = Query("SELECT * FROM table WHERE id IN (%s, %s)", (1, 2), readonly=True)
+
+
+class StatementTimeout(Exception):
+    sqlstate = "57014"
+
+
+def settings(connection):
+    return [query.sql for query in connection.queries if "statement_timeout" in query.sql]
+
+
+def test_without_deadline_no_timeout_is_set():
+    connection = FakeConnection()
+    asyncio.run(DeadlineConnection(connection).fetch(QUERY))
+    assert connection.queries == [QUERY]
+
+
+def test_deadline_becomes_statement_timeout():
+    connection = FakeConnection()
+    wrapped = DeadlineConnection(connection, timeout=5.0)
+
+    async def main():
+        await wrapped.fetch(QUERY)
+        with deadline(0.2):
+            await wrapped.fetch(QUERY)
+            await wrapped.fetch(QUERY)
+
+    asyncio.run(main())
+    assert len(settings(connection)) == 2
+    assert settings(connection)[0] == "SET statement_timeout = 5000"
+    assert int(settings(connection)[1].rsplit(" ", 1)[1]) <= 200
+
+
+def test_nested_deadline_only_shortens():
+    connection = FakeConnection()
+
+    async def main():
+        with deadline(0.1):
+            with deadline(10.0):
+                await DeadlineConnection(connection).fetch(QUERY)
+
+    asyncio.run(main())
+    assert int(settings(connection)[0].rsplit(" ", 1)[1]) <= 100
+
+
+def test_expired_deadline_does_not_send_query():
+    connection = FakeConnection()
+    wrapped = DeadlineConnection(connection)
+
+    async def main():
+        with deadline(0.0):
+            await wrapped.fetch(QUERY)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    assert not connection.queries
+    assert wrapped.stats.timeouts[fingerprint("SELECT * FROM table WHERE id = ANY(%s)")] == 1
+
+
+def test_server_timeout_is_reported():
+    def handler(query):
+        if query is QUERY:
+            raise StatementTimeout()
+        return []
+
+    wrapped = DeadlineConnection(FakeConnection(handler), timeout=1.0)
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(wrapped.fetch(QUERY))
+    assert sum(wrapped.stats.timeouts.values()) == 1
+
+
+def test_client_timeout_cancels_server_query():
+    connection = FakeConnection(latency=1.0, supports_cancel=True)
+    wrapped = DeadlineConnection(connection, timeout=0.01, grace=0.0)
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(wrapped.fetch(QUERY))
+    assert connection.cancelled == 1
+    assert not wrapped.clean
+
+
+def test_task_cancellation_cancels_server_query():
+    connection = FakeConnection(latency=1.0, supports_cancel=True)
+    wrapped = DeadlineConnection(connection)
+
+    async def main():
+        task = asyncio.create_task(wrapped.fetch(QUERY))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert connection.cancelled == 1
+    assert sum(wrapped.stats.cancellations.values()) == 1
+
+
+def test_pool_keeps_statement_timeout_between_acquisitions():
+    connection = FakeConnection()
+    pool = DeadlinePool(FakePool([connection]), timeout=1.0, reset_on_release=False)
+
+    async def main():
+        for _ in range(3):
+            await pool.fetch(QUERY)
+
+    asyncio.run(main())
+    assert [query.sql for query in connection.queries] == ["SET statement_timeout = 1000", *[QUERY.sql] * 3]
+
+
+def test_changed_statement_timeout_is_pipelined_with_query():
+    connection = FakeConnection(supports_pipeline=True)
+    wrapped = DeadlineConnection(connection, timeout=1.0)
+
+    async def main():
+        await wrapped.fetch(QUERY)
+        await wrapped.execute(QUERY)
+
+    asyncio.run(main())
+    assert [query.sql for query in connection.queries] == ["SET statement_timeout = 1000", QUERY.sql, QUERY.sql]
+    assert connection.round_trips == 2
+
+
+def test_prepared_statement_timeouts_are_counted_by_sql():
+    connection = FakeConnection(supports_prepare=True)
+    wrapped = DeadlineConnection(connection)
+
+    async def main():
+        await wrapped.prepare("upy_statement", QUERY.sql)
+        with deadline(0.0):
+            await wrapped.fetch_prepared("upy_statement", (1, 2))
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    assert wrapped.stats.timeouts[fingerprint("SELECT * FROM table WHERE id = ANY(%s)")] == 1
+
+
+def test_pool_returns_clean_connections():
+    connection = FakeConnection()
+    pool = DeadlinePool(FakePool([connection]))
+
+    async def main():
+        with deadline(1.0):
+            await pool.fetch(QUERY)
+        await pool.fetch(QUERY)
+
+    asyncio.run(main())
+    assert [query.sql for query in connection.queries][1:] == [QUERY.sql, "RESET statement_timeout", QUERY.sql]
+
+
+def test_statement_timeout_is_unknown_after_error_or_rollback():
+    def handler(query):
+        if query.sql == "SELECT error":
+            raise RuntimeError("failed")
+        return []
+
+    connection = FakeConnection(handler)
+    wrapped = DeadlineConnection(connection, timeout=1.0)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await wrapped.fetch(Query("SELECT error"))
+        await wrapped.fetch(QUERY)
+        await wrapped.execute(Query("ROLLBACK"))
+        await wrapped.fetch(QUERY)
+
+    asyncio.run(main())
+    assert settings(connection) == ["SET statement_timeout = 1000"] * 3
@@ -0,0 +1,102 @@
+import asyncio
+from typing import ClassVar
+
+import pytest
+
+from upy import TableConfig, TableModel
+from upy.exceptions import UndefinedPrimaryKey
+from upy.execution import Loader
+from tests.fake_driver import FakeConnection
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+
+
+class NoPk(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="no_pk")
+    id: int
+
+
+def make_connection(existing):
+    def handler(query):
+        return [{"id": key, "name": f"name{key}"} for key in query.params if key in existing]
+
+    return FakeConnection(handler)
+
+
+def test_concurrent_loads_are_coalesced():
+    connection = make_connection({1, 2, 3})
+    loader = Loader(Table, connection)
+
+    async def main():
+        return await asyncio.gather(loader.load(1), loader.load(2), loader.load(4), loader.load(1))
+
+    first, second, missing, same = asyncio.run(main())
+    assert (first.name, second.name, missing) == ("name1", "name2", None)
+    assert same is first
+    assert len(connection.queries) == 1
+    assert connection.queries[0].params == (1, 2, 4)
+    assert "IN (%s, %s, %s)" in connection.queries[0].sql
+
+
+def test_sequential_ticks_are_separate_batches():
+    connection = make_connection({1, 2})
+    loader = Loader(Table, connection)
+
+    async def main():
+        await loader.load(1)
+        await loader.load(2)
+
+    asyncio.run(main())
+    assert len(connection.queries) == 2
+
+
+def test_window_and_max_batch():
+    connection = make_connection(set(range(10)))
+    loader = Loader(Table, connection, window=0.01, max_batch=4)
+
+    async def main():
+        first = asyncio.create_task(loader.load_many(range(3)))
+        await asyncio.sleep(0)
+        second = await loader.load_many(range(3, 10))
+        return await first + second
+
+    result = asyncio.run(main())
+    assert [item.id for item in result] == list(range(10))
+    assert [len(query.params) for query in connection.queries] == [4, 4, 2]
+
+
+def test_cache():
+    connection = make_connection({1})
+    loader = Loader(Table, connection, cache=True)
+
+    async def main():
+        await loader.load(1)
+        await loader.load(1)
+        await loader.load(2)
+        await loader.load(2)
+        loader.clear(1)
+        await loader.load(1)
+
+    asyncio.run(main())
+    assert len(connection.queries) == 3
+
+
+def test_errors_are_propagated_to_all_callers():
+    def handler(query):
+        raise RuntimeError("connection lost")
+
+    loader = Loader(Table, FakeConnection(handler))
+
+    async def main():
+        return await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(main()))
+
+
+def test_table_without_pk():
+    with pytest.raises(UndefinedPrimaryKey):
+        Loader(NoPk, FakeConnection())
@@ -0,0 +1,185 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import ClassVar
+from uuid import UUID
+
+from upy import TableConfig, TableModel
+from upy.config import Index
+from upy.execution import SqliteMirror
+from tests.fake_driver import FakeConnection
+
+
+class Country(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="country", pk="id", indexes=[Index(columns=["code"])])
+    id: int
+    code: str
+    active: bool
+
+
+class Account(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="account", pk="id")
+    id: int
+    country_id: int
+
+
+COUNTRIES = [
+    {"id": 1, "code": "NL", "active": True},
+    {"id": 2, "code": "DE", "active": True},
+    {"id": 3, "code": "NO", "active": False},
+]
+
+
+def primary(countries=COUNTRIES):
+    return FakeConnection(lambda query: [dict(row) for row in countries] if "FROM country" in query.sql else [])
+
+
+def test_reads_are_served_from_mirror():
+    connection = primary()
+    mirror = SqliteMirror(connection, [Country])
+
+    async def main():
+        first = await Country.objects.fetch(mirror, Country.code == "NL")
+        active = await Country.objects.filter(Country.active == True).order_by(Country.code).fetch(mirror)  # noqa
+        prefixed = await Country.objects.fetch(mirror, Country.code % "N%")
+        count = await Country.objects.count(mirror, Country.id > 1)
+        exists = await Country.objects.exists(mirror, Country.id == 5)
+        return first, active, prefixed, count, exists
+
+    first, active, prefixed, count, exists = asyncio.run(main())
+    assert len(connection.queries) == 1
+    assert connection.queries[0].sql == "SELECT country.id, country.code, country.active FROM country"
+    assert first == [Country(id=1, code="NL", active=True)]
+    assert [country.code for country in active] == ["DE", "NL"]
+    assert {country.code for country in prefixed} == {"NL", "NO"}
+    assert count == 2
+    assert exists is False
+
+
+def test_not_mirrored_tables_and_writes_go_to_primary():
+    connection = primary()
+    mirror = SqliteMirror(connection, [Country])
+
+    async def main():
+        await Country.objects.fetch(mirror)
+        await Account.objects.fetch(mirror)
+        await Account.objects.join(Country, Account.country_id == Country.id).fetch(mirror)
+        await Country.objects.filter(Country.id == 1).update(mirror, code="NE")
+        await Country.objects.fetch(mirror)
+
+    asyncio.run(main())
+    sql = [query.sql.split(" WHERE")[0] for query in connection.queries]
+    assert sql[0] == sql[4] == "SELECT country.id, country.code, country.active FROM country"
+    assert sql[1].endswith("FROM account")
+    assert "JOIN country" in sql[2]
+    assert sql[3] == "UPDATE country SET country.code = %s"
+    assert len(sql) == 5
+
+
+def test_refresh_interval_and_invalidation():
+    countries = [dict(COUNTRIES[0])]
+    connection = primary(countries)
+    mirror = SqliteMirror(connection, [Country], refresh_interval=None)
+
+    async def main():
+        await Country.objects.fetch(mirror)
+        countries.append(dict(COUNTRIES[1]))
+        cached = await Country.objects.fetch(mirror)
+        mirror.invalidate(Country)
+        refreshed = await Country.objects.fetch(mirror)
+        mirror.refresh_interval = 0.0
+        await Country.objects.fetch(mirror)
+        return cached, refreshed
+
+    cached, refreshed = asyncio.run(main())
+    assert len(cached) == 1
+    assert len(refreshed) == 2
+    assert len(connection.queries) == 3
+
+
+def test_concurrent_readers_share_single_load():
+    connection = FakeConnection(lambda query: [dict(row) for row in COUNTRIES], latency=0.01)
+    mirror = SqliteMirror(connection, [Country])
+
+    async def main():
+        return await asyncio.gather(*(Country.objects.fetch(mirror, Country.id == 2) for _ in range(20)))
+
+    results = asyncio.run(main())
+    assert len(connection.queries) == 1
+    assert all(result == [Country(id=2, code="DE", active=True)] for result in results)
+
+
+def test_unsupported_syntax_falls_back_to_primary():
+    connection = primary()
+    mirror = SqliteMirror(connection, [Country])
+
+    async def main():
+        await Country.objects.fetch(mirror)
+        return await Country.objects.fetch(mirror, Country.code.ilike("nl"))
+
+    rows = asyncio.run(main())
+    assert len(connection.queries) == 2
+    assert "ILIKE" in connection.queries[1].sql
+    assert len(rows) == 3
+
+
+class Price(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="price", pk="id")
+    id: int
+    active: bool
+    amount: Decimal
+    discount: Decimal | None
+    created: datetime
+    key: UUID
+    tags: list
+
+
+PRICES = [
+    {
+        "id": 1,
+        "active": True,
+        "amount": Decimal("1.25"),
+        "discount": None,
+        "created": datetime(2024, 1, 1, 12, tzinfo=timezone(timedelta(hours=3))),
+        "key": UUID(int=1),
+        "tags": ["a"],
+    },
+    {
+        "id": 2,
+        "active": False,
+        "amount": Decimal("2.50"),
+        "discount": Decimal("0.10"),
+        "created": datetime(2024, 1, 1, 10, tzinfo=timezone.utc),
+        "key": UUID(int=2),
+        "tags": [],
+    },
+]
+
+
+def test_mirror_results_match_primary():
+    def handler(query):
+        if "sum(" in query.sql:
+            return [{"value": Decimal("3.75")}]
+        return [dict(row) for row in PRICES]
+
+    connection = FakeConnection(handler)
+    mirror = SqliteMirror(connection, [Price])
+
+    async def main():
+        expected = await Price.objects.order_by(Price.id).fetch(connection)
+        mirrored = await Price.objects.order_by(Price.id).fetch(mirror)
+        ascending = await Price.objects.order_by(Price.discount).fetch(mirror)
+        descending = await Price.objects.order_by(Price.discount.desc()).fetch(mirror)
+        created = await Price.objects.order_by(Price.created).fetch(mirror)
+        total = await Price.objects.scalar(mirror, Price.amount.sum())
+        count = await Price.objects.count(mirror, Price.active == True)  # noqa: E712
+        return expected, mirrored, ascending, descending, created, total, count
+
+    expected, mirrored, ascending, descending, created, total, count = asyncio.run(main())
+    typed = [[(type(value), value) for value in dict(item).values()] for item in mirrored]
+    assert typed == [[(type(value), value) for value in dict(item).values()] for item in expected]
+    assert [item.id for item in ascending] == [2, 1]
+    assert [item.id for item in descending] == [1, 2]
+    assert [item.id for item in created] == [1, 2]
+    assert (total, count) == (Decimal("3.75"), 1)
+    assert ["sum(" in query.sql for query in connection.queries] == [False, False, True]
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from upy.execution import pipeline
+from upy.utils import Query
+from tests.fake_driver import FakeConnection, FakePool
+
+
+def handler(query: Query):
+    if query.sql == "fail":
+        raise ValueError("broken query")
+    return [{"sql": query.sql}]
+
+
+def test_pipeline_mode_single_round_trip():
+    connection = FakeConnection(handler, latency=0.01, supports_pipeline=True)
+
+    async def main():
+        async with pipeline(connection) as p:
+            futures = [p.add(Query(f"SELECT {i}")) for i in range(10)]
+        return [future.result() for future in futures]
+
+    results = asyncio.run(main())
+    assert connection.round_trips == 1
+    assert results[3] == [{"sql": "SELECT 3"}]
+
+
+def test_pipeline_error_isolation():
+    connection = FakeConnection(handler, supports_pipeline=True)
+
+    async def main():
+        async with pipeline(connection) as p:
+            ok = p.add(Query("SELECT 1"))
+            failed = p.add(Query("fail"))
+        return ok, failed
+
+    ok, failed = asyncio.run(main())
+    assert ok.result() == [{"sql": "SELECT 1"}]
+    assert isinstance(failed.exception(), ValueError)
+
+
+def test_pipeline_fallback_to_concurrent_pool():
+    pool = FakePool([FakeConnection(handler, latency=0.05) for _ in range(5)])
+
+    async def main():
+        async with pipeline(pool) as p:
+            futures = [p.add(Query(f"SELECT {i}")) for i in range(5)]
+            failed = p.add(Query("fail"))
+        return futures, failed
+
+    started = time.perf_counter()
+    futures, failed = asyncio.run(main())
+    assert time.perf_counter() - started < 0.2
+    assert [future.result()[0]["sql"] for future in futures] == [f"SELECT {i}" for i in range(5)]
+    assert isinstance(failed.exception(), ValueError)
+    assert pool.acquired == 6
+
+
+def test_pipeline_on_pool_with_pipeline_support():
+    pool = FakePool([FakeConnection(handler, supports_pipeline=True) for _ in range(2)])
+
+    async def main():
+        async with pipeline(pool) as p:
+            futures = [p.add(Query(f"SELECT {i}")) for i in range(4)]
+        return futures
+
+    futures = asyncio.run(main())
+    assert pool.acquired == 1
+    assert all(future.done() for future in futures)
+
+
+def test_pipeline_cancelled_on_error():
+    connection = FakeConnection(handler, supports_pipeline=True)
+
+    async def main():
+        futures = []
+        try:
+            async with pipeline(connection) as p:
+                futures.append(p.add(Query("SELECT 1")))
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+        return futures
+
+    futures = asyncio.run(main())
+    assert futures[0].cancelled()
+    assert connection.queries == []
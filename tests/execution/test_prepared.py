@@ -0,0 +1,115 @@
+import asyncio
+from typing import ClassVar
+
+from upy import TableConfig, TableModel
+from upy.execution import PreparedConnection, PreparedPool, normalize
+from upy.execution.prepared import statement_name
+from upy.utils import Query, ShardedQuery
+from tests.fake_driver import FakeConnection, FakePool
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+
+
+def test_normalize_in_lists():
+    query = normalize(Query("table.id IN (%s, %s) AND table.name = %s AND table.id NOT IN (%s)", [1, 2, "a", 3]))
+    assert query.sql == "table.id = ANY(%s) AND table.name = %s AND table.id <> ALL(%s)"
+    assert query.params == ([1, 2], "a", [3])
+
+
+def test_normalize_keeps_routing_information():
+    query = ShardedQuery(
+        "SELECT table.id FROM table WHERE table.id IN (%s, %s) ORDER BY table.id LIMIT %s",
+        [1, 2, 5],
+        readonly=True,
+        nodes=["a", "b"],
+        ordering=[("id", True)],
+        limit=5,
+        offset=2,
+        hidden=["id"],
+    )
+    normalized = normalize(query)
+    assert type(normalized) is ShardedQuery
+    assert normalized.sql == "SELECT table.id FROM table WHERE table.id = ANY(%s) ORDER BY table.id LIMIT %s"
+    assert normalized.params == ([1, 2], 5)
+    assert normalized.readonly
+    assert (normalized.nodes, normalized.ordering, normalized.limit, normalized.offset, normalized.hidden) == (
+        frozenset({"a", "b"}),
+        (("id", True),),
+        5,
+        2,
+        ("id",),
+    )
+
+
+def test_statement_name_is_stable_for_in_lists():
+    first = normalize(Table.objects.build_delete(Table.id == [1, 2]))
+    second = normalize(Table.objects.build_delete(Table.id == [1, 2, 3, 4]))
+    assert statement_name(first.sql) == statement_name(second.sql)
+
+
+def test_prepared_cache_hits():
+    connection = FakeConnection(supports_prepare=True)
+    prepared = PreparedConnection(connection)
+
+    async def main():
+        for ids in ([1], [1, 2], [1, 2, 3]):
+            await prepared.execute(Table.objects.build_delete(Table.id == ids))
+
+    asyncio.run(main())
+    assert list(connection.prepared) == [statement_name(Table.objects.build_delete(Table.id == [1]).sql)]
+    assert prepared.stats.hits == 2
+    assert prepared.stats.misses == 1
+    assert connection.queries[-1].params == ([1, 2, 3],)
+
+
+def test_prepared_cache_eviction_deallocates():
+    connection = FakeConnection(supports_prepare=True)
+    prepared = PreparedConnection(connection, capacity=2)
+
+    async def main():
+        for sql in ("SELECT 1", "SELECT 2", "SELECT 1", "SELECT 3"):
+            await prepared.fetch(Query(sql))
+
+    asyncio.run(main())
+    assert connection.deallocated == [statement_name("SELECT 2")]
+    assert prepared.statements == [statement_name("SELECT 1"), statement_name("SELECT 3")]
+    assert prepared.stats.evictions == 1
+
+
+def test_prepared_cache_disabled():
+    connection = FakeConnection(supports_prepare=True)
+    prepared = PreparedConnection(connection, enabled=False)
+    asyncio.run(prepared.fetch(Query("table.id IN (%s, %s)", [1, 2])))
+    assert connection.prepared == {}
+    assert connection.queries[0].sql == "table.id IN (%s, %s)"
+
+
+def test_prepared_cache_disabled_executes_by_connection():
+    class ExecutingConnection(FakeConnection):
+        def __init__(self):
+            super().__init__(supports_prepare=True)
+            self.executed = []
+
+        async def execute(self, query):
+            self.executed.append(query)
+
+    connection = ExecutingConnection()
+    asyncio.run(PreparedConnection(connection, enabled=False).execute(Query("DELETE FROM table")))
+    assert connection.executed == [Query("DELETE FROM table")]
+    assert connection.queries == []
+
+
+def test_prepared_pool_keeps_cache_per_connection():
+    pool = PreparedPool(FakePool([FakeConnection(supports_prepare=True)]))
+
+    async def main():
+        for _ in range(3):
+            await pool.fetch(Query("SELECT 1"))
+
+    asyncio.run(main())
+    assert pool.stats.hits == 2
+    assert pool.stats.hit_rate == 2 / 3
@@ -0,0 +1,79 @@
+import asyncio
+import math
+from typing import ClassVar
+
+from upy import TableConfig, TableModel
+from upy.execution import ReplicaRouter
+from tests.fake_driver import FakeConnection, FakePool, rows
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+
+
+def make_router(lags, **kwargs):
+    primary = FakePool([FakeConnection(rows({"id": 1, "name": "primary"}))])
+    replicas = [FakePool([FakeConnection(rows({"id": 1, "name": f"replica{i}"}))]) for i in range(len(lags))]
+
+    async def probe(replica):
+        return lags[replicas.index(replica)]
+
+    return ReplicaRouter(primary, replicas, lag_probe=probe, **kwargs), primary, replicas
+
+
+def test_select_is_readonly():
+    assert Table.objects.build_select().readonly
+    assert not Table.objects.build_update(name="x").readonly
+    assert not Table.objects.build_delete().readonly
+
+
+def test_reads_go_to_replicas_and_writes_to_primary():
+    router, primary, replicas = make_router([0.0, 0.0])
+
+    async def main():
+        first = await Table.objects.fetch(router)
+        second = await Table.objects.fetch(router)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert {first[0].name, second[0].name} == {"replica0", "replica1"}
+
+    asyncio.run(Table.objects.filter(Table.id == 1).update(router, name="x"))
+    assert len(primary.queries) == 1
+
+
+def test_lagging_replica_falls_back_to_primary():
+    router, _, _ = make_router([10.0, math.inf], max_lag=1.0)
+    result = asyncio.run(Table.objects.fetch(router))
+    assert result[0].name == "primary"
+
+
+def test_read_your_writes_in_context():
+    router, _, _ = make_router([0.5], max_lag=1.0, lag_interval=0.0)
+
+    async def main():
+        before = await Table.objects.fetch(router)
+        await Table.objects.filter(Table.id == 1).update(router, name="x")
+        after = await Table.objects.fetch(router)
+        other_task = await asyncio.create_task(other())
+        return before, after, other_task
+
+    async def other():
+        return await Table.objects.fetch(router)
+
+    before, after, other_task = asyncio.run(main())
+    assert before[0].name == "replica0"
+    assert after[0].name == "primary"
+    assert other_task[0].name == "primary"
+
+
+def test_use_primary():
+    router, _, _ = make_router([0.0])
+
+    async def main():
+        with router.use_primary():
+            return await Table.objects.fetch(router)
+
+    assert asyncio.run(main())[0].name == "primary"
@@ -0,0 +1,158 @@
+import asyncio
+from typing import ClassVar
+
+import pytest
+
+from upy import TableConfig, TableModel
+from upy.execution import SingleFlight, query_fingerprint
+from upy.execution.templates import Template
+from tests.fake_driver import FakeConnection
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+
+
+def handler(query):
+    return [{"id": param, "name": "a"} for param in query.params if isinstance(param, int)]
+
+
+def test_identical_reads_share_one_query():
+    connection = FakeConnection(handler, latency=0.01)
+    executor = SingleFlight(connection)
+    query = Table.objects.filter(Table.id == 1).build_select()
+
+    async def main():
+        return await asyncio.gather(*(Table.objects.fetch(executor, Table.id == 1) for _ in range(50)))
+
+    results = asyncio.run(main())
+    assert len(connection.queries) == 1
+    assert all(result == [Table(id=1, name="a")] for result in results)
+    assert len({id(result[0]) for result in results}) == 50
+
+    fingerprint = query_fingerprint(query)
+    assert executor.stats.executed[fingerprint] == 1
+    assert executor.stats.shared[fingerprint] == 49
+    assert executor.stats.peak[fingerprint] == 50
+    assert executor.in_flight == {}
+
+
+def test_different_params_are_not_shared():
+    connection = FakeConnection(handler, latency=0.01)
+    executor = SingleFlight(connection)
+
+    async def main():
+        return await asyncio.gather(
+            Table.objects.fetch(executor, Table.id == [1, 2], Table.name == "3"),
+            Table.objects.fetch(executor, Table.id == [1], Table.name == [2, 3]),
+            Table.objects.fetch(executor, Table.id == 4),
+            Table.objects.fetch(executor, Table.id == 4),
+        )
+
+    asyncio.run(main())
+    assert len(connection.queries) == 3
+
+
+def test_writes_are_never_shared():
+    connection = FakeConnection(handler, latency=0.01)
+    executor = SingleFlight(connection)
+
+    async def main():
+        await asyncio.gather(*(Table.objects.filter(Table.id == 1).update(executor, name="b") for _ in range(3)))
+        await asyncio.gather(*(Table.objects.delete(executor, Table.id == 1) for _ in range(3)))
+
+    asyncio.run(main())
+    assert len(connection.queries) == 6
+    assert not executor.stats.executed
+
+
+def test_finished_query_is_sent_again():
+    connection = FakeConnection(handler)
+    executor = SingleFlight(connection)
+
+    async def main():
+        await Table.objects.fetch(executor, Table.id == 1)
+        await Table.objects.fetch(executor, Table.id == 1)
+
+    asyncio.run(main())
+    assert len(connection.queries) == 2
+
+
+def test_errors_are_shared():
+    calls = []
+
+    def failing(query):
+        calls.append(query)
+        raise RuntimeError("failed")
+
+    executor = SingleFlight(FakeConnection(failing, latency=0.01))
+
+    async def main():
+        return await asyncio.gather(
+            *(Table.objects.fetch(executor, Table.id == 1) for _ in range(5)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_query_is_cancelled_with_last_caller():
+    connection = FakeConnection(handler, latency=0.05)
+    executor = SingleFlight(connection)
+
+    async def main():
+        first = asyncio.create_task(Table.objects.fetch(executor, Table.id == 1))
+        second = asyncio.create_task(Table.objects.fetch(executor, Table.id == 1))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        rows = await second
+
+        third = asyncio.create_task(Table.objects.fetch(executor, Table.id == 2))
+        await asyncio.sleep(0.01)
+        third.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await third
+        await asyncio.sleep(0)
+        return rows
+
+    rows = asyncio.run(main())
+    assert rows == [Table(id=1, name="a")]
+    assert executor.in_flight == {}
+
+
+def test_new_caller_does_not_join_cancelled_query():
+    connection = FakeConnection(handler, latency=0.05)
+    executor = SingleFlight(connection)
+
+    async def main():
+        first = asyncio.create_task(Table.objects.fetch(executor, Table.id == 1))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await Table.objects.fetch(executor, Table.id == 1)
+
+    rows = asyncio.run(main())
+    assert rows == [Table(id=1, name="a")]
+    assert len(connection.queries) == 2
+    assert executor.in_flight == {}
+
+
+def test_queries_are_keyed_by_sql(monkeypatch):
+    connection = FakeConnection(handler, latency=0.01)
+    executor = SingleFlight(connection)
+    monkeypatch.setattr(Template, "fingerprint", property(lambda self: "collision"))
+
+    async def main():
+        return await asyncio.gather(
+            Table.objects.fetch(executor, Table.id == 1),
+            Table.objects.order_by(Table.id).fetch(executor, Table.id == 1),
+        )
+
+    first, second = asyncio.run(main())
+    assert first == second == [Table(id=1, name="a")]
+    assert len(connection.queries) == 2
+    assert executor.stats.executed == {"collision": 2}
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from typing import ClassVar
+
+import pytest
+
+from upy import TableConfig, TableModel
+from upy.execution import SlowQueryLog
+from upy.execution.slowlog import query_table
+from tests.fake_driver import FakeConnection, FakePool, rows
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+
+
+def plan_handler(query):
+    if query.sql.startswith("EXPLAIN"):
+        return [{"QUERY PLAN": [{"Plan": {"Node Type": "Seq Scan"}}]}]
+    return [{"id": 1, "name": "a"}]
+
+
+def test_fast_queries_are_not_recorded():
+    records = []
+    log = SlowQueryLog(FakeConnection(rows({"id": 1, "name": "a"})), threshold=1.0, callback=records.append)
+    asyncio.run(Table.objects.fetch(log))
+    assert not records
+
+
+def test_slow_query_record():
+    records = []
+    connection = FakeConnection(rows({"id": 1, "name": "a"}), latency=0.01)
+    log = SlowQueryLog(connection, threshold=0.0, callback=records.append)
+    asyncio.run(Table.objects.fetch(log, Table.id == [1, 2, 3]))
+
+    record = records[0]
+    assert record.sql == "SELECT table.id, table.name FROM table WHERE table.id = ANY(%s)"
+    assert (record.table, record.params, record.rows, record.plan) == ("table", 3, 1, None)
+    assert record.duration >= 0.01
+
+
+def test_sampled_plan_is_captured_on_separate_connection():
+    records = []
+    explain = FakeConnection(plan_handler)
+    connection = FakeConnection(plan_handler)
+    log = SlowQueryLog(connection, threshold=0.0, sample_rate=1.0, explain_executor=explain, callback=records.append)
+
+    async def main():
+        await Table.objects.fetch(log)
+        await Table.objects.filter(Table.id == 1).update(log, name="b")
+        await log.flush()
+
+    asyncio.run(main())
+    assert len(connection.queries) == 2
+    assert [query.sql.split(" ")[0] for query in explain.queries] == ["EXPLAIN", "BEGIN", "EXPLAIN", "ROLLBACK"]
+    assert explain.queries[0].sql.startswith("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT")
+    assert records[0].plan == [{"Plan": {"Node Type": "Seq Scan"}}]
+    assert records[1].rows is None
+
+
+def test_plan_errors_are_recorded():
+    def failing(query):
+        raise RuntimeError("no connection")
+
+    records = []
+    pool = FakePool([FakeConnection(failing)])
+    log = SlowQueryLog(FakeConnection(), threshold=0.0, sample_rate=1.0, explain_executor=pool, callback=records.append)
+
+    async def main():
+        await Table.objects.fetch(log)
+        await log.flush()
+
+    asyncio.run(main())
+    assert "no connection" in records[0].plan_error
+
+
+def test_rotating_file(tmp_path):
+    path = tmp_path / "slow.log"
+    log = SlowQueryLog(FakeConnection(), threshold=0.0, path=path)
+
+    async def main():
+        await Table.objects.fetch(log)
+        await log.close()
+
+    asyncio.run(main())
+    record = json.loads(path.read_text().splitlines()[0])
+    assert record["table"] == "table"
+
+
+def test_query_table():
+    assert query_table(Table.objects.build_delete(Table.id == 1).sql) == "table"
+    assert query_table(Table.objects.build_update(name="a").sql) == "table"
+    assert query_table("SELECT 1") is None
+
+
+def test_explains_on_single_connection_do_not_interleave():
+    records = []
+    explain = FakeConnection(plan_handler, latency=0.001)
+    log = SlowQueryLog(
+        FakeConnection(plan_handler), threshold=0.0, sample_rate=1.0, explain_executor=explain, callback=records.append
+    )
+
+    async def main():
+        await asyncio.gather(*(Table.objects.filter(Table.id == index).update(log, name="b") for index in range(3)))
+        await log.flush()
+
+    asyncio.run(main())
+    assert [query.sql.split(" ")[0] for query in explain.queries] == ["BEGIN", "EXPLAIN", "ROLLBACK"] * 3
+    assert len(records) == 3
+
+
+def test_failed_slow_query_is_recorded():
+    def failing(query):
+        raise RuntimeError("canceling statement due to statement timeout")
+
+    records = []
+    explain = FakeConnection(plan_handler)
+    log = SlowQueryLog(
+        FakeConnection(failing), threshold=0.0, sample_rate=1.0, explain_executor=explain, callback=records.append
+    )
+    with pytest.raises(RuntimeError):
+        asyncio.run(Table.objects.fetch(log))
+    assert "statement timeout" in records[0].error
+    assert records[0].rows is None
+    assert not explain.queries
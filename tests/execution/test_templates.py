@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import ClassVar
+
+from upy import TableConfig, TableModel
+from upy.config import Index
+from upy.execution import TemplateCache, fingerprint, normalize
+from upy.execution.templates import compile_template, schema_hash
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+
+
+class Changed(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+    created: int
+
+
+class Retyped(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: bytes
+
+
+class Indexed(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id", indexes=[Index(columns=["name"])])
+    id: int
+    name: str
+
+
+def test_compiled_template_collapses_lists():
+    query = Table.objects.build_select(Table.name == "a", Table.id == [1, 2, 3], Table.id != [4, 5])
+    template = compile_template(query.sql)
+    assert template.sql.endswith("table.id = ANY(%s) AND table.id <> ALL(%s)")
+    assert template.layout == (0, 3, 2)
+    assert template.apply(query.params) == ("a", [1, 2, 3], [4, 5])
+    assert template.fingerprint == fingerprint(template.sql)
+    assert normalize(query).params == template.apply(query.params)
+
+
+def test_cache_is_bounded():
+    cache = TemplateCache(max_size=2)
+    first = cache.compile("SELECT 1")
+    cache.compile("SELECT 2")
+    assert cache.compile("SELECT 1") is first
+    cache.compile("SELECT 3")
+    assert len(cache) == 2
+    assert cache.compile("SELECT 1") is first
+
+
+def test_dump_and_load(tmp_path):
+    path = tmp_path / "templates.bin"
+    queries = [Table.objects.build_select(Table.id == list(range(size))).sql for size in range(1, 50)]
+    warm = TemplateCache()
+    expected = [warm.compile(sql) for sql in queries]
+    warm.dump(path, [Table])
+
+    cold = TemplateCache()
+    assert cold.load(path, [Table])
+    assert len(cold) == 0
+    assert [cold.compile(sql) for sql in queries] == expected
+    assert cold.compile("SELECT 1") == compile_template("SELECT 1")
+
+
+def test_schema_change_invalidates_file(tmp_path):
+    path = tmp_path / "templates.bin"
+    cache = TemplateCache()
+    cache.compile("SELECT 1")
+    cache.dump(path, [Table])
+
+    assert not TemplateCache().load(path, [Changed])
+    assert not TemplateCache().load(tmp_path / "missing.bin", [Table])
+
+    path.write_bytes(b"UPYT")
+    assert not TemplateCache().load(path, [Table])
+
+
+def test_schema_hash_covers_types_and_indexes():
+    digest = schema_hash([Table])
+    assert schema_hash([Table]) == digest
+    assert schema_hash([Retyped]) != digest
+    assert schema_hash([Indexed]) != digest
+
+
+def test_cache_is_thread_safe():
+    cache = TemplateCache(max_size=16)
+    queries = [f"SELECT {index % 40}" for index in range(4000)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        templates = list(pool.map(cache.compile, queries))
+    assert [template.sql for template in templates] == queries
+    assert len(cache) == 16
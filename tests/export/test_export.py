@@ -0,0 +1,104 @@
+import asyncio
+import gzip
+import io
+from typing import ClassVar
+
+import pytest
+
+from upy import TableConfig, TableModel
+from upy.execution import DeadlineConnection, PreparedPool
+from tests.fake_driver import FakeConnection, FakePool
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+
+
+CHUNKS = [b"id,name\n", b"1,a\n2,b\n", b"3,c\n"]
+
+
+def test_build_csv_export():
+    query = Table.objects.filter(Table.id > 1).build_export(columns=[Table.id, Table.name])
+    assert query.sql == (
+        "COPY (SELECT table.id, table.name FROM table WHERE table.id > %s) TO STDOUT WITH (FORMAT csv, HEADER)"
+    )
+    assert query.params == (1,)
+    assert query.readonly
+
+    query = Table.objects.build_export(header=False)
+    assert query.sql == "COPY (SELECT table.id, table.name FROM table) TO STDOUT WITH (FORMAT csv)"
+
+
+def test_build_ndjson_export():
+    query = Table.objects.filter(Table.name == "a").build_export("ndjson")
+    assert query.sql == (
+        "COPY (SELECT row_to_json(exported) FROM "
+        "(SELECT table.id, table.name FROM table WHERE table.name = %s) AS exported) "
+        "TO STDOUT WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+    )
+    assert query.params == ("a",)
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        Table.objects.build_export("xml")
+
+
+def test_export_streams_chunks_to_file():
+    connection = FakeConnection(lambda query: list(CHUNKS))
+    output = io.BytesIO()
+
+    written = asyncio.run(Table.objects.export(connection, output))
+    assert output.getvalue() == b"".join(CHUNKS)
+    assert written == len(output.getvalue())
+    assert connection.queries[0].sql.startswith("COPY (SELECT table.id, table.name FROM table)")
+
+
+def test_export_compressed():
+    connection = FakeConnection(lambda query: list(CHUNKS))
+    output = io.BytesIO()
+
+    written = asyncio.run(Table.objects.export(connection, output, compress=True))
+    assert written == len(output.getvalue())
+    assert gzip.decompress(output.getvalue()) == b"".join(CHUNKS)
+
+
+def test_export_to_async_writer_through_wrappers():
+    class Writer:
+        def __init__(self):
+            self.chunks = []
+            self.drained = 0
+
+        async def write(self, chunk):
+            self.chunks.append(chunk)
+
+        async def drain(self):
+            self.drained += 1
+
+    connection = FakeConnection(lambda query: list(CHUNKS))
+    pool = PreparedPool(FakePool([connection]))
+    writer = Writer()
+
+    asyncio.run(Table.objects.export(pool, writer, fmt="ndjson"))
+    assert writer.chunks == CHUNKS
+    assert writer.drained == len(CHUNKS)
+    assert connection.prepared == {}
+
+
+def test_deadline_connection_resets_statement_timeout_before_export():
+    connection = FakeConnection(lambda query: list(CHUNKS) if query.sql.startswith("COPY") else [])
+    wrapped = DeadlineConnection(connection, timeout=1.0)
+
+    async def main():
+        await wrapped.fetch(Table.objects.build_select())
+        await Table.objects.export(wrapped, io.BytesIO())
+
+    asyncio.run(main())
+    assert [query.sql.split(" (")[0] for query in connection.queries] == [
+        "SET statement_timeout = 1000",
+        "SELECT table.id, table.name FROM table",
+        "RESET statement_timeout",
+        "COPY",
+    ]
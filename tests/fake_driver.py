@@ -0,0 +1,117 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable
+
+from upy.core import AbstractConnection, AbstractPool, Row
+from upy.utils import Query
+
+
+class FakeConnection(AbstractConnection):
+    """
+    In-memory connection, recording executed queries
+    Result rows are produced by handler, latency is simulated with asyncio.sleep
+    Pipeline mode pays the latency once per pipeline
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Query], list[Row]] | None = None,
+        latency: float = 0.0,
+        supports_pipeline: bool = False,
+        supports_prepare: bool = False,
+        supports_cancel: bool = False,
+    ):
+        self.handler = handler or (lambda query: [])
+        self.latency = latency
+        self.supports_pipeline = supports_pipeline
+        self.supports_prepare = supports_prepare
+        self.supports_cancel = supports_cancel
+        self.cancelled = 0
+        self.queries: list[Query] = []
+        self.round_trips = 0
+        self.prepared: dict[str, str] = {}
+        self.deallocated: list[str] = []
+
+    async def fetch(self, query: Query) -> list[Row]:
+        self.queries.append(query)
+        self.round_trips += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.handler(query)
+
+    async def execute(self, query: Query) -> None:
+        await self.fetch(query)
+
+    async def fetch_pipeline(self, queries: list[Query]) -> list[list[Row] | BaseException]:
+        if not self.supports_pipeline:
+            return await super().fetch_pipeline(queries)
+
+        self.round_trips += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        results: list[list[Row] | BaseException] = []
+        for query in queries:
+            self.queries.append(query)
+            try:
+                results.append(self.handler(query))
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    async def prepare(self, name: str, sql: str) -> None:
+        self.round_trips += 1
+        self.prepared[name] = sql
+
+    async def fetch_prepared(self, name: str, params: tuple) -> list[Row]:
+        return await self.fetch(Query(self.prepared[name], params))
+
+    async def deallocate(self, name: str) -> None:
+        self.round_trips += 1
+        del self.prepared[name]
+        self.deallocated.append(name)
+
+    async def cancel(self) -> None:
+        self.cancelled += 1
+
+    async def copy_out(self, query: Query) -> AsyncIterator[bytes]:
+        self.queries.append(query)
+        self.round_trips += 1
+        for chunk in self.handler(query):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            yield chunk
+
+
+class FakePool(AbstractPool):
+    """
+    Pool of fake connections, acquiring waits for a free connection
+    """
+
+    def __init__(self, connections: list[FakeConnection]):
+        self.connections = connections
+        self.supports_pipeline = all(connection.supports_pipeline for connection in connections)
+        self.free: asyncio.Queue | None = None
+        self.acquired = 0
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[FakeConnection]:
+        if self.free is None:
+            self.free = asyncio.Queue()
+            for connection in self.connections:
+                self.free.put_nowait(connection)
+
+        connection = await self.free.get()
+        self.acquired += 1
+        try:
+            yield connection
+        finally:
+            self.free.put_nowait(connection)
+
+    @property
+    def queries(self) -> list[Query]:
+        return [query for connection in self.connections for query in connection.queries]
+
+
+def rows(*items: dict[str, Any]) -> Callable[[Query], list[Row]]:
+    return lambda query: [dict(item) for item in items]
@@ -0,0 +1,114 @@
+from typing import ClassVar
+
+import pytest
+
+from upy.config import Index, TableConfig
+from upy.builder import IndexCheck
+from upy.exceptions import InvalidOperatorComparison, UnsupportedCollation
+from upy.fields.field import TableField
+from upy.table import TableModel
+
+field = TableField(name="column", prefix="table")
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(
+        tablename="table",
+        pk="id",
+        indexes=[Index(columns=["name"])],
+        index_check=IndexCheck.STRICT,
+        collation="C",
+        rewrite_like=True,
+    )
+    id: int
+    name: str
+
+
+def test_rewriting_is_opt_in():
+    condition = field % "abc%"
+    assert condition.sql == "table.column LIKE %s"
+    assert condition.params == ["abc%"]
+
+
+def test_prefix_pattern_to_range():
+    condition = field.like("abc%", rewrite=True)
+    assert condition.sql == "(table.column >= %s AND table.column < %s AND table.column LIKE %s)"
+    assert condition.params == ["abc", "abd", "abc%"]
+
+
+def test_prefix_bound_skips_characters_without_successor():
+    assert (field.like("az_%", rewrite=True)).params == ["az", "b", "az_%"]
+    assert (field.like("ab-%", rewrite=True)).params == ["ab-", "ac", "ab-%"]
+    assert (field.like("zz%", rewrite=True)).sql == "table.column LIKE %s"
+
+
+def test_literal_pattern_to_equality():
+    condition = field.like("abc", rewrite=True)
+    assert condition.sql == "table.column = %s"
+    assert condition.params == ["abc"]
+    assert condition.predicate.operator == "="
+
+
+def test_escaped_wildcards():
+    condition = field.like("50\\%", rewrite=True)
+    assert condition.sql == "table.column = %s"
+    assert condition.params == ["50%"]
+
+    condition = field.like("a!_b%", escape="!", rewrite=True)
+    assert condition.sql == "(table.column >= %s AND table.column < %s AND table.column LIKE %s ESCAPE %s)"
+    assert condition.params == ["a_b", "a_c", "a!_b%", "!"]
+
+    condition = field.like("a\\", rewrite=True)
+    assert condition.sql == "table.column LIKE %s"
+
+
+def test_patterns_without_prefix_are_kept():
+    assert field.like("%abc", rewrite=True).sql == "table.column LIKE %s"
+    assert field.like("_bc", rewrite=True).sql == "table.column LIKE %s"
+    assert field.like(TableField(name="other", prefix="table"), rewrite=True).sql == "table.column LIKE table.other"
+
+
+def test_ilike():
+    assert field.ilike("Abc").sql == "table.column ILIKE %s"
+
+    condition = field.ilike("Abc", rewrite=True)
+    assert condition.sql == "lower(table.column) = %s"
+    assert condition.params == ["abc"]
+
+    condition = field.ilike("Abc%", rewrite=True)
+    assert condition.sql == (
+        "(lower(table.column) >= %s AND lower(table.column) < %s AND table.column ILIKE %s)"
+    )
+    assert condition.params == ["abc", "abd", "Abc%"]
+
+    assert field.ilike("Äbc%", rewrite=True).sql == "table.column ILIKE %s"
+
+
+def test_ilike_to_none():
+    with pytest.raises(InvalidOperatorComparison):
+        field.ilike(None)
+
+
+def test_table_config_enables_rewriting():
+    query = Table.objects.filter(Table.name % "ab%").build_select()
+    assert query.sql == (
+        "SELECT table.id, table.name FROM table WHERE "
+        "(table.name >= %s AND table.name < %s AND table.name LIKE %s)"
+    )
+    assert query.params == ("ab", "ac", "ab%")
+    assert Table.name.like("ab%", rewrite=False).sql == "table.name LIKE %s"
+
+
+def test_table_rewriting_requires_binary_collation():
+    with pytest.raises(UnsupportedCollation):
+
+        class Linguistic(TableModel):
+            config: ClassVar[TableConfig] = TableConfig(tablename="linguistic", collation="cs_CZ", rewrite_like=True)
+            id: int
+
+    assert TableConfig(tablename="posix", collation="posix").binary_collation
+    assert not TableConfig(tablename="default").binary_collation
+
+
+def test_binary_collation_index_serves_like():
+    assert "LIKE" in Table.objects.build_select(Table.name.like("ab%", rewrite=False)).sql
@@ -0,0 +1,114 @@
+import asyncio
+import warnings
+from typing import ClassVar
+
+import pytest
+
+from upy import TableConfig, TableModel
+from upy.builder import IndexCheck
+from upy.config import Index
+from upy.exceptions import UnindexedFilter, UnindexedFilterWarning
+from tests.fake_driver import FakeConnection
+
+
+class Event(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(
+        tablename="event",
+        pk="id",
+        index_check=IndexCheck.STRICT,
+        indexes=[
+            Index(columns=["created", "kind"]),
+            Index(columns=["name"], unique=True),
+        ],
+    )
+    id: int
+    created: int
+    kind: str
+    name: str
+    deleted: bool
+
+
+class Warned(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(
+        tablename="warned",
+        index_check="warn",
+        indexes=[Index(columns=["kind"])],
+    )
+    id: int
+    kind: str
+    deleted: bool
+
+
+# Partial index predicate refers to fields of the declared table
+Warned.config.indexes[0].where = Warned.deleted == False  # noqa: E712
+
+
+def test_ddl():
+    assert Event.config.index_ddl() == [
+        "CREATE INDEX IF NOT EXISTS event_created_kind_idx ON event (created, kind)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS event_name_key ON event (name)",
+    ]
+    assert Warned.config.index_ddl(concurrently=True) == [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS warned_kind_idx ON warned (kind) WHERE warned.deleted = FALSE"
+    ]
+
+
+def test_indexed_filters_pass():
+    Event.objects.build_select(Event.id == 1)
+    Event.objects.build_delete(Event.created < 10, Event.kind != "a")
+    Event.objects.filter((Event.name == "a") | (Event.name > "b")).build_update(kind="x")
+    Event.objects.build_select()
+
+
+def test_unhashable_values():
+    Event.objects.build_select(Event.id == 1, Event.kind == {"a": 1})
+    Warned.objects.build_select(Warned.kind == "a", Warned.deleted == False, Warned.id == {"a": [1]})  # noqa: E712
+
+
+def test_unindexed_filters_raise_in_strict_mode():
+    with pytest.raises(UnindexedFilter):
+        Event.objects.build_delete(Event.kind == "a")
+    with pytest.raises(UnindexedFilter):
+        Event.objects.filter((Event.id == 1) | (Event.kind == "a")).build_update(name="x")
+    with pytest.raises(UnindexedFilter):
+        Event.objects.build_count(Event.name % "%a")
+    with pytest.raises(UnindexedFilter):
+        Event.objects.build_count(Event.name % "a%")
+
+
+def test_pattern_ops_index_serves_like_prefix():
+    index = Index(columns=["name", "kind"], pattern_ops=True)
+    assert index.ddl("pattern") == (
+        "CREATE INDEX IF NOT EXISTS pattern_name_kind_idx ON pattern (name text_pattern_ops, kind)"
+    )
+
+    class Pattern(TableModel):
+        config: ClassVar[TableConfig] = TableConfig(tablename="pattern", index_check="strict", indexes=[index])
+        id: int
+        name: str
+        kind: str
+
+    Pattern.objects.build_select(Pattern.name % "a%")
+    Pattern.objects.build_select(Pattern.name == ["a", "b"])
+    with pytest.raises(UnindexedFilter):
+        Pattern.objects.build_select(Pattern.name > "a")
+
+
+def test_partial_index_requires_its_predicate():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        Warned.objects.build_select(Warned.kind == "a", Warned.deleted == False)  # noqa: E712
+
+    with pytest.warns(UnindexedFilterWarning):
+        Warned.objects.build_select(Warned.kind == "a")
+
+
+def test_warning_points_to_caller():
+    async def main():
+        return await Warned.objects.fetch(FakeConnection(), Warned.kind == "a")
+
+    with pytest.warns(UnindexedFilterWarning) as record:
+        Warned.objects.filter(Warned.kind == "a").build_delete()
+    with pytest.warns(UnindexedFilterWarning) as fetched:
+        asyncio.run(main())
+    assert [warning.filename for warning in [*record, *fetched]] == [__file__, __file__]
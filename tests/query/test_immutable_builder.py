@@ -0,0 +1,77 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import ClassVar
+
+from upy import TableConfig, TableModel
+from tests.fake_driver import FakeConnection
+
+
+class Item(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="item", pk="id")
+    id: int
+    kind: str
+    deleted: int | None
+
+
+ACTIVE = Item.objects.filter(Item.deleted == None)  # noqa: E711
+ACTIVE_SQL = ACTIVE.build_select().sql
+
+
+def test_chain_returns_new_builder():
+    ordered = ACTIVE.order_by(Item.id).limit(5)
+    assert ordered is not ACTIVE
+    assert ACTIVE.build_select().sql == ACTIVE_SQL
+    assert ordered.build_select().sql == f"{ACTIVE_SQL} ORDER BY item.id LIMIT %s"
+
+
+def test_derived_builders_are_independent():
+    first = ACTIVE.filter(Item.kind == "a")
+    second = ACTIVE.filter(Item.kind == "b").select(Item.id)
+    assert first.build_select().params == ("a",)
+    assert second.build_select().params == ("b",)
+    assert second.build_select().sql.startswith("SELECT item.id FROM")
+    assert ACTIVE.build_select().params == ()
+
+
+def test_build_arguments_do_not_modify_builder():
+    ACTIVE.build_select(Item.kind == "a")
+    ACTIVE.build_count(Item.kind == "a")
+    ACTIVE.build_exists(Item.kind == "a")
+    ACTIVE.build_delete(Item.kind == "a")
+    assert ACTIVE.build_select().sql == ACTIVE_SQL
+
+    base = Item.objects.returning(Item.id)
+    assert base.build_delete(strict=False).sql == "DELETE FROM item WHERE true RETURNING item.id"
+    assert base.build_delete(strict=True).sql == "DELETE FROM item RETURNING item.id"
+
+
+def test_shared_base_under_threads():
+    def build(index):
+        query = ACTIVE.filter(Item.id == index).order_by(Item.kind).build_select()
+        return index, query
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(build, range(500)))
+
+    for index, query in results:
+        assert query.params == (index,)
+        assert query.sql == f"{ACTIVE_SQL} AND item.id = %s ORDER BY item.kind"
+    assert ACTIVE.build_select().sql == ACTIVE_SQL
+
+
+def test_shared_base_under_tasks():
+    connection = FakeConnection(lambda query: [], latency=0.001)
+
+    async def fetch(index):
+        builder = ACTIVE.filter(Item.id == index)
+        await asyncio.sleep(0)
+        await builder.limit(index + 1).fetch(connection)
+
+    async def main():
+        await asyncio.gather(*(fetch(index) for index in range(200)))
+
+    asyncio.run(main())
+    assert sorted(query.params for query in connection.queries) == sorted(
+        (index, index + 1) for index in range(200)
+    )
+    assert ACTIVE.build_select().sql == ACTIVE_SQL
@@ -0,0 +1,40 @@
+import pickle
+
+from upy.utils import BatchQuery, Query, QueryModel
+
+
+def test_query_params_are_tuple():
+    query = Query(sql="DELETE FROM table WHERE table.id = %s", params=[1])
+    assert query.sql == "DELETE FROM table WHERE table.id = %s"
+    assert query.params == (1,)
+
+
+def test_query_params_are_equal_to_list():
+    query = Query("SELECT table.id FROM table WHERE table.id IN (%s, %s)", [1, 2])
+    assert query.params == [1, 2]
+    assert [1, 2] == query.params
+    assert query.params != [2, 1]
+    assert hash(query.params) == hash((1, 2))
+
+
+def test_query_is_immutable():
+    query = Query("DELETE FROM table")
+    try:
+        query.sql = "DELETE FROM other"
+    except Exception as exc:
+        assert isinstance(exc, AttributeError)
+    else:
+        assert False
+
+
+def test_query_to_model():
+    model = Query("DELETE FROM table WHERE table.id = %s", [1]).to_model()
+    assert isinstance(model, QueryModel)
+    assert model.params == [1]
+
+
+def test_query_equality_and_pickle():
+    query = Query("DELETE FROM table WHERE table.id = %s", [1])
+    assert query == Query("DELETE FROM table WHERE table.id = %s", (1,))
+    assert query != BatchQuery("DELETE FROM table WHERE table.id = %s", (1,))
+    assert pickle.loads(pickle.dumps(query)) == query
@@ -0,0 +1,144 @@
+import asyncio
+from typing import ClassVar
+
+import pytest
+
+from upy import Relation, TableConfig, TableModel
+from upy.builder import DEFAULT_CHUNK_SIZE
+from upy.exceptions import InvalidPrefetch, UndefinedRelation
+from tests.fake_driver import FakeConnection
+
+
+class Author(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(
+        tablename="author",
+        pk="id",
+        relations={"books": Relation(table=lambda: Book, field="id", remote="author_id")},
+    )
+    id: int
+    name: str
+
+
+class Book(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(
+        tablename="book",
+        pk="id",
+        relations={"author": Relation(table=Author, field="author_id", remote="id", many=False)},
+    )
+    id: int
+    author_id: int
+    name: str
+
+
+def test_join_by_relation():
+    query = Book.objects.join("author").filter(Author.name == "x").build_select()
+    assert query.sql == (
+        "SELECT book.id AS book__id, book.author_id AS book__author_id, book.name AS book__name, "
+        "author.id AS author__id, author.name AS author__name "
+        "FROM book JOIN author ON book.author_id = author.id WHERE author.name = %s"
+    )
+    assert query.params == ("x",)
+
+
+def test_left_join_by_table_and_condition():
+    query = Author.objects.select(Author.name, Book.name).left_join(Book, Book.author_id == Author.id).build_select()
+    assert query.sql == (
+        "SELECT author.name AS author__name, book.name AS book__name "
+        "FROM author LEFT JOIN book ON book.author_id = author.id"
+    )
+
+
+def test_join_undefined_relation():
+    try:
+        Author.objects.join("missing")
+    except Exception as exc:
+        assert isinstance(exc, UndefinedRelation)
+    else:
+        assert False
+
+
+def test_join_hydrates_related_models():
+    connection = FakeConnection(lambda query: [
+        {"author__id": 1, "author__name": "a", "book__id": 10, "book__author_id": 1, "book__name": "b"},
+        {"author__id": 2, "author__name": "c", "book__id": None, "book__author_id": None, "book__name": None},
+    ])
+    result = asyncio.run(Author.objects.left_join("books").fetch(connection))
+    assert result[0].name == "a"
+    assert [book.name for book in result[0].related("books")] == ["b"]
+    assert result[1].related("books") == []
+
+
+def test_join_gathers_many_related_rows():
+    connection = FakeConnection(lambda query: [
+        {"author__id": 1, "author__name": "a", "book__id": 10, "book__author_id": 1, "book__name": "x"},
+        {"author__id": 1, "author__name": "a", "book__id": 11, "book__author_id": 1, "book__name": "y"},
+        {"author__id": 2, "author__name": "c", "book__id": 12, "book__author_id": 2, "book__name": "z"},
+    ])
+    result = asyncio.run(Author.objects.join("books").fetch(connection))
+    assert [author.id for author in result] == [1, 2]
+    assert [book.name for book in result[0].related("books")] == ["x", "y"]
+    assert [book.name for book in result[1].related("books")] == ["z"]
+
+    books = asyncio.run(Book.objects.join("author").fetch(FakeConnection(lambda query: [
+        {"book__id": 10, "book__author_id": 1, "book__name": "x", "author__id": 1, "author__name": "a"},
+    ])))
+    assert books[0].related("author").name == "a"
+
+
+def test_prefetch_uses_one_query():
+    def handler(query):
+        if query.sql.startswith("SELECT author."):
+            return [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}, {"id": 3, "name": "c"}]
+        return [
+            {"id": 10, "author_id": 1, "name": "x"},
+            {"id": 11, "author_id": 1, "name": "y"},
+            {"id": 12, "author_id": 2, "name": "z"},
+        ]
+
+    connection = FakeConnection(handler)
+    authors = asyncio.run(Author.objects.prefetch("books").fetch(connection))
+
+    assert len(connection.queries) == 2
+    assert connection.queries[1].sql == (
+        "SELECT book.id, book.author_id, book.name FROM book WHERE book.author_id IN (%s, %s, %s)"
+    )
+    assert [book.name for book in authors[0].related("books")] == ["x", "y"]
+    assert authors[2].related("books") == []
+
+
+def test_prefetch_one_to_one():
+    def handler(query):
+        if query.sql.startswith("SELECT book."):
+            return [{"id": 10, "author_id": 1, "name": "x"}]
+        return [{"id": 1, "name": "a"}]
+
+    books = asyncio.run(Book.objects.prefetch("author").fetch(FakeConnection(handler)))
+    assert books[0].related("author").name == "a"
+
+
+def test_prefetch_selected_rows():
+    def handler(query):
+        if query.sql.startswith("SELECT author."):
+            return [{"id": 1}, {"id": 2}] if "author.id" in query.sql else [{"name": "a"}]
+        return [{"id": 10, "author_id": 1, "name": "x"}]
+
+    authors = asyncio.run(Author.objects.select(Author.id).prefetch("books").fetch(FakeConnection(handler)))
+    assert [book.name for book in authors[0]["books"]] == ["x"]
+    assert authors[1]["books"] == []
+
+    with pytest.raises(InvalidPrefetch):
+        asyncio.run(Author.objects.select(Author.name).prefetch("books").fetch(FakeConnection(handler)))
+
+
+def test_prefetch_keys_are_chunked():
+    count = DEFAULT_CHUNK_SIZE + 1
+
+    def handler(query):
+        if query.sql.startswith("SELECT author."):
+            return [{"id": key, "name": "a"} for key in range(count)]
+        return [{"id": key, "author_id": key, "name": "x"} for key in query.params]
+
+    connection = FakeConnection(handler)
+    authors = asyncio.run(Author.objects.prefetch("books").fetch(connection))
+    assert [len(query.params) for query in connection.queries[1:]] == [DEFAULT_CHUNK_SIZE, 1]
+    assert all(len(author.related("books")) == 1 for author in authors)
@@ -0,0 +1,62 @@
+import asyncio
+from typing import ClassVar
+
+from upy import Expression, TableConfig, TableModel
+from tests.fake_driver import FakeConnection, rows
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+
+
+def test_update_returning_fields():
+    query = Table.objects.filter(Table.id == 1).returning(Table.id, Table.name).build_update(name="test")
+    assert query.sql == "UPDATE table SET table.name = %s WHERE table.id = %s RETURNING table.id, table.name"
+    assert query.params == ("test", 1)
+
+
+def test_delete_returning_all():
+    query = Table.objects.returning().build_delete(Table.id == 1)
+    assert query.sql == "DELETE FROM table WHERE table.id = %s RETURNING *"
+
+
+def test_insert_returning_expression():
+    queries = Table.objects.returning(Expression("table.id + %s", 1)).build_insert([{"id": 1, "name": "a"}])
+    assert queries[0].sql == "INSERT INTO table (id, name) VALUES (%s, %s) RETURNING table.id + %s"
+    assert queries[0].params == (1, "a", 1)
+
+
+def test_upsert_returning():
+    queries = Table.objects.returning(Table.id).build_upsert([{"id": 1, "name": "a"}], do_nothing=True)
+    assert queries[0].sql.endswith("ON CONFLICT (id) DO NOTHING RETURNING table.id")
+
+
+def test_delete_hydrates_models():
+    connection = FakeConnection(rows({"id": 1, "name": "a"}, {"id": 2, "name": "b"}))
+    result = asyncio.run(Table.objects.returning().delete(connection, Table.id == [1, 2]))
+    assert [item.id for item in result] == [1, 2]
+    assert all(isinstance(item, Table) for item in result)
+
+
+def test_update_returns_partial_rows():
+    connection = FakeConnection(rows({"id": 1}))
+    result = asyncio.run(Table.objects.filter(Table.id == 1).returning(Table.id).update(connection, name="x"))
+    assert result == [{"id": 1}]
+
+
+def test_update_without_returning():
+    connection = FakeConnection(rows({"id": 1}))
+    result = asyncio.run(Table.objects.filter(Table.id == 1).update(connection, name="x"))
+    assert result == []
+    assert connection.queries[0].sql == "UPDATE table SET table.name = %s WHERE table.id = %s"
+
+
+def test_insert_chunks_are_concatenated():
+    connection = FakeConnection(rows({"id": 1, "name": "a"}))
+    result = asyncio.run(
+        Table.objects.returning().insert(connection, [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}], chunk_size=1)
+    )
+    assert len(connection.queries) == 2
+    assert len(result) == 2
@@ -0,0 +1,120 @@
+import asyncio
+from typing import ClassVar
+
+from upy import Relation, Session, TableConfig, TableModel
+from upy.execution import Loader
+from tests.fake_driver import FakeConnection
+
+
+class Author(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="author", pk="id")
+    id: int
+    name: str
+
+
+class Book(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(
+        tablename="book",
+        pk="id",
+        relations={"author": Relation(table=Author, field="author_id", remote="id", many=False)},
+    )
+    id: int
+    author_id: int
+
+
+AUTHORS = {1: "first", 2: "second"}
+
+
+def handler(query):
+    if "book" in query.sql:
+        return [{"book__id": 1, "book__author_id": 1, "author__id": 1, "author__name": AUTHORS[1]}]
+    keys = [key for key in query.params if key in AUTHORS] or list(AUTHORS)
+    return [{"id": key, "name": AUTHORS[key]} for key in keys]
+
+
+def test_pk_lookup_is_served_from_identity_map():
+    connection = FakeConnection(handler)
+
+    async def main():
+        with Session() as session:
+            everyone = await Author.objects.fetch(connection)
+            first = await Author.objects.fetch(connection, Author.id == 1)
+            both = await Author.objects.fetch(connection, Author.id == [1, 2])
+            filtered = await Author.objects.fetch(connection, Author.id == 1, Author.name == "first")
+            return session, everyone, first, both, filtered
+
+    session, everyone, first, both, filtered = asyncio.run(main())
+    assert len(connection.queries) == 2
+    assert first[0] is everyone[0]
+    assert {id(item) for item in both} == {id(item) for item in everyone}
+    assert filtered[0] is everyone[0]
+    assert len(session) == 2 and everyone[1] in session
+
+
+def test_without_session_instances_are_not_shared():
+    connection = FakeConnection(handler)
+
+    async def main():
+        first = await Author.objects.fetch(connection, Author.id == 1)
+        return first, await Author.objects.fetch(connection, Author.id == 1)
+
+    first, second = asyncio.run(main())
+    assert first[0] is not second[0]
+    assert len(connection.queries) == 2
+
+
+def test_refetch_refreshes_known_instance():
+    connection = FakeConnection(handler)
+
+    async def main():
+        with Session():
+            first = await Author.objects.fetch(connection)
+            AUTHORS[1] = "renamed"
+            try:
+                second = await Author.objects.filter(Author.name == "renamed").fetch(connection)
+            finally:
+                AUTHORS[1] = "first"
+            return first, second
+
+    first, second = asyncio.run(main())
+    assert second[0] is first[0]
+    assert first[0].name == "renamed"
+
+
+def test_joined_rows_are_deduplicated():
+    connection = FakeConnection(handler)
+
+    async def main():
+        with Session():
+            author = await Author.objects.fetch(connection, Author.id == 1)
+            book = await Book.objects.join("author").fetch(connection)
+            return author[0], book[0]
+
+    author, book = asyncio.run(main())
+    assert book.related("author") is author
+
+
+def test_lru_bound_and_expunge():
+    session = Session(max_size=2)
+    first, second, third = (Author(id=key, name="x") for key in (1, 2, 3))
+    for instance in (first, second):
+        session.add(instance)
+    session.get(Author, 1)
+    session.add(third)
+    assert first in session and third in session and second not in session
+
+    session.expunge(first)
+    assert session.get(Author, 1) is None
+
+
+def test_loader_uses_session():
+    connection = FakeConnection(handler)
+
+    async def main():
+        with Session():
+            author = await Author.objects.fetch(connection, Author.id == 1)
+            return author[0], await Loader(Author, connection).load(1)
+
+    author, loaded = asyncio.run(main())
+    assert loaded is author
+    assert len(connection.queries) == 1
@@ -0,0 +1,216 @@
+import asyncio
+import pickle
+from decimal import Decimal
+from typing import ClassVar
+
+import pytest
+
+from upy import Expression, TableConfig, TableModel
+from upy.config import ShardMap
+from upy.exceptions import UndefinedShard, UnmergeableAggregate
+from upy.execution import ShardRouter
+from upy.utils import Query, ShardedQuery
+from tests.fake_driver import FakeConnection, rows
+
+SHARDS = ShardMap(nodes=["a", "b"], mapping={1: "a", 2: "b", 3: "a"})
+
+
+class Order(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="order", pk="id", shard_key="tenant_id", shards=SHARDS)
+    id: int
+    tenant_id: int
+    total: int | None
+
+
+class Plain(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="plain", pk="id")
+    id: int
+
+
+def make_router(data):
+    connections = {name: FakeConnection(rows(*items)) for name, items in data.items()}
+    return ShardRouter(connections), connections
+
+
+def test_shard_key_filter_targets_single_node():
+    query = Order.objects.filter(Order.tenant_id == 2, Order.total > 10).build_select()
+    assert isinstance(query, ShardedQuery)
+    assert query.nodes == frozenset({"b"})
+
+    query = Order.objects.filter(Order.tenant_id == [1, 3]).build_select()
+    assert query.nodes == frozenset({"a"})
+
+
+def test_unconstrained_filter_fans_out():
+    assert Order.objects.build_select().nodes is None
+    assert Order.objects.filter((Order.tenant_id == 1) | (Order.total == 1)).build_select().nodes is None
+    assert Order.objects.filter((Order.tenant_id == 1) | (Order.tenant_id == 2)).build_select().nodes == {"a", "b"}
+
+
+def test_right_hand_condition_params_order():
+    condition = (Order.total > 5) & ((Order.tenant_id == 1) | (Order.tenant_id == 2))
+    query = Order.objects.filter(condition).build_select()
+    assert query.params == (5, 1, 2)
+    assert query.nodes == {"a", "b"}
+
+
+def test_fan_out_limit_is_applied_after_merge():
+    query = Order.objects.order_by(Order.total.desc()).limit(2).offset(1).build_select()
+    assert query.sql.endswith('ORDER BY order.total DESC LIMIT %s')
+    assert query.params == (3,)
+    assert (query.ordering, query.limit, query.offset) == ((("total", True),), 2, 1)
+
+    single = Order.objects.filter(Order.tenant_id == 1).order_by(Order.id).limit(2).offset(1).build_select()
+    assert single.sql.endswith('ORDER BY order.id LIMIT %s OFFSET %s')
+    assert single.params == (1, 2, 1)
+    assert single.offset == 0
+
+
+def test_plain_table_is_not_sharded():
+    query = Plain.objects.order_by(Plain.id).limit(5).build_select()
+    assert type(query) is Query
+    assert query.sql.endswith("ORDER BY plain.id LIMIT %s")
+
+
+def test_merge_sorted_results_of_nodes():
+    router, connections = make_router(
+        {
+            "a": [{"id": 1, "tenant_id": 1, "total": 30}, {"id": 2, "tenant_id": 1, "total": 10}],
+            "b": [{"id": 3, "tenant_id": 2, "total": 20}, {"id": 4, "tenant_id": 2, "total": None}],
+        }
+    )
+    result = asyncio.run(Order.objects.order_by(Order.total.desc()).limit(2).offset(1).fetch(router))
+    assert [item.id for item in result] == [1, 3]
+    assert all(len(connection.queries) == 1 for connection in connections.values())
+
+
+def test_unselected_ordering_is_selected_for_merge():
+    query = Order.objects.select(Order.total).order_by(Order.id).limit(2).build_select()
+    assert query.sql.startswith("SELECT order.total, order.id AS _upy_order_0 FROM order")
+    assert query.sql.endswith("ORDER BY order.id LIMIT %s")
+    assert (query.ordering, query.hidden) == ((("_upy_order_0", False),), ("_upy_order_0",))
+
+    router, _ = make_router(
+        {
+            "a": [{"total": 30, "_upy_order_0": 1}, {"total": 10, "_upy_order_0": 3}],
+            "b": [{"total": 20, "_upy_order_0": 2}, {"total": 40, "_upy_order_0": 4}],
+        }
+    )
+    result = asyncio.run(Order.objects.select(Order.total).order_by(Order.id).limit(2).fetch(router))
+    assert result == [{"total": 30}, {"total": 20}]
+
+
+def test_expression_ordering_is_merged():
+    ordering = Expression("abs(order.total - %s)", 25)
+    query = Order.objects.order_by(ordering).limit(1).build_select()
+    assert query.sql == (
+        "SELECT order.id, order.tenant_id, order.total, abs(order.total - %s) AS _upy_order_0 "
+        "FROM order ORDER BY abs(order.total - %s) LIMIT %s"
+    )
+    assert query.params == (25, 25, 1)
+
+    router, _ = make_router(
+        {
+            "a": [{"id": 1, "tenant_id": 1, "total": 30, "_upy_order_0": 5}],
+            "b": [
+                {"id": 3, "tenant_id": 2, "total": 20, "_upy_order_0": 5},
+                {"id": 4, "tenant_id": 2, "total": 24, "_upy_order_0": 1},
+            ],
+        }
+    )
+    result = asyncio.run(Order.objects.order_by(ordering).limit(1).fetch(router))
+    assert [item.id for item in result] == [4]
+
+
+def test_targeted_query_skips_other_nodes():
+    router, connections = make_router({"a": [{"id": 1, "tenant_id": 1, "total": 1}], "b": []})
+    asyncio.run(Order.objects.filter(Order.tenant_id == 1).fetch(router))
+    asyncio.run(Order.objects.filter(Order.tenant_id == 1).update(router, total=2))
+    assert len(connections["a"].queries) == 2
+    assert not connections["b"].queries
+
+
+def test_count_and_exists_are_reduced():
+    router, _ = make_router({"a": [{"value": 2}], "b": [{"value": 3}]})
+    assert asyncio.run(Order.objects.count(router)) == 5
+    assert asyncio.run(Order.objects.exists(router))
+
+
+def test_fan_out_aggregates_are_merged():
+    router, connections = make_router(
+        {
+            "a": [{"number": 2, "amount": 40, "low": 10, "high": 30, "mean__sum": 40, "mean__count": 2}],
+            "b": [{"number": 1, "amount": None, "low": None, "high": None, "mean__sum": None, "mean__count": 0}],
+        }
+    )
+    result = asyncio.run(
+        Order.objects.aggregate(
+            router,
+            number=Order.total.count(),
+            amount=Order.total.sum(),
+            low=Order.total.min(),
+            high=Order.total.max(),
+            mean=Order.total.avg(),
+        )
+    )
+    assert result == {"number": 3, "amount": 40, "low": 10, "high": 30, "mean": Decimal(20)}
+    assert "sum(order.total) AS mean__sum, count(order.total) AS mean__count" in connections["a"].queries[0].sql
+
+
+def test_fan_out_grouped_aggregates_are_merged():
+    router, _ = make_router(
+        {
+            "a": [{"group_0": 1, "value": 2}, {"group_0": 3, "value": 1}],
+            "b": [{"group_0": 1, "value": 4}, {"group_0": 2, "value": 5}],
+        }
+    )
+    grouped = Order.objects.group_by(Order.id)
+    assert asyncio.run(grouped.aggregate(router, value=Order.total.sum())) == {
+        1: {"value": 6},
+        3: {"value": 1},
+        2: {"value": 5},
+    }
+    assert asyncio.run(grouped.count(router)) == 3
+    assert asyncio.run(Order.objects.scalar(router, Order.total.max())) == 5
+
+
+def test_fan_out_aggregates_without_merge_raise():
+    router, _ = make_router({"a": [], "b": []})
+    with pytest.raises(UnmergeableAggregate):
+        asyncio.run(Order.objects.aggregate(router, value=Order.total.count_distinct()))
+    with pytest.raises(UnmergeableAggregate):
+        asyncio.run(Order.objects.group_by(Order.id).having(Order.total.sum() > 1).count(router))
+    with pytest.raises(UnmergeableAggregate):
+        asyncio.run(Order.objects.scalar(router, Order.total))
+
+
+def test_offset_is_applied_by_single_node_router():
+    router, connections = make_router({"a": [{"id": index, "tenant_id": 1, "total": index} for index in range(3)]})
+    result = asyncio.run(Order.objects.order_by(Order.id).limit(2).offset(1).fetch(router))
+    assert [item.id for item in result] == [1, 2]
+    assert connections["a"].queries[0].params == (3,)
+
+
+def test_insert_groups_rows_by_node():
+    queries = Order.objects.build_insert(
+        [{"id": 1, "tenant_id": 1, "total": 1}, {"id": 2, "tenant_id": 2, "total": 1}, {"id": 3, "tenant_id": 3, "total": 1}]
+    )
+    assert [(query.nodes, len(query.params)) for query in queries] == [({"a"}, 6), ({"b"}, 3)]
+
+    with pytest.raises(UndefinedShard):
+        Order.objects.build_insert([{"id": 1, "total": 1}])
+
+
+def test_router_rejects_writes_without_routing():
+    router, _ = make_router({"a": [], "b": []})
+    with pytest.raises(UndefinedShard):
+        asyncio.run(router.execute(Query("DELETE FROM plain")))
+    with pytest.raises(UndefinedShard):
+        asyncio.run(router.fetch(ShardedQuery("SELECT 1", nodes=["c"], readonly=True)))
+
+
+def test_sharded_query_is_immutable_and_picklable():
+    query = Order.objects.filter(Order.tenant_id == 1).order_by(Order.id).build_select()
+    assert pickle.loads(pickle.dumps(query)).nodes == query.nodes
+    with pytest.raises(AttributeError):
+        query.nodes = None
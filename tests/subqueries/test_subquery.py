@@ -0,0 +1,69 @@
+from typing import ClassVar
+
+import pytest
+
+from upy import TableConfig, TableModel, exists, not_exists
+from upy.exceptions import InvalidSubquery
+
+
+class Table(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="table", pk="id")
+    id: int
+    name: str
+
+
+class Other(TableModel):
+    config: ClassVar[TableConfig] = TableConfig(tablename="other", pk="id")
+    id: int
+    table_id: int
+    flag: bool
+
+
+def test_field_in_subquery():
+    condition = Table.id == Other.objects.filter(Other.flag == True).select(Other.table_id)
+    assert condition.sql == "table.id IN (SELECT other.table_id FROM other WHERE other.flag = %s)"
+    assert condition.params == [True]
+
+
+def test_field_not_in_subquery():
+    condition = Table.id != Other.objects.select(Other.table_id)
+    assert condition.sql == "table.id NOT IN (SELECT other.table_id FROM other)"
+
+
+def test_field_compare_scalar_subquery():
+    condition = Table.id > Other.objects.select(Other.table_id.max())
+    assert condition.sql == "table.id > (SELECT max(other.table_id) FROM other)"
+
+
+def test_delete_by_subquery_params_order():
+    subquery = Other.objects.filter(Other.flag == False).select(Other.table_id)
+    query = Table.objects.filter(Table.name == "a").build_delete(Table.id == subquery, Table.name != "b")
+    assert query.sql == (
+        "DELETE FROM table WHERE table.name = %s AND table.id IN "
+        "(SELECT other.table_id FROM other WHERE other.flag = %s) AND table.name <> %s"
+    )
+    assert query.params == ("a", False, "b")
+
+
+def test_exists_correlated_subquery():
+    condition = exists(Other.objects.filter(Other.table_id == Table.id, Other.flag == True).select(Other.id))
+    query = Table.objects.build_delete(condition)
+    assert query.sql == (
+        "DELETE FROM table WHERE EXISTS "
+        "(SELECT other.id FROM other WHERE other.table_id = table.id AND other.flag = %s)"
+    )
+    assert query.params == (True,)
+
+
+def test_not_exists():
+    condition = not_exists(Other.objects.select(Other.id))
+    assert condition.sql == "NOT EXISTS (SELECT other.id FROM other)"
+
+
+def test_comparison_subquery_selects_one_column():
+    with pytest.raises(InvalidSubquery):
+        Table.id == Other.objects.filter(Other.flag == True)  # noqa: E712
+    with pytest.raises(InvalidSubquery):
+        Table.id > Other.objects.select(Other.id, Other.table_id)
+    condition = exists(Other.objects.filter(Other.table_id == Table.id))
+    assert condition.sql.startswith("EXISTS (SELECT other.id, other.table_id, other.flag FROM other")
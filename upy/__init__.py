@@ -1,19 +1,30 @@
 """Init"""
-from upy.builder import QueryBuilder
-from upy.conditions import Condition, ConditionGroup
-from upy.config import TableConfig
-from upy.core import AbstractQueryBuilder
-from upy.expressions import Expression
+from upy.builder import BatchStatement, ExportFormat, QueryBuilder
+from upy.conditions import Condition, ConditionGroup, exists, not_exists
+from upy.config import Relation, TableConfig
+from upy.core import AbstractConnection, AbstractExecutor, AbstractPool, AbstractQueryBuilder
+from upy.expressions import Expression, Subquery
 from upy.fields import TableField
+from upy.session import Session
 from upy.table import TableModel
 
 __all__ = [
     "Condition",
     "ConditionGroup",
     "Expression",
+    "Subquery",
     "TableField",
     "TableConfig",
+    "Relation",
     "TableModel",
     "QueryBuilder",
     "AbstractQueryBuilder",
+    "AbstractExecutor",
+    "AbstractConnection",
+    "AbstractPool",
+    "BatchStatement",
+    "ExportFormat",
+    "Session",
+    "exists",
+    "not_exists",
 ]
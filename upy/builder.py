@@ -1,30 +1,112 @@
 """Query builder"""
+# pylint: disable=too-many-lines
+import copy
+import inspect
+import json
+import os
+import warnings
+import zlib
+from decimal import Decimal
 from enum import Enum
-from typing import Any
+from itertools import chain, repeat
+from typing import Any, Iterable, Iterator, Mapping, Sequence
 
 from upy.conditions.condition import Condition, ConditionGroup
+from upy.conditions.utils import PATTERN_OPERATORS, conjunct_predicates, constrained_values, indexable_fields
 from upy.core.abstract_builder import TM, AbstractQueryBuilder
-from upy.exceptions import UndefinedTable
+from upy.core.abstract_connection import AbstractConnection, AbstractPool
+from upy.core.abstract_executor import AbstractExecutor, Row
+from upy.core.table_model import BaseTableModel
+from upy.exceptions import (
+    ImmutablePrimaryKey,
+    InvalidBatchColumns,
+    InvalidPrefetch,
+    UndefinedPrimaryKey,
+    UndefinedRelation,
+    UndefinedShard,
+    UndefinedTable,
+    UnindexedFilter,
+    UnindexedFilterWarning,
+    UnmergeableAggregate,
+)
 from upy.expressions.expression import Expression
-from upy.fields.field import TableField
-from upy.utils import FilterType, Query, generate_condition_group_by_arguments
+from upy.fields.field import Aggregate, Ordering, TableField
+from upy.session import current_session
+from upy.utils import (
+    BatchQuery,
+    FilterType,
+    Query,
+    ShardedQuery,
+    columns_to_rows,
+    generate_condition_group_by_arguments,
+)
+
+RowType = Mapping[str, Any] | BaseTableModel
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_QUERY_PARAMS = 65535
+GZIP_WBITS = zlib.MAX_WBITS | 16
+MERGEABLE_AGGREGATES = frozenset({"count", "sum", "min", "max", "avg"})
+HIDDEN_COLUMN_PREFIX = "_upy_order_"
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
 
 
 class SqlConstruction(str, Enum):
     """Enum with base SQL constructions"""
 
+    SELECT = "SELECT"
     FROM = "FROM"
+    JOIN = "JOIN"
     TABLE = "TABLE"
     WHERE = "WHERE"
+    GROUP_BY = "GROUP BY"
+    HAVING = "HAVING"
+    ORDER_BY = "ORDER BY"
+    LIMIT = "LIMIT"
+    OFFSET = "OFFSET"
     DELETE = "DELETE"
     UPDATE = "UPDATE"
+    INSERT = "INSERT"
+    INTO = "INTO"
+    VALUES = "VALUES"
+    RETURNING = "RETURNING"
+
+
+class BatchStatement(str, Enum):
+    """Enum with statements supported by batch query building"""
+
+    INSERT = "INSERT"
+    UPDATE = "UPDATE"
+    DELETE = "DELETE"
+
+
+class IndexCheck(str, Enum):
+    """Enum with modes of checking that query filters can use declared indexes"""
 
+    OFF = "off"
+    WARN = "warn"
+    STRICT = "strict"
 
-class QueryBuilder(AbstractQueryBuilder[TM]):
+
+class ExportFormat(str, Enum):
+    """Enum with formats of streamed export"""
+
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class QueryBuilder(AbstractQueryBuilder[TM]):  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """
     Query builder
+    Builder is immutable: every method returns new builder, sharing unchanged state with the previous one.
+    So base builder can be safely reused, for example from module scope by concurrent tasks and threads:
+        active = Table.objects.filter(Table.deleted == None)
+        recent = active.order_by(Table.created.desc()).limit(10)
     """
 
+    # pylint: disable=protected-access,unused-private-member
+    # Derived builders are created by __copy() and their private state is set by the parent method
+
     def __init__(self, table: TM) -> None:
         """
         Initialize QueryBuilder
@@ -32,6 +114,15 @@ class QueryBuilder(AbstractQueryBuilder[TM]):
         """
         self.table: TM = table
         self.__where: ConditionGroup | None = None
+        self.__returning: tuple[TableField | Expression, ...] | None = None
+        self.__select: tuple[TableField | Expression, ...] | None = None
+        self.__joins: tuple[tuple[str, str, Any, Condition | ConditionGroup], ...] = ()
+        self.__prefetch: tuple[str, ...] = ()
+        self.__group_by: tuple[TableField | Expression, ...] = ()
+        self.__having: ConditionGroup | None = None
+        self.__order_by: tuple[TableField | Ordering | Expression, ...] = ()
+        self.__limit: int | None = None
+        self.__offset: int = 0
 
     def filter(self, *args: FilterType) -> "QueryBuilder":
         """
@@ -39,8 +130,172 @@ class QueryBuilder(AbstractQueryBuilder[TM]):
         :param args: Filter arguments
         :return: QueryBuilder
         """
-        self.__update_where_by_arguments(*args)
-        return self
+        if not args:
+            return self
+
+        condition = generate_condition_group_by_arguments(*args)
+        builder = self.__copy()
+        builder.__where = condition if self.__where is None else self.__where & condition
+        return builder
+
+    def select(self, *fields: TableField | Expression) -> "QueryBuilder":
+        """
+        Set selected fields for SELECT query
+        :param fields: Selected fields or expressions. All table fields are selected if fields are not provided
+        :return: QueryBuilder
+        """
+        builder = self.__copy()
+        builder.__select = fields
+        return builder
+
+    def join(self, target: Any, on: Condition | ConditionGroup | None = None) -> "QueryBuilder":
+        """
+        Join table to SELECT query
+        Fields of joined tables are selected as <table>__<field> aliases and hydrated to related models
+        :param target: Relation name from table config or table class
+        :param on: Join condition. Resolved by declared relation if not provided
+        :return: QueryBuilder
+        """
+        builder = self.__copy()
+        builder.__joins = (*self.__joins, self.__resolve_join("JOIN", target, on))
+        return builder
+
+    def left_join(self, target: Any, on: Condition | ConditionGroup | None = None) -> "QueryBuilder":
+        """
+        Left join table to SELECT query
+        Related model is None when there is no joined row
+        :param target: Relation name from table config or table class
+        :param on: Join condition. Resolved by declared relation if not provided
+        :return: QueryBuilder
+        """
+        builder = self.__copy()
+        builder.__joins = (*self.__joins, self.__resolve_join("LEFT JOIN", target, on))
+        return builder
+
+    def prefetch(self, *relations: str) -> "QueryBuilder":
+        """
+        Load related rows for fetched rows with one batched query per relation
+        Related rows are accessible by TableModel.related(<relation name>)
+        :param relations: Relation names from table config
+        :return: QueryBuilder
+        """
+        for relation in relations:
+            if relation not in self.table.config.relations:
+                raise UndefinedRelation(f"Relation '{relation}' is not declared for table '{self.table.sql}'")
+        builder = self.__copy()
+        builder.__prefetch = self.__prefetch + relations
+        return builder
+
+    def group_by(self, *fields: TableField | Expression) -> "QueryBuilder":
+        """
+        Append GROUP BY clause to SELECT query
+        :param fields: Grouping fields or expressions
+        :return: QueryBuilder
+        """
+        builder = self.__copy()
+        builder.__group_by = self.__group_by + fields
+        return builder
+
+    def having(self, *args: FilterType) -> "QueryBuilder":
+        """
+        Update HAVING condition of SELECT query
+        :param args: Condition arguments, for example Table.id.count() > 5
+        :return: QueryBuilder
+        """
+        condition = generate_condition_group_by_arguments(*args)
+        builder = self.__copy()
+        builder.__having = condition if self.__having is None else self.__having & condition
+        return builder
+
+    def order_by(self, *fields: TableField | Ordering | Expression) -> "QueryBuilder":
+        """
+        Append ORDER BY clause to SELECT query
+        :param fields: Fields (ascending order), orderings like Table.id.desc() or expressions
+        :return: QueryBuilder
+        """
+        builder = self.__copy()
+        builder.__order_by = self.__order_by + fields
+        return builder
+
+    def limit(self, limit: int | None) -> "QueryBuilder":
+        """
+        Set LIMIT of SELECT query
+        :param limit: Maximum number of rows, None to remove limit
+        :return: QueryBuilder
+        """
+        builder = self.__copy()
+        builder.__limit = limit
+        return builder
+
+    def offset(self, offset: int) -> "QueryBuilder":
+        """
+        Set OFFSET of SELECT query
+        :param offset: Number of skipped rows
+        :return: QueryBuilder
+        """
+        builder = self.__copy()
+        builder.__offset = offset
+        return builder
+
+    def returning(self, *fields: TableField | Expression) -> "QueryBuilder":
+        """
+        Append RETURNING clause to UPDATE, DELETE and INSERT queries
+        :param fields: Returned fields or expressions. All table fields are returned if fields are not provided
+        :return: QueryBuilder
+        """
+        builder = self.__copy()
+        builder.__returning = fields
+        return builder
+
+    def selected_columns(self) -> int:
+        """
+        Number of columns of SELECT query
+        :return: Int
+        """
+        if self.__select:
+            return len(self.__select)
+        tables = [self.table, *[table for _, _, table, _ in self.__joins]]
+        return sum(len(table.model_fields) for table in tables)
+
+    def build_select(self, *args: FilterType) -> Query:
+        """
+        Build SQL SELECT query
+        :param args: Filter arguments
+        :return: Read-only Query object
+        """
+        builder = self.filter(*args)
+        return builder.__build_select(builder.__select)
+
+    def build_exists(self, *args: FilterType) -> Query:
+        """
+        Build SQL SELECT EXISTS query, checking that at least one row matches filter
+        :param args: Filter arguments
+        :return: Read-only Query object, returning one row with boolean 'value' column
+        """
+        builder = self.filter(*args)
+        select = builder.__build_select([Expression("1")], paginated=False)
+        return builder.__route(Query(sql=f"SELECT EXISTS ({select.sql}) AS value", params=select.params, readonly=True))
+
+    def build_count(self, *args: FilterType, approximate: bool = False) -> Query:
+        """
+        Build SQL query counting matched rows (groups, when group_by() is used)
+        :param args: Filter arguments
+        :param approximate: Build EXPLAIN query, so count is taken from planner row estimate without scanning
+        :return: Read-only Query object
+        """
+        builder = self.filter(*args)
+        if approximate:
+            select = builder.__build_select([Expression("1")], paginated=False)
+            query = Query(sql=f"EXPLAIN (FORMAT JSON) {select.sql}", params=select.params, readonly=True)
+        elif builder.__group_by or builder.__having:
+            select = builder.__build_select([Expression("1")], paginated=False)
+            query = Query(
+                sql=f"SELECT count(*) AS value FROM ({select.sql}) AS counted", params=select.params, readonly=True
+            )
+        else:
+            query = builder.__build_select([Expression("count(*) AS value")], paginated=False)
+
+        return builder.__route(query)
 
     def build_update(self, *args: Condition | Expression, **kwargs: Any) -> Query:
         """
@@ -50,6 +305,7 @@ class QueryBuilder(AbstractQueryBuilder[TM]):
         :param kwargs: Updated fields with values
         :return: Query object
         """
+        self.__check_indexes()
         query: list[str] = [SqlConstruction.UPDATE.value]
         params: list[Condition | ConditionGroup | Expression] = []
 
@@ -57,10 +313,36 @@ class QueryBuilder(AbstractQueryBuilder[TM]):
         query.append("SET")
         query.append(self.__patch_params_for_update(params, *args, **kwargs))
 
-        self.__query_building_pipeline(query, params, [SqlConstruction.WHERE])
+        self.__query_building_pipeline(query, params, [SqlConstruction.WHERE, SqlConstruction.RETURNING])
         result_query = " ".join(query)
 
-        return Query(sql=result_query, params=params)
+        return self.__route(Query(sql=result_query, params=params))
+
+    def build_update_for(self, instance: Any) -> Query | None:
+        """
+        Build SQL UPDATE query of fields changed since instance was loaded. Example:
+            UPDATE table SET table.name = %s WHERE table.id = %s
+        Row is matched by table config pk (and shard key of sharded table)
+        :param instance: Table model instance
+        :return: Query object or None, if nothing changed
+        """
+        pk = self.table.config.pk
+        if not pk:
+            raise UndefinedPrimaryKey("Saving of instance requires table config pk")
+
+        dirty = instance.dirty_fields
+        if pk in dirty:
+            raise ImmutablePrimaryKey(f"Primary key '{pk}' of saved instance can not be changed")
+        if not dirty:
+            return None
+
+        builder = self.filter(getattr(self.table, pk) == getattr(instance, pk))
+        if self.__sharded:
+            shard_key = self.table.config.shard_key
+            builder = builder.filter(getattr(self.table, shard_key) == getattr(instance, shard_key))
+
+        values = {name: getattr(instance, name) for name in self.table.model_fields if name in dirty}
+        return builder.build_update(**values)
 
     def build_delete(self, *args: FilterType, strict: bool = True) -> Query:
         """
@@ -73,30 +355,948 @@ class QueryBuilder(AbstractQueryBuilder[TM]):
         query: list[str] = [SqlConstruction.DELETE.value]
         params: list[Condition | ConditionGroup | Expression] = []
 
-        self.__update_where_by_arguments(*args)
+        builder = self.filter(*args)
+        builder.__check_indexes()
 
-        if not strict and self.__where is None:
-            self.__where = ConditionGroup(Condition("true"))
+        if not strict and builder.__where is None:
+            builder = builder.__copy()
+            builder.__where = ConditionGroup(Condition("true"))
 
-        self.__query_building_pipeline(query, params, [SqlConstruction.FROM, SqlConstruction.WHERE])
+        builder.__query_building_pipeline(
+            query, params, [SqlConstruction.FROM, SqlConstruction.WHERE, SqlConstruction.RETURNING]
+        )
         result_query = " ".join(query)
 
-        return Query(sql=result_query, params=params)
+        return builder.__route(Query(sql=result_query, params=params))
+
+    def build_export(
+        self,
+        fmt: ExportFormat | str = ExportFormat.CSV,
+        columns: Sequence[TableField | Expression] | None = None,
+        header: bool = True,
+    ) -> Query:
+        """
+        Build COPY query, streaming result of SELECT query in text format. Example:
+            COPY (SELECT table.id, table.name FROM table WHERE table.id > %s) TO STDOUT WITH (FORMAT csv, HEADER)
+        NDJSON rows are built by row_to_json() on the server and written in CSV format with quote and delimiter
+        characters, which never appear in JSON text, so lines are not escaped
+        :param fmt: Export format, csv or ndjson
+        :param columns: Exported fields or expressions, selected fields are used if not provided
+        :param header: Write header line with column names (CSV only)
+        :return: Read-only Query object
+        """
+        builder = self.select(*columns) if columns else self
+        select = builder.__build_select(builder.__select, merged=False)
+        if ExportFormat(fmt) == ExportFormat.NDJSON:
+            sql = (
+                f"COPY (SELECT row_to_json(exported) FROM ({select.sql}) AS exported) "
+                "TO STDOUT WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+            )
+        else:
+            sql = f"COPY ({select.sql}) TO STDOUT WITH (FORMAT csv{', HEADER' if header else ''})"
+        return Query(sql=sql, params=select.params, readonly=True)
+
+    def build_insert(self, rows: Sequence[RowType], chunk_size: int = DEFAULT_CHUNK_SIZE) -> list[Query]:
+        """
+        Build chunked multi-row SQL INSERT queries
+        :param rows: Mappings of field name to value or table model instances
+        :param chunk_size: Maximum number of rows per query
+        :return: List of Query objects
+        """
+        queries: list[Query] = []
+        for nodes, names, chunk in self.__chunk_rows(rows, chunk_size):
+            query: list[str] = [self.__build_insert(names, len(chunk))]
+            params: list[Any] = list(chain.from_iterable(chunk))
+
+            self.__query_building_pipeline(query, params, [SqlConstruction.RETURNING])
+            queries.append(self.__route(Query(sql=" ".join(query), params=params), nodes=nodes))
+
+        return queries
+
+    def build_upsert(  # pylint: disable=too-many-arguments
+        self,
+        rows: Sequence[RowType],
+        *,
+        conflict: Sequence[TableField] | None = None,
+        update: Sequence[TableField] | None = None,
+        where: Condition | ConditionGroup | None = None,
+        do_nothing: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> list[Query]:
+        """
+        Build chunked multi-row SQL INSERT ... ON CONFLICT queries
+        Updated fields take new values via EXCLUDED references, use TableField.excluded() in conditions
+        :param rows: Mappings of field name to value or table model instances
+        :param conflict: Conflict target fields, table config pk by default
+        :param update: Fields updated on conflict, all inserted fields except conflict target by default
+        :param where: Condition for the update branch
+        :param do_nothing: Use DO NOTHING on conflict
+        :param chunk_size: Maximum number of rows per query
+        :return: List of Query objects
+        """
+        if conflict is None:
+            if not self.table.config.pk:
+                raise UndefinedPrimaryKey("Upsert requires conflict fields or table config pk")
+            conflict = [getattr(self.table, self.table.config.pk)]
+
+        conflict_names = [field.name for field in conflict]
+        queries: list[Query] = []
+        for nodes, names, chunk in self.__chunk_rows(rows, chunk_size):
+            query: list[str] = [self.__build_insert(names, len(chunk)), f"ON CONFLICT ({', '.join(conflict_names)})"]
+            params: list[Any] = list(chain.from_iterable(chunk))
+
+            updated = [field.name for field in update] if update is not None else [
+                name for name in names if name not in conflict_names
+            ]
+            if do_nothing or not updated:
+                query.append("DO NOTHING")
+            else:
+                query.append(f"DO UPDATE SET {', '.join(f'{name} = EXCLUDED.{name}' for name in updated)}")
+                if where is not None:
+                    query.extend([SqlConstruction.WHERE.value, where.sql])
+                    params.extend(where.params)
+
+            self.__query_building_pipeline(query, params, [SqlConstruction.RETURNING])
+            queries.append(self.__route(Query(sql=" ".join(query), params=params), nodes=nodes))
+
+        return queries
+
+    def build_batch(
+        self,
+        columns: Mapping[TableField, Sequence[Any]],
+        statement: BatchStatement = BatchStatement.INSERT,
+        key: Sequence[TableField] | None = None,
+    ) -> BatchQuery:
+        """
+        Build one SQL query for columnar data with a matrix of parameters (row per execution)
+        Result is ready for executemany or COPY. Columns can be lists, tuples or numpy arrays.
+            INSERT - all columns are inserted
+            UPDATE - key columns (pk by default) are used in WHERE clause, other columns are updated
+            DELETE - key columns (all columns by default) are used in WHERE clause
+        Where clause from filter() is appended to UPDATE and DELETE, its parameters are repeated for every row
+        :param columns: Mapping of table field to column values
+        :param statement: Statement shape
+        :param key: Fields used to match rows for UPDATE and DELETE
+        :return: BatchQuery object
+        """
+        if not columns:
+            raise InvalidBatchColumns("Batch query requires at least one column")
+
+        fields = list(columns.keys())
+        values = {field.alias: column for field, column in columns.items()}
+        if len({len(column) for column in columns.values()}) != 1:
+            raise InvalidBatchColumns("Batch query columns must have the same length")
+
+        if statement == BatchStatement.INSERT:
+            sql = self.__build_insert([field.name for field in fields])
+            return BatchQuery(sql=sql, params=columns_to_rows(*columns.values()))
+
+        key_fields = self.__resolve_batch_key(fields, statement, key)
+        key_aliases = {field.alias for field in key_fields}
+        set_fields = [field for field in fields if field.alias not in key_aliases]
+        if statement == BatchStatement.UPDATE and not set_fields:
+            raise InvalidBatchColumns("Batch UPDATE requires at least one column besides key columns")
+
+        query: list[str] = []
+        params: list[Any] = []
+        if statement == BatchStatement.UPDATE:
+            query.append(SqlConstruction.UPDATE.value)
+            self.__query_building_pipeline(query, params, [SqlConstruction.TABLE])
+            query.extend(["SET", ", ".join(f"{field.alias} = %s" for field in set_fields)])
+        else:
+            query.append(SqlConstruction.DELETE.value)
+            self.__query_building_pipeline(query, params, [SqlConstruction.FROM])
+
+        where = ConditionGroup()
+        for field in key_fields:
+            where &= Condition(f"{field.alias} = %s")
+        if self.__where:
+            where &= self.__where
+
+        query.extend([SqlConstruction.WHERE.value, where.sql])
+        rows = columns_to_rows(
+            *[repeat(param) for param in params],
+            *[values[field.alias] for field in set_fields + key_fields],
+            *[repeat(param) for param in where.params],
+        )
+        return BatchQuery(sql=" ".join(query), params=rows)
+
+    async def fetch(self, executor: AbstractExecutor, *args: FilterType) -> list[Any]:
+        """
+        Execute SQL SELECT query
+        Lookup by primary key is served from identity map of the active session without query,
+        when all requested rows are already loaded
+        :param executor: Query executor
+        :param args: Filter arguments
+        :return: Hydrated rows
+        """
+        if args:
+            return await self.filter(*args).fetch(executor)
+        cached = self.__identity_lookup()
+        if cached is not None:
+            return cached
+
+        result = self.hydrate(await executor.fetch(self.build_select()))
+        for relation in self.__prefetch:
+            await self.__prefetch_relation(executor, relation, result)
+        return result
+
+    async def aggregate(self, executor: AbstractExecutor, **aggregates: TableField | Expression) -> dict[Any, Any]:
+        """
+        Execute aggregate SELECT query. Example:
+            await Table.objects.filter(...).aggregate(executor, total=Table.id.count(), amount=Table.amount.sum())
+        :param executor: Query executor
+        :param aggregates: Named aggregate expressions
+        :return: Mapping of name to value. With group_by() - mapping of group key (value or tuple of values
+            for multiple grouping fields) to mapping of name to value
+        """
+        if self.__fan_out():
+            return await self.__aggregate_nodes(executor, aggregates)
+
+        fields = [self.__label(field, f"group_{index}") for index, field in enumerate(self.__group_by)]
+        fields.extend(self.__label(value, name) for name, value in aggregates.items())
+        rows = await executor.fetch(self.__build_select(list(fields)))
+
+        if not self.__group_by:
+            return {name: rows[0][name] if rows else None for name in aggregates}
+
+        result: dict[Any, Any] = {}
+        for row in rows:
+            key = tuple(row[f"group_{index}"] for index in range(len(self.__group_by)))
+            result[key[0] if len(key) == 1 else key] = {name: row[name] for name in aggregates}
+        return result
+
+    async def scalar(self, executor: AbstractExecutor, expression: TableField | Expression) -> Any:
+        """
+        Execute SELECT query returning single value, for example Table.amount.sum()
+        :param executor: Query executor
+        :param expression: Selected expression
+        :return: Value of the first row or None
+        """
+        if self.__fan_out():
+            if self.__group_by:
+                raise UnmergeableAggregate("Scalar of grouped query can not be merged from multiple database nodes")
+            return (await self.__aggregate_nodes(executor, {"value": expression}))["value"]
+
+        rows = await executor.fetch(self.__build_select([self.__label(expression, "value")]))
+        return rows[0]["value"] if rows else None
+
+    async def exists(self, executor: AbstractExecutor, *args: FilterType) -> bool:
+        """
+        Check that at least one row matches filter
+        :param executor: Query executor
+        :param args: Filter arguments
+        :return: Bool
+        """
+        rows = await executor.fetch(self.build_exists(*args))
+        return any(row["value"] for row in rows)
+
+    async def count(self, executor: AbstractExecutor, *args: FilterType, approximate: bool = False) -> int:
+        """
+        Count rows matching filter. Counts of multiple rows (sharded tables) are summed
+        Approximate count reads planner row estimate instead of scanning, so it is fast for huge tables,
+        but precision depends on table statistics
+        :param executor: Query executor
+        :param args: Filter arguments
+        :param approximate: Use planner row estimate
+        :return: Number of rows
+        """
+        builder = self.filter(*args)
+        if not approximate and builder.__group_by and builder.__fan_out():
+            return len(await builder.__aggregate_nodes(executor, {}))
+
+        rows = await executor.fetch(builder.build_count(approximate=approximate))
+        if not approximate:
+            return sum(int(row["value"]) for row in rows)
+
+        total = 0
+        for row in rows:
+            plan = next(iter(row.values()))
+            if isinstance(plan, (str, bytes)):
+                plan = json.loads(plan)
+            total += int(plan[0]["Plan"]["Plan Rows"])
+        return total
+
+    async def update(self, executor: AbstractExecutor, *args: Condition | Expression, **kwargs: Any) -> list[Any]:
+        """
+        Execute SQL UPDATE query
+        :param executor: Query executor
+        :param args: Updated fields as Condition or Expression
+        :param kwargs: Updated fields with values
+        :return: Returned rows, when returning() is used
+        """
+        return await self.__run(executor, [self.build_update(*args, **kwargs)])
+
+    async def save(self, executor: AbstractExecutor, instance: Any) -> bool:
+        """
+        Execute SQL UPDATE query of fields changed since instance was loaded and mark saved fields clean
+        Fields assigned while the query is executed stay changed
+        :param executor: Query executor
+        :param instance: Table model instance
+        :return: True if UPDATE query was executed, False if nothing changed
+        """
+        query = self.build_update_for(instance)
+        if query is None:
+            return False
+
+        saved = {name: getattr(instance, name) for name in instance.dirty_fields}
+        await executor.execute(query)
+        instance.mark_clean(saved)
+        return True
+
+    async def delete(self, executor: AbstractExecutor, *args: FilterType, strict: bool = True) -> list[Any]:
+        """
+        Execute SQL DELETE query
+        :param executor: Query executor
+        :param args: Filter arguments
+        :param strict: Strict False used to set 'WHERE = true' to prevent PostgreSQL warning on deleting all data
+        :return: Returned rows, when returning() is used
+        """
+        return await self.__run(executor, [self.build_delete(*args, strict=strict)])
+
+    async def export(  # pylint: disable=too-many-arguments
+        self,
+        executor: AbstractConnection | AbstractPool,
+        output: Any,
+        *,
+        fmt: ExportFormat | str = ExportFormat.CSV,
+        columns: Sequence[TableField | Expression] | None = None,
+        header: bool = True,
+        compress: bool = False,
+    ) -> int:
+        """
+        Stream result of SELECT query by COPY ... TO STDOUT to the output. Example:
+            with open("table.csv.gz", "wb") as file:
+                await Table.objects.filter(...).export(pool, file, columns=[Table.id, Table.name], compress=True)
+        Output chunks are written as they are received, rows are not hydrated, so memory usage does not depend
+        on the number of exported rows
+        :param executor: Connection or pool supporting COPY
+        :param output: Binary file-like object or async writer. Awaitable result of write() is awaited,
+            drain() of stream writers is awaited after every chunk
+        :param fmt: Export format, csv or ndjson
+        :param columns: Exported fields or expressions, selected fields are used if not provided
+        :param header: Write header line with column names (CSV only)
+        :param compress: Compress output by gzip
+        :return: Number of written bytes
+        """
+        query = self.build_export(fmt, columns, header)
+        compressor = zlib.compressobj(wbits=GZIP_WBITS) if compress else None
+        written = 0
+        async for chunk in executor.copy_out(query):
+            written += await self.__write(output, compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            written += await self.__write(output, compressor.flush())
+        return written
+
+    async def insert(
+        self, executor: AbstractExecutor, rows: Sequence[RowType], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> list[Any]:
+        """
+        Execute chunked SQL INSERT queries
+        :param executor: Query executor
+        :param rows: Mappings of field name to value or table model instances
+        :param chunk_size: Maximum number of rows per query
+        :return: Returned rows, when returning() is used
+        """
+        return await self.__run(executor, self.build_insert(rows, chunk_size=chunk_size))
+
+    async def upsert(self, executor: AbstractExecutor, rows: Sequence[RowType], **kwargs: Any) -> list[Any]:
+        """
+        Execute chunked SQL INSERT ... ON CONFLICT queries
+        :param executor: Query executor
+        :param rows: Mappings of field name to value or table model instances
+        :param kwargs: Upsert options, see build_upsert()
+        :return: Returned rows, when returning() is used
+        """
+        return await self.__run(executor, self.build_upsert(rows, **kwargs))
+
+    def hydrate(self, rows: list[Row]) -> list[Any]:
+        """
+        Build result objects from fetched rows
+        Rows containing all table fields are hydrated to table model instances, other rows are returned as is
+        Rows of joined one-to-many relation are gathered into the list of related instances of the same parent
+        Instances are deduplicated into identity map of the active session
+        :param rows: Fetched rows
+        :return: List of table model instances or rows
+        """
+        if not rows:
+            return rows
+
+        if not self.__joins:
+            fields = self.table.model_fields.keys()
+            if not fields <= rows[0].keys():
+                return rows
+            return [
+                self.__identify(self.table.model_construct(**{field: row[field] for field in fields})) for row in rows
+            ]
+
+        if self.__select:
+            return rows
+
+        relations = self.table.config.relations
+        many = {name for _, name, _, _ in self.__joins if name in relations and relations[name].many}
+        pk = self.table.config.pk
+        parents: dict[Any, Any] = {}
+        result: list[Any] = []
+        for row in rows:
+            instance = self.__identify(self.__construct_prefixed(self.table, row))
+            key = getattr(instance, pk) if pk and many else None
+            if key is not None and key in parents:
+                instance = parents[key]
+            else:
+                if key is not None:
+                    parents[key] = instance
+                instance._related.update({name: [] for name in many})  # pylint: disable=protected-access
+                result.append(instance)
+
+            loaded = instance._related  # pylint: disable=protected-access
+            for _, name, target, _ in self.__joins:
+                related = self.__identify(self.__construct_prefixed(target, row))
+                if name not in many:
+                    loaded[name] = related
+                elif related is not None and related not in loaded[name]:
+                    loaded[name].append(related)
+        return result
+
+    @staticmethod
+    def __identify(instance: Any) -> Any:
+        """
+        Deduplicate hydrated instance into identity map of the active session
+        :param instance: Table model instance or None
+        :return: Instance from identity map or provided instance, if there is no active session
+        """
+        session = current_session()
+        if session is None or instance is None:
+            return instance
+        return session.add(instance)
+
+    def __identity_lookup(self) -> list[Any] | None:
+        """
+        Resolve rows of primary key lookup from identity map of the active session
+        Only plain filter by primary key (pk = value or pk IN values) is resolved
+        :return: List of table model instances or None, if query should be executed
+        """
+        session = current_session()
+        pk = self.table.config.pk
+        if session is None or not pk or self.__where is None:
+            return None
+
+        modifiers = [self.__joins, self.__select, self.__prefetch, self.__group_by, self.__having, self.__order_by]
+        if any(modifiers) or self.__limit is not None or self.__offset:
+            return None
+
+        operands = self.__where.operands
+        if len(operands) != 1 or not isinstance(operands[0], Condition):
+            return None
+
+        keys = constrained_values(operands[0], f"{self.table.sql}.{pk}")
+        if keys is None:
+            return None
+
+        instances = [session.get(self.table, key) for key in keys]
+        if any(instance is None for instance in instances):
+            return None
+        return instances
+
+    def __build_select(
+        self, fields: Sequence[TableField | Expression] | None, paginated: bool = True, merged: bool = True
+    ) -> Query:
+        """
+        Build SQL SELECT query with provided selected fields
+        For sharded table queried on multiple nodes OFFSET is applied after merging results,
+        so every node returns LIMIT + OFFSET rows. ORDER BY items, that are not selected as plain columns,
+        are selected additionally under hidden names to merge results by them
+        :param fields: Selected fields or expressions
+        :param paginated: Append ORDER BY, LIMIT and OFFSET clauses
+        :param merged: Results of multiple nodes are merged by the router
+        :return: Read-only Query object
+        """
+        self.__check_indexes()
+        fan_out = paginated and self.__fan_out()
+        ordering, hidden = self.__result_ordering(fields) if paginated else ([], {})
+        if fan_out and merged and hidden:
+            fields = [*(fields or self.__all_fields()), *hidden.values()]
+
+        params: list[Any] = []
+        query: list[str] = [SqlConstruction.SELECT.value, self.__render_fields(params, fields)]
+
+        self.__query_building_pipeline(
+            query,
+            params,
+            [
+                SqlConstruction.FROM,
+                SqlConstruction.JOIN,
+                SqlConstruction.WHERE,
+                SqlConstruction.GROUP_BY,
+                SqlConstruction.HAVING,
+            ],
+        )
+        if not paginated:
+            return Query(sql=" ".join(query), params=params, readonly=True)
+
+        limit, offset = self.__limit, self.__offset
+        if fan_out:
+            limit, offset = (None if limit is None else limit + offset), 0
 
-    def __update_where_by_arguments(self, *args: FilterType) -> None:
+        if self.__order_by:
+            query.extend([SqlConstruction.ORDER_BY.value, self.__render_fields(params, self.__order_by, aliased=False)])
+        if limit is not None:
+            query.extend([SqlConstruction.LIMIT.value, "%s"])
+            params.append(limit)
+        if offset:
+            query.extend([SqlConstruction.OFFSET.value, "%s"])
+            params.append(offset)
+
+        return self.__route(
+            Query(sql=" ".join(query), params=params, readonly=True),
+            ordering=ordering,
+            limit=self.__limit,
+            offset=self.__offset if fan_out else 0,
+            hidden=hidden if fan_out and merged else (),
+        )
+
+    def __check_indexes(self) -> None:
         """
-        Update where clause with provided condition arguments
-        :param args: Any condition expression
+        Check that where condition can use primary key or one of declared indexes, when index check is enabled
+        Index is usable when its leading column is compared by operator served by the index in every matched row
+        and predicates of partial index are part of the condition. LIKE is served only by text_pattern_ops index
+        or by plain index of the table with C or POSIX collation
         :return: None
         """
-        if not args:
+        config = self.table.config
+        if config.index_check == IndexCheck.OFF or self.__where is None:
             return
 
-        condition = generate_condition_group_by_arguments(*args)
-        if not self.__where:
-            self.__where = condition
+        fields = indexable_fields(self.__where, like=config.binary_collation)
+        pattern_fields = indexable_fields(self.__where, PATTERN_OPERATORS, like=True)
+        predicates = conjunct_predicates(self.__where)
+        candidates = [(index.columns, index.where, index.pattern_ops) for index in config.indexes]
+        if config.pk:
+            candidates.append(([config.pk], None, False))
+
+        for columns, where, pattern_ops in candidates:
+            partial = where is None or all(predicate in predicates for predicate in conjunct_predicates(where))
+            if partial and f"{self.table.sql}.{columns[0]}" in (pattern_fields if pattern_ops else fields):
+                return
+
+        message = f"Filter of table '{self.table.sql}' can not use any declared index: {self.__where.sql}"
+        if config.index_check == IndexCheck.STRICT:
+            raise UnindexedFilter(message)
+        warnings.warn(message, UnindexedFilterWarning, stacklevel=self.__caller_stacklevel())
+
+    @staticmethod
+    def __caller_stacklevel() -> int:
+        """
+        Stack level of the first frame outside of the package, so warnings point to the code calling
+        the public method (build_select(), fetch(), update() and others) regardless of the call depth
+        :return: Stack level for warnings.warn() called by the caller of this method
+        """
+        level = 0
+        frame = inspect.currentframe()
+        while frame is not None and os.path.abspath(frame.f_code.co_filename).startswith(PACKAGE_DIR):
+            frame = frame.f_back
+            level += 1
+        return level
+
+    @property
+    def __sharded(self) -> bool:
+        """
+        Table rows are split across database nodes
+        :return: Bool
+        """
+        return self.table.config.shards is not None and self.table.config.shard_key is not None
+
+    def __fan_out(self) -> bool:
+        """
+        Query of sharded table is executed on multiple database nodes
+        :return: Bool
+        """
+        if not self.__sharded:
+            return False
+        nodes = self.__shard_nodes()
+        return nodes is None or len(nodes) > 1
+
+    async def __aggregate_nodes(
+        self, executor: AbstractExecutor, aggregates: Mapping[str, TableField | Expression]
+    ) -> dict[Any, Any]:
+        """
+        Execute aggregate query on multiple database nodes and merge partial results of the same group:
+        count and sum are summed, min and max are reduced, avg is computed from merged sum and count
+        :param executor: Query executor
+        :param aggregates: Named aggregate expressions
+        :return: Mapping of name to value or mapping of group key to mapping of name to value, as aggregate()
+        """
+        if self.__having or self.__limit is not None or self.__offset:
+            raise UnmergeableAggregate("HAVING, LIMIT and OFFSET can not be applied to partial aggregates of nodes")
+
+        fields = [self.__label(field, f"group_{index}") for index, field in enumerate(self.__group_by)]
+        functions: dict[str, str] = {}
+        for name, value in aggregates.items():
+            if not isinstance(value, Aggregate) or value.distinct or value.function not in MERGEABLE_AGGREGATES:
+                raise UnmergeableAggregate(f"Aggregate '{name}' can not be merged from multiple database nodes")
+            if value.function == "avg":
+                functions[f"{name}__sum"], functions[f"{name}__count"] = "sum", "count"
+                fields.append(self.__label(value.field.sum(), f"{name}__sum"))
+                fields.append(self.__label(value.field.count(), f"{name}__count"))
+            else:
+                functions[name] = value.function
+                fields.append(self.__label(value, name))
+
+        groups: dict[tuple[Any, ...], Row] = {}
+        for row in await executor.fetch(self.__route(self.__build_select(fields, paginated=False))):
+            key = tuple(row[f"group_{index}"] for index in range(len(self.__group_by)))
+            merged = groups.setdefault(key, {})
+            for column, function in functions.items():
+                merged[column] = self.__merge_aggregate(function, merged.get(column), row[column])
+
+        result: dict[Any, Any] = {}
+        for key, merged in groups.items():
+            values = {}
+            for name, value in aggregates.items():
+                if isinstance(value, Aggregate) and value.function == "avg":
+                    values[name] = self.__average(merged[f"{name}__sum"], merged[f"{name}__count"])
+                else:
+                    values[name] = merged[name]
+            result[key[0] if len(key) == 1 else key] = values
+
+        if not self.__group_by:
+            return result.get((), {name: None for name in aggregates})
+        return result
+
+    @staticmethod
+    def __merge_aggregate(function: str, merged: Any, value: Any) -> Any:
+        """
+        Merge partial aggregate value of the node, NULL values are skipped as by SQL aggregates
+        :param function: Aggregate function name
+        :param merged: Value merged from previous nodes
+        :param value: Value of the node
+        :return: Merged value
+        """
+        if merged is None or value is None:
+            return value if merged is None else merged
+        if function in ("count", "sum"):
+            return merged + value
+        return min(merged, value) if function == "min" else max(merged, value)
+
+    @staticmethod
+    def __average(total: Any, number: int) -> Any:
+        """
+        Average of merged sum and count. Integer sum is averaged as numeric, as avg() of integers in PostgreSQL
+        :param total: Merged sum
+        :param number: Merged count
+        :return: Average or None, if there are no values
+        """
+        if not number:
+            return None
+        return (Decimal(total) if isinstance(total, int) else total) / number
+
+    def __shard_nodes(self) -> frozenset[str] | None:
+        """
+        Resolve database nodes by shard key values constrained in where condition
+        :return: Set of node names or None, if all nodes should be queried (or table is not sharded)
+        """
+        if not self.__sharded or not self.__where:
+            return None
+
+        config = self.table.config
+        values = constrained_values(self.__where, f"{self.table.sql}.{config.shard_key}")
+        if values is None:
+            return None
+        return frozenset(config.shards.resolve(value) for value in values)
+
+    def __route(  # pylint: disable=too-many-arguments
+        self,
+        query: Query,
+        nodes: frozenset[str] | None = None,
+        ordering: list[tuple[str, bool]] | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+        hidden: Iterable[str] = (),
+    ) -> Query:
+        """
+        Attach routing information to the query of sharded table
+        :param query: Built query
+        :param nodes: Known database nodes. Resolved by where condition if not provided
+        :param ordering: Result column names with descending flag
+        :param limit: Maximum number of rows in merged result
+        :param offset: Number of rows skipped in merged result
+        :param hidden: Result column names, selected only to merge results and removed from merged rows
+        :return: Query or ShardedQuery object
+        """
+        if not self.__sharded:
+            return query
+
+        return ShardedQuery(
+            query.sql,
+            query.params,
+            readonly=query.readonly,
+            nodes=nodes if nodes is not None else self.__shard_nodes(),
+            ordering=ordering or (),
+            limit=limit,
+            offset=offset,
+            hidden=hidden,
+        )
+
+    def __result_ordering(
+        self, fields: Sequence[TableField | Expression] | None
+    ) -> tuple[list[tuple[str, bool]], dict[str, Expression]]:
+        """
+        Result column names of ORDER BY items with descending flag
+        Expressions, aggregates and fields, that are not selected, can not be resolved to the result column,
+        so they are labeled with hidden column names
+        :param fields: Selected fields or expressions. All table fields are selected if not provided
+        :return: List of column names with descending flag and hidden labeled expressions by column name
+        """
+        selected = {self.__result_column(field) for field in fields or self.__all_fields()}
+        ordering: list[tuple[str, bool]] = []
+        hidden: dict[str, Expression] = {}
+        for item in self.__order_by:
+            field, descending = (item.field, item.descending) if isinstance(item, Ordering) else (item, False)
+            column = self.__result_column(field)
+            if column is None or column not in selected:
+                column = f"{HIDDEN_COLUMN_PREFIX}{len(hidden)}"
+                hidden[column] = self.__label(field, column)
+            ordering.append((column, descending))
+        return ordering, hidden
+
+    def __result_column(self, field: TableField | Expression) -> str | None:
+        """
+        Result column name of plain table field
+        :param field: Field or expression
+        :return: Column name or None for expressions and aggregates
+        """
+        if not isinstance(field, TableField) or isinstance(field, Aggregate):
+            return None
+        return f"{field.prefix}__{field.name}" if self.__joins else field.name
+
+    def __all_fields(self) -> list[TableField]:
+        """
+        Fields of the table and joined tables, selected by default
+        :return: List of fields
+        """
+        tables = [self.table, *[table for _, _, table, _ in self.__joins]]
+        return [getattr(table, name) for table in tables for name in table.model_fields]
+
+    def __label(self, field: TableField | Expression, name: str) -> Expression:
+        """
+        Alias field or expression for SELECT clause
+        :param field: Field or expression
+        :param name: Alias name
+        :return: Expression object
+        """
+        params: list[Any] = []
+        return Expression(f"{self.__render_fields(params, [field], aliased=False)} AS {name}", *params)
+
+    @staticmethod
+    def __construct_prefixed(table: Any, row: Row) -> Any:
+        """
+        Build table model from row values aliased as <table>__<field>
+        :param table: TableModel class
+        :param row: Fetched row
+        :return: Table model instance or None, if all values are NULL (no row in left join)
+        """
+        values = {field: row[f"{table.sql}__{field}"] for field in table.model_fields}
+        if all(value is None for value in values.values()):
+            return None
+        return table.model_construct(**values)
+
+    async def __prefetch_relation(self, executor: AbstractExecutor, name: str, rows: list[Any]) -> None:
+        """
+        Load related rows for all fetched rows by batched queries and attach them to fetched rows
+        Related rows are attached to table model instances, selected rows get them by relation name key
+        :param executor: Query executor
+        :param name: Relation name
+        :param rows: Fetched table model instances or selected rows
+        :return: None
+        """
+        relation = self.table.config.relations[name]
+        parent_keys = [self.__relation_key(row, name, relation.field) for row in rows]
+        keys = [key for key in dict.fromkeys(parent_keys) if key is not None]
+
+        grouped: dict[Any, list[Any]] = {}
+        for start in range(0, len(keys), DEFAULT_CHUNK_SIZE):
+            for child in await self.__fetch_related(executor, relation, keys[start:start + DEFAULT_CHUNK_SIZE]):
+                grouped.setdefault(getattr(child, relation.remote), []).append(child)
+
+        for row, key in zip(rows, parent_keys):
+            children = grouped.get(key, [])
+            related = children if relation.many else next(iter(children), None)
+            if isinstance(row, dict):
+                row[name] = related
+            else:
+                row._related[name] = related  # pylint: disable=protected-access
+
+    @staticmethod
+    async def __fetch_related(executor: AbstractExecutor, relation: Any, keys: list[Any]) -> list[Any]:
+        """
+        Fetch related rows by chunk of relation keys
+        :param executor: Query executor
+        :param relation: Relation from table config
+        :param keys: Values of relation key field
+        :return: List of related table model instances
+        """
+        target = relation.target
+        return await target.objects.fetch(executor, getattr(target, relation.remote) == keys)
+
+    def __relation_key(self, row: Any, name: str, field: str) -> Any:
+        """
+        Value of the relation key field of fetched row
+        :param row: Table model instance or selected row
+        :param name: Relation name
+        :param field: Relation key field name
+        :return: Key value
+        """
+        if not isinstance(row, dict):
+            return getattr(row, field)
+
+        column = f"{self.table.sql}__{field}" if self.__joins else field
+        if column not in row:
+            raise InvalidPrefetch(f"Relation '{name}' can not be prefetched: field '{field}' is not selected")
+        return row[column]
+
+    def __resolve_join(
+        self, kind: str, target: Any, on: Condition | ConditionGroup | None
+    ) -> tuple[str, str, Any, Condition | ConditionGroup]:
+        """
+        Resolve joined table and join condition
+        :param kind: Join type
+        :param target: Relation name from table config or table class
+        :param on: Join condition
+        :return: Join type, relation name, joined table and join condition
+        """
+        relations = self.table.config.relations
+        if isinstance(target, str):
+            if target not in relations:
+                raise UndefinedRelation(f"Relation '{target}' is not declared for table '{self.table.sql}'")
+            name, relation = target, relations[target]
+        else:
+            matched = [(key, value) for key, value in relations.items() if value.target is target]
+            if not matched and on is None:
+                raise UndefinedRelation(f"Table '{target.sql}' has no declared relation with '{self.table.sql}'")
+            name, relation = matched[0] if matched else (target.sql, None)
+
+        table = relation.target if relation is not None else target
+        if on is None:
+            on = getattr(self.table, relation.field) == getattr(table, relation.remote)
+        return kind, name, table, on
+
+    async def __run(self, executor: AbstractExecutor, queries: list[Query]) -> list[Any]:
+        """
+        Execute queries, fetching and hydrating result rows if RETURNING clause is used
+        :param executor: Query executor
+        :param queries: Built queries
+        :return: Hydrated rows
+        """
+        if self.__returning is None:
+            for query in queries:
+                await executor.execute(query)
+            return []
+
+        rows: list[Row] = []
+        for query in queries:
+            rows.extend(await executor.fetch(query))
+        return self.hydrate(rows)
+
+    def __build_insert(self, names: list[str], rows: int = 1) -> str:
+        """
+        Build SQL INSERT query with placeholders for provided number of rows
+        :param names: Inserted field names
+        :param rows: Number of inserted rows
+        :return: SQL-string
+        """
+        if not self.table:
+            raise UndefinedTable()
+
+        row = f"({', '.join('%s' for _ in names)})"
+        return (
+            f"{SqlConstruction.INSERT.value} {SqlConstruction.INTO.value} {self.table.sql} ({', '.join(names)}) "
+            f"{SqlConstruction.VALUES.value} {', '.join(row for _ in range(rows))}"
+        )
+
+    def __chunk_rows(
+        self, rows: Sequence[RowType], chunk_size: int
+    ) -> Iterator[tuple[frozenset[str] | None, list[str], list[list[Any]]]]:
+        """
+        Split rows to chunks of values, respecting the limit of parameters per query
+        Rows of sharded table are grouped by database node of their shard key
+        :param rows: Mappings of field name to value or table model instances
+        :param chunk_size: Maximum number of rows per chunk
+        :return: Iterator of database nodes, field names and chunk of row values
+        """
+        values = [row.model_dump() if isinstance(row, BaseTableModel) else dict(row) for row in rows]
+        if not values or not values[0]:
+            raise InvalidBatchColumns("Insert query requires at least one row with values")
+
+        names = list(values[0].keys())
+        if any(value.keys() != values[0].keys() for value in values):
+            raise InvalidBatchColumns("Inserted rows must have the same fields")
+
+        groups: dict[frozenset[str] | None, list[dict[str, Any]]] = {None: values}
+        if self.__sharded:
+            config = self.table.config
+            if config.shard_key not in names:
+                raise UndefinedShard(f"Inserted rows of sharded table must contain '{config.shard_key}' field")
+            groups = {}
+            for value in values:
+                groups.setdefault(frozenset([config.shards.resolve(value[config.shard_key])]), []).append(value)
+
+        size = max(1, min(chunk_size, MAX_QUERY_PARAMS // len(names)))
+        for nodes, group in groups.items():
+            for start in range(0, len(group), size):
+                yield nodes, names, [[value[name] for name in names] for value in group[start:start + size]]
+
+    def __resolve_batch_key(
+        self, fields: list[TableField], statement: BatchStatement, key: Sequence[TableField] | None
+    ) -> list[TableField]:
+        """
+        Resolve key fields for batch UPDATE and DELETE queries
+        :param fields: Provided column fields
+        :param statement: Statement shape
+        :param key: Explicitly provided key fields
+        :return: List of key fields
+        """
+        if key is not None:
+            key_fields = list(key)
+        elif statement == BatchStatement.DELETE:
+            key_fields = fields
         else:
-            self.__where &= condition
+            if not self.table.config.pk:
+                raise UndefinedPrimaryKey("Batch UPDATE requires key fields or table config pk")
+            key_fields = [getattr(self.table, self.table.config.pk)]
+
+        provided = {field.alias for field in fields}
+        missing = [field.alias for field in key_fields if field.alias not in provided]
+        if missing:
+            raise InvalidBatchColumns(f"Key fields are not provided in columns: {', '.join(missing)}")
+
+        return key_fields
+
+    @staticmethod
+    async def __write(output: Any, chunk: bytes) -> int:
+        """
+        Write chunk of export to the output
+        :param output: Binary file-like object or async writer
+        :param chunk: Bytes
+        :return: Number of written bytes
+        """
+        if not chunk:
+            return 0
+
+        result = output.write(chunk)
+        if inspect.isawaitable(result):
+            await result
+        drain = getattr(output, "drain", None)
+        if drain is not None:
+            await drain()
+        return len(chunk)
+
+    def __copy(self) -> "QueryBuilder":
+        """
+        Shallow copy of the builder. State is kept in immutable tuples and condition groups,
+        which are never modified in place, so copy shares it with the original builder in O(1)
+        :return: QueryBuilder
+        """
+        return copy.copy(self)
 
     def __patch_params_for_update(self, params: list[Any], *args: Condition | Expression, **kwargs: Any) -> str:
         """
@@ -153,6 +1353,47 @@ class QueryBuilder(AbstractQueryBuilder[TM]):
             sql.extend([SqlConstruction.FROM.value, self.table.sql])
             params.extend(self.table.params)
 
+        if SqlConstruction.JOIN in constructions:
+            for kind, _, table, condition in self.__joins:
+                sql.extend([kind, table.sql, "ON", condition.sql])
+                params.extend(table.params)
+                params.extend(condition.params)
+
         if SqlConstruction.WHERE in constructions and self.__where:
             sql.extend([SqlConstruction.WHERE, self.__where.sql])
             params.extend(self.__where.params)
+
+        if SqlConstruction.GROUP_BY in constructions and self.__group_by:
+            sql.extend([SqlConstruction.GROUP_BY.value, self.__render_fields(params, self.__group_by, aliased=False)])
+
+        if SqlConstruction.HAVING in constructions and self.__having:
+            sql.extend([SqlConstruction.HAVING.value, self.__having.sql])
+            params.extend(self.__having.params)
+
+        if SqlConstruction.RETURNING in constructions and self.__returning is not None:
+            returned = self.__render_fields(params, self.__returning) if self.__returning else "*"
+            sql.extend([SqlConstruction.RETURNING.value, returned])
+
+    def __render_fields(
+        self, params: list[Any], fields: Sequence[TableField | Ordering | Expression] | None, aliased: bool = True
+    ) -> str:
+        """
+        Render list of fields for SELECT, RETURNING, GROUP BY and ORDER BY clauses
+        :param params: Execution parameters
+        :param fields: Fields or expressions. All table fields are rendered if fields are not provided
+        :param aliased: Alias fields as <table>__<field> when query has joins
+        :return: SQL-string
+        """
+        if not fields:
+            fields = self.__all_fields()
+
+        rendered: list[str] = []
+        for field in fields:
+            if isinstance(field, TableField) and not isinstance(field, Aggregate) and self.__joins and aliased:
+                rendered.append(f"{field.alias} AS {field.prefix}__{field.name}")
+            elif isinstance(field, TableField):
+                rendered.append(field.alias)
+            else:
+                rendered.append(field.sql)
+                params.extend(field.params)
+        return ", ".join(rendered)
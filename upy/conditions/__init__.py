@@ -1,4 +1,23 @@
 """Init"""
-from upy.conditions.condition import Condition, ConditionGroup
+from upy.conditions.condition import Condition, ConditionGroup, Predicate
+from upy.conditions.subquery import exists, not_exists
+from upy.conditions.utils import (
+    conjunct_predicates,
+    constrained_values,
+    indexable_fields,
+    like_prefix,
+    prefix_upper_bound,
+)
 
-__all__ = ["Condition", "ConditionGroup"]
+__all__ = [
+    "Condition",
+    "ConditionGroup",
+    "Predicate",
+    "conjunct_predicates",
+    "constrained_values",
+    "exists",
+    "indexable_fields",
+    "like_prefix",
+    "not_exists",
+    "prefix_upper_bound",
+]
@@ -1,9 +1,8 @@
 """Condition and ConditionGroup"""
 import copy
 from enum import Enum
-from typing import Any, Union
+from typing import Any, NamedTuple, Union
 
-from upy.conditions.utils import push_with_reverse
 from upy.exceptions import InvalidConditionComparisonInstance, InvalidConditionGroupComparisonInstance
 from upy.expressions import Expression
 
@@ -17,20 +16,35 @@ class ConditionGroupOperator(str, Enum):
     AND = "AND"
 
 
+class Predicate(NamedTuple):
+    """
+    Structured description of a field comparison, used to inspect conditions (routing, index checks)
+        field - Field alias, for example "table.id"
+        operator - SQL comparison operator, for example "=", "IN", "LIKE"
+        values - Compared literal values, None when compared with other field, expression or subquery
+    """
+
+    field: str
+    operator: str
+    values: tuple[Any, ...] | None = None
+
+
 class Condition:
     """
     Condition define the logical relationship of entities for AND-OR operators
     Entities can be either a simple SQL-query or another Condition or ConditionGroup (group of conditions)
     """
 
-    def __init__(self, sql: str, params: list[Any] | None = None):
+    def __init__(self, sql: str, params: list[Any] | None = None, predicate: Predicate | None = None):
         """
         Initialize Condition object
         :param sql: SQL string condition object
         :param params: Optional parameters for Condition
+        :param predicate: Optional structured description of the field comparison
         """
         self._sql: str = sql
         self._params: list[Any] = params or []
+        self.predicate: Predicate | None = predicate
 
     def __and__(self, other: Union[str, "Condition", "ConditionGroup"]) -> "ConditionGroup":
         """
@@ -99,7 +113,60 @@ class Condition:
         return self._params
 
 
-class ConditionGroup:
+class _Chain:  # pylint: disable=too-few-public-methods
+    """
+    Persistent concatenation of two item sequences
+    Condition groups share collected SQL parts, parameters and operands instead of copying them,
+    items are flattened once, when they are read
+    """
+
+    __slots__ = ("left", "right")
+
+    def __init__(self, left: "Chain", right: "Chain") -> None:
+        """
+        Initialize chain
+        :param left: Leading items
+        :param right: Trailing items
+        """
+        self.left: Chain = left
+        self.right: Chain = right
+
+
+Chain = Union[_Chain, tuple[Any, ...]]
+
+
+def _concat(*chains: Chain) -> Chain:
+    """
+    Concatenate item sequences without copying
+    :param chains: Tuples of items or chains
+    :return: Chain or tuple of items
+    """
+    result: Chain = ()
+    for chain in chains:
+        if not isinstance(chain, _Chain) and not chain:
+            continue
+        result = _Chain(result, chain) if isinstance(result, _Chain) or result else chain
+    return result
+
+
+def _flatten(chain: Chain) -> list[Any]:
+    """
+    Collect items of the chain in order
+    :param chain: Tuple of items or chain
+    :return: List of items
+    """
+    items: list[Any] = []
+    stack: list[Chain] = [chain]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, _Chain):
+            stack.extend((node.right, node.left))
+        else:
+            items.extend(node)
+    return items
+
+
+class ConditionGroup:  # pylint: disable=protected-access,too-many-instance-attributes
     """
     Resolve logical operators for group of conditions
     """
@@ -109,9 +176,12 @@ class ConditionGroup:
         Initialize condition group
         :param condition: Condition object
         """
-        self._sql: str | None = None
-        self._params: list[Any] = []
+        self._sql: Chain | None = None
+        self._params: Chain = ()
+        self._operands: Chain = ()
+        self._size: int = 0
         self.__last_operator: ConditionGroupOperator | None = None
+        self.__reset()
 
         if condition:
             self.__post_init(condition)
@@ -124,21 +194,71 @@ class ConditionGroup:
         :param condition: Condition object
         :return: ConditionGroup object
         """
-        self._sql = condition.sql
-        self._params = condition.params
-
         if isinstance(condition, ConditionGroup):
+            self._sql = condition._sql
+            self._params = condition._params
+            self._operands = condition._operands
+            self._size = condition._size
             self.__last_operator = condition.last_operator
+        else:
+            self._sql = (condition.sql,)
+            self._params = tuple(condition.params)
+            self._operands = (condition,)
+            self._size = 1
 
+        self.__reset()
         return self
 
+    def __reset(self) -> None:
+        """
+        Forget flattened SQL, parameters and operands after the group is changed
+        :return: None
+        """
+        self.__flat_sql: str | None = None
+        self.__flat_params: list[Any] | None = None
+        self.__flat_operands: list[Condition | ConditionGroup] | None = None
+
+    @staticmethod
+    def __parts(condition: Union[Condition, "ConditionGroup"]) -> tuple[Chain, Chain]:
+        """
+        SQL parts and parameters of the condition
+        :param condition: Condition or ConditionGroup object
+        :return: SQL parts and parameters
+        """
+        if isinstance(condition, ConditionGroup):
+            return condition._sql or (), condition._params
+        return (condition.sql,), tuple(condition.params)
+
+    def __push_operand(
+        self, condition: Union[Condition, "ConditionGroup"], operator: ConditionGroupOperator, right: bool = False
+    ) -> None:
+        """
+        Update operands tree with new condition. Called before SQL and parameters of the group are changed
+        Current operands are nested to the group snapshot when logical operator changes,
+        groups with the same operator are flattened
+        :param condition: Condition or ConditionGroup object
+        :param operator: Logical operator
+        :param right: Insert condition before current operands
+        :return: None
+        """
+        if self.__last_operator is not None and self.__last_operator != operator and self._size > 1:
+            self._operands, self._size = (self.__copy(),), 1
+
+        operands: Chain = (condition,)
+        size = 1
+        if isinstance(condition, ConditionGroup) and condition.last_operator in (operator, None):
+            operands, size = condition._operands, condition._size
+
+        self._operands = _concat(operands, self._operands) if right else _concat(self._operands, operands)
+        self._size += size
+
     def __and__(self, condition: Union[str, Condition, "ConditionGroup", Expression]) -> "ConditionGroup":
         """
         Handle AND operator for conditions in group
         :param condition: SQL-string, Condition or ConditionGroup object
         :return: ConditionGroup
         """
-        return copy.deepcopy(self)._and(condition)
+        return self.__copy()._and(condition)
 
     def __rand__(self, condition: Union[str, Condition, "ConditionGroup"]) -> "ConditionGroup":
         """
@@ -146,7 +266,7 @@ class ConditionGroup:
         :param condition: SQL-string, Condition or ConditionGroup object
         :return: ConditionGroup
         """
-        return copy.deepcopy(self)._rand(condition)
+        return self.__copy()._rand(condition)
 
     def __or__(self, condition: Union[str, Condition, "ConditionGroup"]) -> "ConditionGroup":
         """
@@ -154,7 +274,7 @@ class ConditionGroup:
         :param condition: SQL-string, Condition or ConditionGroup object
         :return: ConditionGroup
         """
-        return copy.deepcopy(self)._or(condition)
+        return self.__copy()._or(condition)
 
     def __ror__(self, condition: Union[str, Condition, "ConditionGroup"]) -> "ConditionGroup":
         """
@@ -162,7 +282,15 @@ class ConditionGroup:
         :param condition: SQL-string, Condition or ConditionGroup object
         :return: ConditionGroup
         """
-        return copy.deepcopy(self)._ror(condition)
+        return self.__copy()._ror(condition)
+
+    def __copy(self) -> "ConditionGroup":
+        """
+        Copy of the group. SQL parts, parameters and operands are immutable chains, so they are shared
+        and combining conditions does not copy collected conditions
+        :return: ConditionGroup
+        """
+        return copy.copy(self)
 
     def _and(self, condition: Union[str, Condition, "ConditionGroup", Expression]) -> "ConditionGroup":
         """
@@ -181,16 +309,19 @@ class ConditionGroup:
         if self._sql is None:
             return self.__post_init(condition)
 
+        self.__push_operand(condition, ConditionGroupOperator.AND)
+        sql, params = self.__parts(condition)
         if self.__last_operator is not None and self.__last_operator == ConditionGroupOperator.OR:
-            self._sql = f"({self._sql})"
+            self._sql = _concat(("(",), self._sql, (")",))
 
         if isinstance(condition, ConditionGroup) and condition.last_operator == ConditionGroupOperator.OR:
-            self._sql = f"{self._sql} AND ({condition.sql})"
+            self._sql = _concat(self._sql, (" AND (",), sql, (")",))
         else:
-            self._sql = f"{self._sql} AND {condition.sql}"
+            self._sql = _concat(self._sql, (" AND ",), sql)
 
-        self._params.extend(condition.params)
+        self._params = _concat(self._params, params)
         self.__last_operator = ConditionGroupOperator.AND
+        self.__reset()
         return self
 
     def _rand(self, condition: Union[str, Condition, "ConditionGroup"]) -> "ConditionGroup":
@@ -210,12 +341,15 @@ class ConditionGroup:
         if self._sql is None:
             return self.__post_init(condition)
 
+        self.__push_operand(condition, ConditionGroupOperator.AND, right=True)
+        sql, params = self.__parts(condition)
         if self.__last_operator is not None and self.__last_operator == ConditionGroupOperator.OR:
-            self._sql = f"({self._sql})"
+            self._sql = _concat(("(",), self._sql, (")",))
 
-        self._sql = f"{condition.sql} AND {self._sql}"
-        push_with_reverse(self._params, condition.params)
+        self._sql = _concat(sql, (" AND ",), self._sql)
+        self._params = _concat(params, self._params)
         self.__last_operator = ConditionGroupOperator.AND
+        self.__reset()
         return self
 
     def _or(self, condition: Union[str, Condition, "ConditionGroup"]) -> "ConditionGroup":
@@ -235,9 +369,12 @@ class ConditionGroup:
         if self._sql is None:
             return self.__post_init(condition)
 
-        self._sql = f"{self._sql} OR {condition.sql}"
-        self._params.extend(condition.params)
+        self.__push_operand(condition, ConditionGroupOperator.OR)
+        sql, params = self.__parts(condition)
+        self._sql = _concat(self._sql, (" OR ",), sql)
+        self._params = _concat(self._params, params)
         self.__last_operator = ConditionGroupOperator.OR
+        self.__reset()
         return self
 
     def _ror(self, condition: Union[str, Condition, "ConditionGroup"]) -> "ConditionGroup":
@@ -257,9 +394,12 @@ class ConditionGroup:
         if self._sql is None:
             return self.__post_init(condition)
 
-        self._sql = f"{condition.sql} OR {self._sql}"
-        push_with_reverse(self._params, condition.params)
+        self.__push_operand(condition, ConditionGroupOperator.OR, right=True)
+        sql, params = self.__parts(condition)
+        self._sql = _concat(sql, (" OR ",), self._sql)
+        self._params = _concat(params, self._params)
         self.__last_operator = ConditionGroupOperator.OR
+        self.__reset()
         return self
 
     @property
@@ -268,7 +408,11 @@ class ConditionGroup:
         SQL-string query of condition group
         :return: SQL-string object
         """
-        return "" if self._sql is None else self._sql
+        if self._sql is None:
+            return ""
+        if self.__flat_sql is None:
+            self.__flat_sql = "".join(_flatten(self._sql))
+        return self.__flat_sql
 
     @property
     def params(self) -> list[Any]:
@@ -276,7 +420,19 @@ class ConditionGroup:
         Execution parameters, related to the condition group SQL query
         :return: List of parameters
         """
-        return self._params
+        if self.__flat_params is None:
+            self.__flat_params = _flatten(self._params)
+        return self.__flat_params
+
+    @property
+    def operands(self) -> list[Union[Condition, "ConditionGroup"]]:
+        """
+        Operands of the group joined by last operator. Nested groups have other operator
+        :return: List of Condition and ConditionGroup objects
+        """
+        if self.__flat_operands is None:
+            self.__flat_operands = _flatten(self._operands)
+        return self.__flat_operands
 
     @property
     def last_operator(self) -> ConditionGroupOperator | None:
@@ -0,0 +1,24 @@
+"""Subquery conditions"""
+from upy.conditions.condition import Condition
+from upy.expressions import Selectable, Subquery
+
+
+def exists(selectable: Selectable) -> Condition:
+    """
+    EXISTS condition for subquery. Example:
+        exists(Other.objects.filter(Other.table_id == Table.id).select(Other.id))
+    :param selectable: Select-shaped object, for example QueryBuilder
+    :return: Condition
+    """
+    subquery = Subquery(selectable)
+    return Condition(f"EXISTS {subquery.sql}", subquery.params)
+
+
+def not_exists(selectable: Selectable) -> Condition:
+    """
+    NOT EXISTS condition for subquery
+    :param selectable: Select-shaped object, for example QueryBuilder
+    :return: Condition
+    """
+    subquery = Subquery(selectable)
+    return Condition(f"NOT EXISTS {subquery.sql}", subquery.params)
@@ -1,12 +1,144 @@
 """Condition utils"""
+from typing import Any
 
+from upy.conditions.condition import Condition, ConditionGroup, ConditionGroupOperator, Predicate
 
-def push_with_reverse(first: list, second: list) -> None:  # TODO: Crutch
+EQUALITY_OPERATORS = ("=", "IN")
+INDEXABLE_OPERATORS = ("=", "IN", "<", "<=", ">", ">=", "IS NULL")
+PATTERN_OPERATORS = ("=", "IN", "IS NULL")
+LIKE_WILDCARDS = ("%", "_")
+LIKE_ESCAPE = "\\"
+INCREMENTED_CHARACTERS = frozenset("012345678ABCDEFGHIJKLMNOPQRSTUVWXYabcdefghijklmnopqrstuvwxy")
+
+
+def constrained_values(condition: Condition | ConditionGroup, field: str) -> set[Any] | None:
+    """
+    Resolve values of the field allowed by condition tree
+    Only equality comparisons with literal values constrain the field:
+        table.id = 1 AND table.name = 'a' -> {1}
+        table.id = 1 OR table.id IN (2, 3) -> {1, 2, 3}
+        table.id = 1 OR table.name = 'a' -> None
+    :param condition: Condition or ConditionGroup object
+    :param field: Field alias
+    :return: Set of values or None, if condition does not constrain the field
+    """
+    if isinstance(condition, Condition):
+        predicate = condition.predicate
+        if (
+            predicate is not None
+            and predicate.field == field
+            and predicate.operator in EQUALITY_OPERATORS
+            and predicate.values is not None
+        ):
+            return set(predicate.values)
+        return None
+
+    results = [constrained_values(operand, field) for operand in condition.operands]
+    if condition.last_operator == ConditionGroupOperator.OR:
+        if any(result is None for result in results):
+            return None
+        return set().union(*results)  # type: ignore[arg-type]
+
+    constrained = [result for result in results if result is not None]
+    if not constrained:
+        return None
+    return set.intersection(*constrained)
+
+
+def like_prefix(pattern: str, escape: str = LIKE_ESCAPE) -> tuple[str, bool] | None:
+    """
+    Split LIKE pattern to the literal prefix before the first wildcard. Example:
+        "ab\\_c%" -> ("ab_c", False)
+        "abc" -> ("abc", True)
+    :param pattern: LIKE pattern
+    :param escape: Escape character of the pattern, empty string if escaping is disabled
+    :return: Unescaped prefix and flag that pattern has no wildcards,
+        None if pattern ends with escape character and is invalid
+    """
+    prefix: list[str] = []
+    characters = iter(pattern)
+    for character in characters:
+        if escape and character == escape:
+            character = next(characters, "")
+            if not character:
+                return None
+        elif character in LIKE_WILDCARDS:
+            return "".join(prefix), False
+        prefix.append(character)
+    return "".join(prefix), True
+
+
+def prefix_upper_bound(prefix: str) -> str | None:
+    """
+    Smallest string greater than all strings starting with prefix in C or POSIX collation (code point order)
+    Only ASCII letter or digit is incremented, trailing characters, which can not be incremented, are dropped:
+        "abc" -> "abd", "ab-" -> "ac", "az" -> "b"
+    The bound is not valid for linguistic collations: 'chata' sorts after 'h' in cs_CZ, 'aa' after 'z' in da_DK
+    :param prefix: Literal prefix
+    :return: String or None, if there is no such bound
     """
-    Modify initial list and insert items from second
-    :param first: List to be modified
-    :param second: List of values for insert
-    :return: None
+    for index in range(len(prefix) - 1, -1, -1):
+        if prefix[index] in INCREMENTED_CHARACTERS:
+            return f"{prefix[:index]}{chr(ord(prefix[index]) + 1)}"
+    return None
+
+
+def is_indexable(
+    predicate: Predicate, operators: tuple[str, ...] = INDEXABLE_OPERATORS, like: bool = False
+) -> bool:
+    """
+    Check that comparison operator is able to use B-tree index
+    B-tree index serves LIKE only in C collation or with text_pattern_ops operator class
+    and only with literal pattern without leading wildcard
+    :param predicate: Predicate of condition
+    :param operators: Operators served by the index, text_pattern_ops serves only PATTERN_OPERATORS
+    :param like: Index serves LIKE patterns with literal prefix
+    :return: Bool
+    """
+    if predicate.operator in operators:
+        return True
+    if not like or predicate.operator != "LIKE" or not predicate.values or not isinstance(predicate.values[0], str):
+        return False
+    split = like_prefix(predicate.values[0])
+    return split is not None and bool(split[0])
+
+
+def indexable_fields(
+    condition: Condition | ConditionGroup, operators: tuple[str, ...] = INDEXABLE_OPERATORS, like: bool = False
+) -> set[str]:
+    """
+    Resolve fields, which are compared in every matched row by operator able to use B-tree index
+    Fields of AND operands are combined, OR requires the field in every branch:
+        table.id = 1 AND table.name <> 'a' -> {"table.id"}
+        table.id = 1 OR table.id > 10 -> {"table.id"}
+        table.id = 1 OR table.name = 'a' -> set()
+    :param condition: Condition or ConditionGroup object
+    :param operators: Operators served by the index
+    :param like: Index serves LIKE patterns with literal prefix
+    :return: Set of field aliases
     """
-    for item in second:
-        first.insert(0, item)
+    if isinstance(condition, Condition):
+        predicate = condition.predicate
+        return {predicate.field} if predicate is not None and is_indexable(predicate, operators, like) else set()
+
+    results = [indexable_fields(operand, operators, like) for operand in condition.operands]
+    if not results:
+        return set()
+    if condition.last_operator == ConditionGroupOperator.OR:
+        return set.intersection(*results)
+    return set().union(*results)
+
+
+def conjunct_predicates(condition: Condition | ConditionGroup) -> list[Predicate]:
+    """
+    Resolve predicates, which are true for every matched row (operands joined by AND)
+    Predicates are listed, not hashed, because compared values can be unhashable (dict of JSON field)
+    :param condition: Condition or ConditionGroup object
+    :return: List of predicates
+    """
+    if isinstance(condition, Condition):
+        return [condition.predicate] if condition.predicate is not None else []
+
+    if condition.last_operator == ConditionGroupOperator.OR and len(condition.operands) > 1:
+        return []
+    return [predicate for operand in condition.operands for predicate in conjunct_predicates(operand)]
@@ -1,9 +1,119 @@
 """Table config"""
-from typing import Type
+import zlib
+from typing import Any, Type
 
 from pydantic import BaseModel
 
-from upy.builder import QueryBuilder
+from upy.builder import IndexCheck, QueryBuilder
+from upy.utils import render_literal
+
+BINARY_COLLATIONS = ("C", "POSIX")
+
+
+class Relation(BaseModel):
+    """
+    Relation between tables
+    Used for joins and batched prefetch of related rows
+        table - Related table class or function returning it (for tables declared later)
+        field - Field name of the current table
+        remote - Field name of the related table
+        many - Current row can have many related rows (one-to-many), otherwise one related row is expected
+    Example:
+        Relation(table=lambda: Child, field="id", remote="parent_id")
+    """
+
+    table: Any
+    field: str
+    remote: str
+    many: bool = True
+
+    @property
+    def target(self) -> Any:
+        """
+        Related table class
+        :return: TableModel class
+        """
+        if isinstance(self.table, type):
+            return self.table
+        return self.table()
+
+
+class ShardMap(BaseModel):
+    """
+    Mapping of shard key values to database nodes
+        nodes - Names of database nodes
+        mapping - Explicit node for shard key value (for example dedicated node for big tenant).
+            Other values are distributed by stable hash of the value over nodes
+    """
+
+    nodes: list[str]
+    mapping: dict[Any, str] = {}
+
+    def resolve(self, value: Any) -> str:
+        """
+        Resolve node of the shard key value
+        :param value: Shard key value
+        :return: Node name
+        """
+        if value in self.mapping:
+            return self.mapping[value]
+        return self.nodes[zlib.crc32(str(value).encode()) % len(self.nodes)]
+
+
+class Index(BaseModel):
+    """
+    Index of the table
+        columns - Indexed field names, the first one is the leading column
+        unique - Unique index
+        where - Predicate of partial index, built from table fields (Table.deleted == False)
+        name - Index name, <table>_<columns>_idx (or _key for unique index) by default
+        pattern_ops - Leading column is indexed with text_pattern_ops operator class, so the index serves
+            LIKE patterns with literal prefix in any collation, but only equality of plain comparisons
+    Example:
+        Index(columns=["created"], where=Table.deleted == False)
+    """
+
+    columns: list[str]
+    unique: bool = False
+    where: Any = None
+    name: str | None = None
+    pattern_ops: bool = False
+
+    def index_name(self, tablename: str) -> str:
+        """
+        Name of the index
+        :param tablename: Name of the table
+        :return: Index name
+        """
+        return self.name or f"{tablename}_{'_'.join(self.columns)}_{'key' if self.unique else 'idx'}"
+
+    @property
+    def indexed_columns(self) -> list[str]:
+        """
+        Columns of CREATE INDEX statement with operator class of the leading column
+        :return: List of column expressions
+        """
+        if not self.pattern_ops:
+            return list(self.columns)
+        return [f"{self.columns[0]} text_pattern_ops", *self.columns[1:]]
+
+    def ddl(self, tablename: str, concurrently: bool = False) -> str:
+        """
+        Render CREATE INDEX statement. Parameters of partial index predicate are rendered as literals
+        :param tablename: Name of the table
+        :param concurrently: Build index without locking writes
+        :return: SQL-string
+        """
+        sql = [
+            "CREATE UNIQUE INDEX" if self.unique else "CREATE INDEX",
+            "CONCURRENTLY" if concurrently else "",
+            f"IF NOT EXISTS {self.index_name(tablename)} ON {tablename} ({', '.join(self.indexed_columns)})",
+        ]
+        if self.where is not None:
+            parts = self.where.sql.split("%s")
+            literals = [render_literal(value) for value in self.where.params] + [""]
+            sql.append("WHERE " + "".join(part + literal for part, literal in zip(parts, literals)))
+        return " ".join(part for part in sql if part)
 
 
 class TableConfig(BaseModel):
@@ -17,8 +127,41 @@ class TableConfig(BaseModel):
             with direct access to primary key (Table.objects.delete(1)),
             without keyword arguments (Table.objects.delete(id=1))
             or direct table field access (Table.objects.delete(Table.id == 1)).
+        relations - Named relations to other tables, used for joins and prefetch
+        shard_key - String name of the field, used to split table rows across database nodes
+        shards - Mapping of shard key values to database nodes
+        indexes - Declared indexes of the table (primary key is indexed implicitly)
+        index_check - Check that filters of SELECT, UPDATE and DELETE queries can use declared indexes:
+            warn emits UnindexedFilterWarning, strict raises UnindexedFilter
+        collation - Collation of text columns of the table, database default if not provided
+        rewrite_like - Rewrite literal LIKE and ILIKE patterns of table fields to predicates able to use B-tree index,
+            requires C or POSIX collation
     """
 
     tablename: str
     query_builder: Type[QueryBuilder] = QueryBuilder
     pk: str | None = None
+    relations: dict[str, Relation] = {}
+    shard_key: str | None = None
+    shards: ShardMap | None = None
+    indexes: list[Index] = []
+    index_check: IndexCheck = IndexCheck.OFF
+    collation: str | None = None
+    rewrite_like: bool = False
+
+    @property
+    def binary_collation(self) -> bool:
+        """
+        Text of the table is compared by code points (C or POSIX collation), so plain B-tree index serves
+        LIKE patterns with literal prefix and prefix ranges match the same strings as the pattern
+        :return: Bool
+        """
+        return self.collation is not None and self.collation.upper() in BINARY_COLLATIONS
+
+    def index_ddl(self, concurrently: bool = False) -> list[str]:
+        """
+        Render CREATE INDEX statements of declared indexes
+        :param concurrently: Build indexes without locking writes
+        :return: List of SQL-strings
+        """
+        return [index.ddl(self.tablename, concurrently=concurrently) for index in self.indexes]
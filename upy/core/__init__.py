@@ -1,4 +1,6 @@
 """Init"""
 from upy.core.abstract_builder import AbstractQueryBuilder
+from upy.core.abstract_connection import AbstractConnection, AbstractPool
+from upy.core.abstract_executor import AbstractExecutor, Row
 
-__all__ = ["AbstractQueryBuilder"]
+__all__ = ["AbstractQueryBuilder", "AbstractConnection", "AbstractExecutor", "AbstractPool", "Row"]
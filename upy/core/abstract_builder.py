@@ -2,16 +2,25 @@
 from abc import ABC, abstractmethod
 from typing import Generic, TypeVar
 
+from upy.expressions import Selectable
 from upy.utils import FilterType, Query
 
 TM = TypeVar("TM", bound="TableModel")  # type: ignore[name-defined] # noqa: F821 # pylint: disable=invalid-name
 
 
-class AbstractQueryBuilder(Generic[TM], ABC):
+class AbstractQueryBuilder(Selectable, Generic[TM], ABC):
     """
     Interface for query builder
     """
 
+    @abstractmethod
+    def build_select(self, *args: FilterType) -> Query:
+        """
+        Build SQL SELECT query
+        :param args: Filter arguments
+        :return: Read-only Query object
+        """
+
     @abstractmethod
     def filter(self, *args: FilterType) -> "AbstractQueryBuilder":
         """
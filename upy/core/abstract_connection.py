@@ -0,0 +1,117 @@
+"""Connection and pool interfaces"""
+from abc import abstractmethod
+from typing import AsyncContextManager, AsyncIterator
+
+from upy.core.abstract_executor import AbstractExecutor, Row
+from upy.utils import Query
+
+
+class AbstractConnection(AbstractExecutor):
+    """
+    Interface for database connection
+    Implemented by database driver adapters
+        supports_pipeline - Connection can send multiple queries without waiting for each response
+        supports_prepare - Connection can create server-side prepared statements
+        supports_cancel - Connection can cancel running query on the server
+    """
+
+    supports_pipeline: bool = False
+    supports_prepare: bool = False
+    supports_cancel: bool = False
+
+    async def fetch_pipeline(self, queries: list[Query]) -> list[list[Row] | BaseException]:
+        """
+        Send queries in pipeline mode and return result rows or error for every query
+        Used only when supports_pipeline is True
+        :param queries: Query objects
+        :return: List of result rows or exceptions in order of queries
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support pipeline mode")
+
+    async def prepare(self, name: str, sql: str) -> None:
+        """
+        Create server-side prepared statement. Used only when supports_prepare is True
+        :param name: Statement name
+        :param sql: SQL-string with placeholders
+        :return: None
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support prepared statements")
+
+    async def fetch_prepared(self, name: str, params: tuple) -> list[Row]:
+        """
+        Execute prepared statement and return result rows. Used only when supports_prepare is True
+        :param name: Statement name
+        :param params: Execution parameters
+        :return: List of rows
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support prepared statements")
+
+    async def deallocate(self, name: str) -> None:
+        """
+        Deallocate server-side prepared statement. Used only when supports_prepare is True
+        :param name: Statement name
+        :return: None
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support prepared statements")
+
+    async def cancel(self) -> None:
+        """
+        Cancel query running on the connection by server-side cancel request (pg_cancel_backend).
+        Used only when supports_cancel is True
+        :return: None
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support query cancellation")
+
+    def copy_out(self, query: Query) -> AsyncIterator[bytes]:
+        """
+        Execute COPY ... TO STDOUT query and stream output chunks as they are received from the server
+        Parameters are bound on the client side, because COPY does not accept server-side parameters
+        :param query: Query object with COPY statement
+        :return: Async iterator of output chunks
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support COPY")
+
+
+class AbstractPool(AbstractExecutor):
+    """
+    Interface for pool of database connections
+    Every query is executed on a connection acquired for that query
+        supports_pipeline - Pooled connections support pipeline mode
+    """
+
+    supports_pipeline: bool = False
+
+    @abstractmethod
+    def acquire(self) -> AsyncContextManager[AbstractConnection]:
+        """
+        Acquire connection from the pool, connection is released on context exit
+        :return: Async context manager with connection
+        """
+
+    async def fetch(self, query: Query) -> list[Row]:
+        """
+        Execute query on acquired connection and return result rows
+        :param query: Query object
+        :return: List of rows
+        """
+        async with self.acquire() as connection:
+            return await connection.fetch(query)
+
+    async def execute(self, query: Query) -> None:
+        """
+        Execute query on acquired connection
+        :param query: Query object
+        :return: None
+        """
+        async with self.acquire() as connection:
+            await connection.execute(query)
+
+    async def copy_out(self, query: Query) -> AsyncIterator[bytes]:
+        """
+        Stream output of COPY ... TO STDOUT query from acquired connection
+        :param query: Query object with COPY statement
+        :return: Async iterator of output chunks
+        """
+        async with self.acquire() as connection:
+            async for chunk in connection.copy_out(query):
+                yield chunk
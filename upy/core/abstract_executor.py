@@ -0,0 +1,30 @@
+"""Query executor interface"""
+from abc import ABC, abstractmethod
+from typing import Any
+
+from upy.utils import Query
+
+Row = dict[str, Any]
+
+
+class AbstractExecutor(ABC):
+    """
+    Interface for query execution
+    Implemented by database driver adapters (connections), pools and execution layers wrapping other executors
+    """
+
+    @abstractmethod
+    async def fetch(self, query: Query) -> list[Row]:
+        """
+        Execute query and return result rows
+        :param query: Query object
+        :return: List of rows as mappings of column name to value
+        """
+
+    @abstractmethod
+    async def execute(self, query: Query) -> None:
+        """
+        Execute query without result rows
+        :param query: Query object
+        :return: None
+        """
@@ -1,9 +1,62 @@
 """Table model"""
-from pydantic import BaseModel
+from typing import Any, Mapping
+
+from pydantic import BaseModel, PrivateAttr
 
 
 class BaseTableModel(BaseModel):
     """
-    For future functionality
-    Used just for wrapping table models
+    Base for table models
+    Used for wrapping table models, keeping rows loaded by joins and prefetch
+    and tracking fields changed since load
     """
+
+    _related: dict[str, Any] = PrivateAttr(default_factory=dict)
+    _dirty: set[str] = PrivateAttr(default_factory=set)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """
+        Set attribute and mark assigned field as changed
+        :param name: Attribute name
+        :param value: Attribute value
+        :return: None
+        """
+        super().__setattr__(name, value)
+        if name in self.__class__.model_fields:
+            self._dirty.add(name)
+
+    @property
+    def dirty_fields(self) -> frozenset[str]:
+        """
+        Names of fields changed since instance was loaded or saved
+        :return: Set of field names
+        """
+        return frozenset(self._dirty)
+
+    def mark_clean(self, saved: Mapping[str, Any] | None = None) -> None:
+        """
+        Forget changed fields, for example after they are saved
+        :param saved: Saved values by field name. Only these fields are forgotten and only when they still hold
+            the saved value, so fields assigned while saving stay changed. All fields are forgotten if not provided
+        :return: None
+        """
+        if saved is None:
+            self._dirty.clear()
+            return
+        self._dirty.difference_update(name for name, value in saved.items() if getattr(self, name) is value)
+
+    async def save(self, executor: Any) -> bool:
+        """
+        Save changed fields by UPDATE of the row with instance primary key
+        :param executor: Query executor
+        :return: True if UPDATE query was executed, False if nothing changed
+        """
+        return await self.__class__.objects.save(executor, self)  # type: ignore[attr-defined, no-any-return]
+
+    def related(self, name: str) -> Any:
+        """
+        Related rows loaded by join or prefetch
+        :param name: Relation name
+        :return: List of table models for one-to-many relation, table model or None otherwise
+        """
+        return self._related[name]
@@ -42,8 +42,91 @@ class TableConfigRequired(UpyException):
     """
 
 
+class UnsupportedCollation(UpyException):
+    """
+    Raised for errors related to the table building
+    When LIKE rewriting is enabled for the table, which text is not compared in C or POSIX collation
+    """
+
+
 class InvalidFilterArgument(UpyException):
     """
     Raised for errors related to the query building
     When query builder can not process provided argument type
     """
+
+
+class InvalidBatchColumns(UpyException):
+    """
+    Raised for errors related to the batch query building
+    When provided columns are empty, have different lengths or miss key fields
+    """
+
+
+class UndefinedPrimaryKey(UpyException):
+    """
+    Raised for errors related to the query building
+    When query requires primary key, but table config has no pk
+    """
+
+
+class UndefinedRelation(UpyException):
+    """
+    Raised for errors related to the query building
+    When relation is not declared in table config
+    """
+
+
+class InvalidPrefetch(UpyException):
+    """
+    Raised for errors related to the query building
+    When fetched rows of prefetch query do not contain the key field of the relation
+    """
+
+
+class UndefinedShard(UpyException):
+    """
+    Raised for errors related to the sharded query execution
+    When target node of the query can not be resolved
+    """
+
+
+class UnmergeableAggregate(UpyException):
+    """
+    Raised for errors related to the sharded query execution
+    When partial aggregates of multiple database nodes can not be merged
+    """
+
+
+class ImmutablePrimaryKey(UpyException):
+    """
+    Raised for errors related to the query building
+    When changed primary key of the instance is saved
+    """
+
+
+class DeadlineExceeded(UpyException):
+    """
+    Raised for errors related to the query execution
+    When query is not finished before deadline or statement timeout
+    """
+
+
+class InvalidSubquery(UpyException):
+    """
+    Raised for errors related to the query building
+    When subquery compared with field (IN, scalar comparison) does not select exactly one column
+    """
+
+
+class UnindexedFilter(UpyException):
+    """
+    Raised for errors related to the query building
+    When index check is strict and query filter can not use any declared index of the table
+    """
+
+
+class UnindexedFilterWarning(UserWarning):
+    """
+    Warning of the query filter, which can not use any declared index of the table
+    """
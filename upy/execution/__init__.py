@@ -0,0 +1,43 @@
+"""Init"""
+from upy.execution.batched import BatchedRunner, CheckpointStore, FileCheckpointStore, MemoryCheckpointStore
+from upy.execution.deadline import DeadlineConnection, DeadlinePool, TimeoutStats, deadline
+from upy.execution.fingerprint import fingerprint, normalize, query_fingerprint
+from upy.execution.loader import Loader
+from upy.execution.mirror import SqliteMirror
+from upy.execution.pipeline import Pipeline, pipeline
+from upy.execution.prepared import PreparedConnection, PreparedPool, PreparedStatementStats
+from upy.execution.routing import ReplicaRouter
+from upy.execution.sharding import ShardRouter
+from upy.execution.singleflight import SingleFlight, SingleFlightStats
+from upy.execution.slowlog import SlowQuery, SlowQueryLog
+from upy.execution.templates import TEMPLATES, Template, TemplateCache
+
+__all__ = [
+    "BatchedRunner",
+    "CheckpointStore",
+    "DeadlineConnection",
+    "DeadlinePool",
+    "FileCheckpointStore",
+    "Loader",
+    "MemoryCheckpointStore",
+    "Pipeline",
+    "PreparedConnection",
+    "PreparedPool",
+    "PreparedStatementStats",
+    "ReplicaRouter",
+    "ShardRouter",
+    "SingleFlight",
+    "SingleFlightStats",
+    "SlowQuery",
+    "SlowQueryLog",
+    "SqliteMirror",
+    "TEMPLATES",
+    "Template",
+    "TemplateCache",
+    "TimeoutStats",
+    "deadline",
+    "fingerprint",
+    "normalize",
+    "pipeline",
+    "query_fingerprint",
+]
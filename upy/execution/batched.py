@@ -0,0 +1,308 @@
+"""Throttled batched mutations of huge tables"""
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable
+from uuid import UUID
+
+from upy.core.abstract_executor import AbstractExecutor
+from upy.exceptions import UndefinedPrimaryKey
+from upy.utils import FilterType, Query
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_TARGET_LATENCY = 0.5
+MAX_BATCH_GROWTH = 2.0
+
+# Primary key types stored in checkpoint file as {"type": name, "value": text}, datetime precedes date subclass
+CHECKPOINT_KEY_TYPES: dict[str, tuple[type, Callable[[str], Any]]] = {
+    "uuid": (UUID, UUID),
+    "datetime": (datetime, datetime.fromisoformat),
+    "date": (date, date.fromisoformat),
+    "decimal": (Decimal, Decimal),
+}
+
+
+class CheckpointStore(ABC):
+    """
+    Storage of the last processed primary key of batched jobs
+    """
+
+    @abstractmethod
+    def load(self, job: str) -> Any:
+        """
+        Load checkpoint of the job
+        :param job: Job name
+        :return: Last processed primary key or None
+        """
+
+    @abstractmethod
+    def save(self, job: str, key: Any) -> None:
+        """
+        Save checkpoint of the job
+        :param job: Job name
+        :param key: Last processed primary key
+        :return: None
+        """
+
+    @abstractmethod
+    def clear(self, job: str) -> None:
+        """
+        Remove checkpoint of the finished job
+        :param job: Job name
+        :return: None
+        """
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    """
+    Checkpoints kept in memory of the process
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize store
+        """
+        self.checkpoints: dict[str, Any] = {}
+
+    def load(self, job: str) -> Any:
+        """
+        Load checkpoint of the job
+        :param job: Job name
+        :return: Last processed primary key or None
+        """
+        return self.checkpoints.get(job)
+
+    def save(self, job: str, key: Any) -> None:
+        """
+        Save checkpoint of the job
+        :param job: Job name
+        :param key: Last processed primary key
+        :return: None
+        """
+        self.checkpoints[job] = key
+
+    def clear(self, job: str) -> None:
+        """
+        Remove checkpoint of the finished job
+        :param job: Job name
+        :return: None
+        """
+        self.checkpoints.pop(job, None)
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    Checkpoints kept in JSON file, so interrupted job can be resumed by another process
+    File is replaced atomically on every save
+    Supported primary key types: int, str, UUID, datetime, date and Decimal
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """
+        Initialize store
+        :param path: Path to JSON file
+        """
+        self.path: Path = Path(path)
+
+    def load(self, job: str) -> Any:
+        """
+        Load checkpoint of the job
+        :param job: Job name
+        :return: Last processed primary key of the saved type or None
+        """
+        return self.__decode(self.__read().get(job))
+
+    def save(self, job: str, key: Any) -> None:
+        """
+        Save checkpoint of the job
+        :param job: Job name
+        :param key: Last processed primary key
+        :return: None
+        """
+        checkpoints = self.__read()
+        checkpoints[job] = self.__encode(key)
+        self.__write(checkpoints)
+
+    def clear(self, job: str) -> None:
+        """
+        Remove checkpoint of the finished job
+        :param job: Job name
+        :return: None
+        """
+        checkpoints = self.__read()
+        if checkpoints.pop(job, None) is not None:
+            self.__write(checkpoints)
+
+    def __read(self) -> dict[str, Any]:
+        """
+        Read all checkpoints
+        :return: Checkpoints by job name
+        """
+        if not self.path.exists():
+            return {}
+        return dict(json.loads(self.path.read_text(encoding="utf-8")))
+
+    def __write(self, checkpoints: dict[str, Any]) -> None:
+        """
+        Write all checkpoints
+        :param checkpoints: Checkpoints by job name
+        :return: None
+        """
+        temporary = self.path.with_name(f"{self.path.name}.tmp")
+        temporary.write_text(json.dumps(checkpoints), encoding="utf-8")
+        os.replace(temporary, self.path)
+
+    @staticmethod
+    def __encode(key: Any) -> Any:
+        """
+        Convert primary key to JSON value, keeping type of keys not supported by JSON
+        :param key: Primary key
+        :return: JSON value
+        """
+        if key is None or isinstance(key, int | str):
+            return key
+        for name, (kind, _) in CHECKPOINT_KEY_TYPES.items():
+            if isinstance(key, kind):
+                return {"type": name, "value": key.isoformat() if isinstance(key, date) else str(key)}
+        raise TypeError(f"Checkpoint of primary key of type '{type(key).__name__}' is not supported")
+
+    @staticmethod
+    def __decode(value: Any) -> Any:
+        """
+        Convert JSON value to primary key
+        :param value: JSON value
+        :return: Primary key
+        """
+        if not isinstance(value, dict):
+            return value
+        _, parse = CHECKPOINT_KEY_TYPES[value["type"]]
+        return parse(value["value"])
+
+
+class BatchedRunner:  # pylint: disable=too-many-instance-attributes
+    """
+    Run DELETE or UPDATE of many rows by batches, walking matched rows in primary key order. Example:
+        DELETE FROM table WHERE table.id IN (
+            SELECT table.id FROM table WHERE table.created < %s AND table.id > %s ORDER BY table.id LIMIT %s
+        ) RETURNING table.id
+    Every batch holds locks for a short time and produces limited amount of WAL.
+    Batch size is adapted to the target latency of one batch, pause between batches caps the load.
+    Last processed primary key is saved to the checkpoint store after every batch, so interrupted job
+    continues from this key. Checkpoint is removed when the job is finished.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        executor: AbstractExecutor,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        target_latency: float | None = DEFAULT_TARGET_LATENCY,
+        pause: float = 0.0,
+        min_batch_size: int = 1,
+        max_batch_size: int = DEFAULT_BATCH_SIZE * 100,
+        checkpoints: CheckpointStore | None = None,
+    ) -> None:
+        """
+        Initialize runner
+        :param executor: Query executor
+        :param batch_size: Initial number of rows per batch
+        :param target_latency: Target duration of one batch in seconds, None to keep batch size constant
+        :param pause: Pause between batches in seconds
+        :param min_batch_size: Minimum number of rows per batch
+        :param max_batch_size: Maximum number of rows per batch
+        :param checkpoints: Checkpoint store of resumable jobs
+        """
+        self.executor: AbstractExecutor = executor
+        self.batch_size: int = batch_size
+        self.target_latency: float | None = target_latency
+        self.pause: float = pause
+        self.min_batch_size: int = min_batch_size
+        self.max_batch_size: int = max_batch_size
+        self.checkpoints: CheckpointStore = checkpoints or MemoryCheckpointStore()
+
+    async def delete(self, job: str, table: Any, *args: FilterType) -> int:
+        """
+        Delete rows matching filter by batches
+        :param job: Job name, used as checkpoint key
+        :param table: Table model class with pk in config
+        :param args: Filter arguments
+        :return: Number of deleted rows
+        """
+        return await self.__run(job, table, args, lambda builder: builder.build_delete())
+
+    async def update(self, job: str, table: Any, *args: FilterType, values: dict[str, Any]) -> int:
+        """
+        Update rows matching filter by batches
+        :param job: Job name, used as checkpoint key
+        :param table: Table model class with pk in config
+        :param args: Filter arguments
+        :param values: Updated fields with values
+        :return: Number of updated rows
+        """
+        return await self.__run(job, table, args, lambda builder: builder.build_update(**values))
+
+    def build_batch(self, table: Any, args: tuple[FilterType, ...], after: Any, size: int) -> Any:
+        """
+        Prepare query builder of one batch, restricted by primary keys of the next rows
+        :param table: Table model class
+        :param args: Filter arguments
+        :param after: Last processed primary key or None for the first batch
+        :param size: Number of rows in batch
+        :return: QueryBuilder
+        """
+        if not table.config.pk:
+            raise UndefinedPrimaryKey(f"Batched mutation requires pk in config of table '{table.sql}'")
+
+        pk = getattr(table, table.config.pk)
+        keys = table.objects.filter(*args).select(pk).order_by(pk).limit(size)
+        if after is not None:
+            keys = keys.filter(pk > after)
+        return table.objects.filter(pk == keys).returning(pk)
+
+    async def __run(self, job: str, table: Any, args: tuple[FilterType, ...], build: Callable[[Any], Query]) -> int:
+        """
+        Run batches until there are no matched rows
+        :param job: Job name
+        :param table: Table model class
+        :param args: Filter arguments
+        :param build: Function building mutation query from query builder of batch
+        :return: Number of processed rows
+        """
+        last = self.checkpoints.load(job)
+        size = self.batch_size
+        total = 0
+        while True:
+            query = build(self.build_batch(table, args, last, size))
+            started = time.monotonic()
+            rows = await self.executor.fetch(query)
+            elapsed = time.monotonic() - started
+            if not rows:
+                break
+
+            last = max(row[table.config.pk] for row in rows)
+            total += len(rows)
+            self.checkpoints.save(job, last)
+            size = self.__adapt(size, elapsed)
+            if self.pause:
+                await asyncio.sleep(self.pause)
+
+        self.checkpoints.clear(job)
+        return total
+
+    def __adapt(self, size: int, elapsed: float) -> int:
+        """
+        Scale batch size to the target latency
+        Growth per batch is limited, so one fast batch on cached pages does not produce huge next batch
+        :param size: Current batch size
+        :param elapsed: Duration of the last batch in seconds
+        :return: Next batch size
+        """
+        if self.target_latency is None:
+            return size
+
+        factor = min(MAX_BATCH_GROWTH, self.target_latency / max(elapsed, 1e-6))
+        return max(self.min_batch_size, min(self.max_batch_size, int(size * factor)))
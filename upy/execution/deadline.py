@@ -0,0 +1,373 @@
+"""Deadlines, statement timeouts and cancellation"""
+import asyncio
+import math
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Iterator, TypeVar
+from weakref import WeakKeyDictionary
+
+from upy.core.abstract_connection import AbstractConnection, AbstractPool
+from upy.core.abstract_executor import Row
+from upy.exceptions import DeadlineExceeded
+from upy.execution.fingerprint import query_fingerprint
+from upy.utils import Query
+
+T = TypeVar("T")
+
+QUERY_CANCELED = "57014"
+ROLLBACK_COMMANDS = ("ROLLBACK", "ABORT")
+DEFAULT_GRACE = 0.05
+
+_deadline: ContextVar[float | None] = ContextVar("upy_deadline", default=None)
+
+
+@contextmanager
+def deadline(timeout: float) -> Iterator[None]:
+    """
+    Limit execution time of all queries of the current context. Example:
+        with deadline(0.2):
+            await Table.objects.fetch(executor)
+    Nested deadline can only shorten the outer one
+    :param timeout: Seconds from now
+    :return: Context manager
+    """
+    at = time.monotonic() + timeout
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time(timeout: float | None = None) -> float | None:
+    """
+    Time left until deadline of the current context
+    :param timeout: Per-query timeout in seconds, applied when it is shorter than context deadline
+    :return: Seconds or None, if there is no deadline
+    """
+    at = _deadline.get()
+    remaining = None if at is None else at - time.monotonic()
+    if timeout is None:
+        return remaining
+    return timeout if remaining is None else min(remaining, timeout)
+
+
+def is_statement_timeout(exc: BaseException) -> bool:
+    """
+    Check that driver error is cancellation of the statement by server (SQLSTATE 57014)
+    :param exc: Exception raised by driver
+    :return: Bool
+    """
+    return QUERY_CANCELED in (getattr(exc, "sqlstate", None), getattr(exc, "pgcode", None))
+
+
+class TimeoutStats:  # pylint: disable=too-few-public-methods
+    """
+    Counters of interrupted queries by query fingerprint
+        timeouts - Queries not finished before deadline
+        cancellations - Queries cancelled by caller (asyncio task cancellation)
+    """
+
+    __slots__ = ("timeouts", "cancellations")
+
+    def __init__(self) -> None:
+        """
+        Initialize counters
+        """
+        self.timeouts: Counter[str] = Counter()
+        self.cancellations: Counter[str] = Counter()
+
+
+class DeadlineConnection(AbstractConnection):  # pylint: disable=abstract-method,too-many-instance-attributes
+    """
+    Connection wrapper, turning deadlines to server-side statement_timeout
+    Statement timeout is set only when it differs from the current one of the connection, so queries with
+    the same per-query timeout set it once per connection. Changed timeout is sent in one pipeline with
+    the query, when connection supports pipeline mode, otherwise it costs extra round trip.
+    When deadline passes on the client or the caller task is cancelled, cancel request is sent to the server,
+    so the query does not keep running after nobody waits for its result.
+    """
+
+    def __init__(
+        self,
+        connection: AbstractConnection,
+        timeout: float | None = None,
+        grace: float = DEFAULT_GRACE,
+        stats: TimeoutStats | None = None,
+    ) -> None:
+        """
+        Initialize deadline connection
+        :param connection: Driver connection
+        :param timeout: Default per-query timeout in seconds
+        :param grace: Extra seconds client waits for the server to report statement timeout
+        :param stats: Shared counters of interrupted queries
+        """
+        self.connection: AbstractConnection = connection
+        self.timeout: float | None = timeout
+        self.grace: float = grace
+        self.stats: TimeoutStats = stats or TimeoutStats()
+        self.supports_pipeline = connection.supports_pipeline
+        self.supports_prepare = connection.supports_prepare
+        self.supports_cancel = connection.supports_cancel
+        self.__statement_timeout: int | None = 0
+        self.__prepared: dict[str, str] = {}
+
+    @property
+    def clean(self) -> bool:
+        """
+        Connection has default statement timeout
+        :return: Bool
+        """
+        return self.__statement_timeout == 0
+
+    async def fetch(self, query: Query) -> list[Row]:
+        """
+        Execute query before deadline and return result rows
+        :param query: Query object
+        :return: List of rows
+        """
+        return await self.__run(
+            [query],
+            lambda setting: self.connection.fetch(query) if setting is None else self.__pipelined(setting, query),
+            pipelined=True,
+        )
+
+    async def execute(self, query: Query) -> None:
+        """
+        Execute query before deadline
+        :param query: Query object
+        :return: None
+        """
+        await self.__run(
+            [query],
+            lambda setting: self.connection.execute(query) if setting is None else self.__pipelined(setting, query),
+            pipelined=True,
+        )
+
+    async def fetch_pipeline(self, queries: list[Query]) -> list[list[Row] | BaseException]:
+        """
+        Send queries in pipeline mode, the whole pipeline is limited by deadline
+        :param queries: Query objects
+        :return: List of result rows or exceptions
+        """
+        return await self.__run(queries, lambda _: self.connection.fetch_pipeline(queries))
+
+    async def prepare(self, name: str, sql: str) -> None:
+        """
+        Create server-side prepared statement on the wrapped connection
+        :param name: Statement name
+        :param sql: SQL-string with placeholders
+        :return: None
+        """
+        await self.connection.prepare(name, sql)
+        self.__prepared[name] = sql
+
+    async def fetch_prepared(self, name: str, params: tuple) -> list[Row]:
+        """
+        Execute prepared statement before deadline, interruptions are counted by fingerprint of its SQL-string
+        :param name: Statement name
+        :param params: Execution parameters
+        :return: List of rows
+        """
+        query = Query(self.__prepared.get(name, name), params)
+        return await self.__run([query], lambda _: self.connection.fetch_prepared(name, params))
+
+    async def deallocate(self, name: str) -> None:
+        """
+        Deallocate server-side prepared statement on the wrapped connection
+        :param name: Statement name
+        :return: None
+        """
+        await self.connection.deallocate(name)
+        self.__prepared.pop(name, None)
+
+    async def cancel(self) -> None:
+        """
+        Cancel query running on the wrapped connection
+        :return: None
+        """
+        await self.connection.cancel()
+
+    async def copy_out(self, query: Query) -> AsyncIterator[bytes]:  # pylint: disable=invalid-overridden-method
+        """
+        Stream output of COPY query from the wrapped connection
+        Export is not limited by deadline, because its duration depends on the consumer of the stream,
+        so statement timeout left by previous queries is reset
+        :param query: Query object with COPY statement
+        :return: Async iterator of output chunks
+        """
+        await self.reset()
+        async for chunk in self.connection.copy_out(query):
+            yield chunk
+
+    async def reset(self) -> None:
+        """
+        Restore default statement timeout of the connection
+        :return: None
+        """
+        if not self.clean:
+            self.__statement_timeout = None
+            await self.connection.execute(Query("RESET statement_timeout"))
+            self.__statement_timeout = 0
+
+    async def __run(
+        self, queries: list[Query], operation: Callable[[Query | None], Awaitable[T]], pipelined: bool = False
+    ) -> T:
+        """
+        Run operation with statement timeout of the current deadline
+        Statement timeout of the connection becomes unknown after any error or rollback, because PostgreSQL
+        reverts SET of the rolled back transaction
+        :param queries: Executed queries, used as keys of counters
+        :param operation: Function starting driver operation. Receives statement timeout setting,
+            which should be sent together with the query, or None
+        :param pipelined: Operation can send statement timeout setting in one pipeline with the query
+        :return: Result of operation
+        """
+        remaining = remaining_time(self.timeout)
+        if remaining is not None and remaining <= 0:
+            self.__record(self.stats.timeouts, queries)
+            raise DeadlineExceeded("Deadline passed before query was sent")
+
+        milliseconds = self.__changed_statement_timeout(remaining)
+        setting = None if milliseconds is None else self.__statement_timeout_query(milliseconds)
+        if setting is not None and not (pipelined and self.connection.supports_pipeline):
+            self.__statement_timeout = None
+            await self.connection.execute(setting)
+            setting = None
+        if milliseconds is not None:
+            self.__statement_timeout = milliseconds
+
+        try:
+            if remaining is None:
+                result = await operation(setting)
+            else:
+                result = await asyncio.wait_for(operation(setting), remaining + self.grace)
+        except asyncio.TimeoutError as exc:
+            self.__record(self.stats.timeouts, queries)
+            await self.__cancel()
+            raise DeadlineExceeded(f"Query is not finished in {remaining:.3f}s") from exc
+        except asyncio.CancelledError:
+            self.__record(self.stats.cancellations, queries)
+            await self.__cancel()
+            raise
+        except Exception as exc:
+            self.__statement_timeout = None
+            if is_statement_timeout(exc):
+                self.__record(self.stats.timeouts, queries)
+                raise DeadlineExceeded(f"Query is cancelled by statement timeout {remaining}s") from exc
+            raise
+
+        if any(query.sql.lstrip().upper().startswith(ROLLBACK_COMMANDS) for query in queries):
+            self.__statement_timeout = None
+        return result
+
+    def __changed_statement_timeout(self, remaining: float | None) -> int | None:
+        """
+        Statement timeout of the query, when it differs from the current one of the connection
+        Current timeout longer by less than grace is kept, because client cancels the query in time anyway.
+        Timeout is rounded up to whole milliseconds, 0 means no timeout
+        :param remaining: Seconds until deadline or None
+        :return: Milliseconds or None, if current timeout is kept
+        """
+        milliseconds = 0 if remaining is None else max(1, math.ceil(remaining * 1000))
+        current = self.__statement_timeout
+        if milliseconds == current:
+            return None
+        if milliseconds and current and 0 < current - milliseconds <= self.grace * 1000:
+            return None
+        return milliseconds
+
+    @staticmethod
+    def __statement_timeout_query(milliseconds: int) -> Query:
+        """
+        Build query setting statement timeout of the connection
+        :param milliseconds: Statement timeout, 0 means no timeout
+        :return: Query object
+        """
+        if milliseconds:
+            return Query(f"SET statement_timeout = {milliseconds}")
+        return Query("RESET statement_timeout")
+
+    async def __pipelined(self, setting: Query, query: Query) -> list[Row]:
+        """
+        Send statement timeout setting and the query in one pipeline, so changed timeout does not cost round trip
+        :param setting: Query setting statement timeout
+        :param query: Query object
+        :return: List of rows
+        """
+        applied, rows = await self.connection.fetch_pipeline([setting, query])
+        if isinstance(applied, BaseException):
+            raise applied
+        if isinstance(rows, BaseException):
+            raise rows
+        return rows
+
+    async def __cancel(self) -> None:
+        """
+        Send cancel request of the interrupted query, statement timeout of the connection becomes unknown
+        :return: None
+        """
+        self.__statement_timeout = None
+        if self.connection.supports_cancel:
+            await self.connection.cancel()
+
+    @staticmethod
+    def __record(counter: Counter[str], queries: list[Query]) -> None:
+        """
+        Count interrupted queries by fingerprint
+        :param counter: Counter of timeouts or cancellations
+        :param queries: Interrupted queries
+        :return: None
+        """
+        counter.update(query_fingerprint(query) for query in queries)
+
+
+class DeadlinePool(AbstractPool):
+    """
+    Pool wrapper, applying deadlines to pooled connections
+    Connection is returned to the pool with default statement timeout. When connections of the wrapped pool
+    are used only through this wrapper, reset_on_release can be disabled: statement timeout of the connection
+    is remembered between acquisitions and set again only when it differs
+    """
+
+    def __init__(
+        self,
+        pool: AbstractPool,
+        timeout: float | None = None,
+        grace: float = DEFAULT_GRACE,
+        reset_on_release: bool = True,
+    ) -> None:
+        """
+        Initialize deadline pool
+        :param pool: Driver pool
+        :param timeout: Default per-query timeout in seconds
+        :param grace: Extra seconds client waits for the server to report statement timeout
+        :param reset_on_release: Restore default statement timeout of the connection on release
+        """
+        self.pool: AbstractPool = pool
+        self.timeout: float | None = timeout
+        self.grace: float = grace
+        self.reset_on_release: bool = reset_on_release
+        self.stats: TimeoutStats = TimeoutStats()
+        self.supports_pipeline = pool.supports_pipeline
+        self.__connections: WeakKeyDictionary[AbstractConnection, DeadlineConnection] = WeakKeyDictionary()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[AbstractConnection]:  # pylint: disable=invalid-overridden-method
+        """
+        Acquire connection with deadlines
+        :return: Async context manager with connection
+        """
+        async with self.pool.acquire() as connection:
+            wrapped = self.__connections.get(connection)
+            if wrapped is None:
+                wrapped = DeadlineConnection(connection, timeout=self.timeout, grace=self.grace, stats=self.stats)
+                self.__connections[connection] = wrapped
+            try:
+                yield wrapped
+            finally:
+                if self.reset_on_release:
+                    await wrapped.reset()
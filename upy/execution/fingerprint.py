@@ -0,0 +1,30 @@
+"""Query shape normalization and fingerprints"""
+from upy.execution.templates import TEMPLATES, fingerprint
+from upy.utils import Query
+
+__all__ = ["fingerprint", "normalize", "query_fingerprint"]
+
+
+def normalize(query: Query) -> Query:
+    """
+    Normalize query shape, so the same statement with different number of values has the same SQL
+    Lists of placeholders in IN (...) and NOT IN (...) are collapsed to a single array parameter:
+        table.field IN (%s, %s, %s) -> table.field = ANY(%s)
+        table.field NOT IN (%s, %s) -> table.field <> ALL(%s)
+    Compiled shapes are cached by SQL-string, see TemplateCache. Routing information of sharded query is kept
+    :param query: Query object
+    :return: Normalized Query object
+    """
+    template = TEMPLATES.compile(query.sql)
+    if not template.collapsed:
+        return query
+    return query.replace(sql=template.sql, params=template.apply(query.params))
+
+
+def query_fingerprint(query: Query) -> str:
+    """
+    Fingerprint of the normalized query shape, cached by SQL-string
+    :param query: Query object
+    :return: Hex string
+    """
+    return TEMPLATES.compile(query.sql).fingerprint
@@ -0,0 +1,142 @@
+"""Batching of primary key lookups"""
+import asyncio
+from typing import Any, Generic, Iterable
+from weakref import WeakKeyDictionary
+
+from upy.builder import DEFAULT_CHUNK_SIZE
+from upy.core.abstract_builder import TM
+from upy.core.abstract_executor import AbstractExecutor
+from upy.exceptions import UndefinedPrimaryKey
+from upy.session import current_session
+
+
+class Loader(Generic[TM]):  # pylint: disable=too-many-instance-attributes
+    """
+    Coalesce concurrent primary key lookups of one table into a single SELECT ... WHERE pk IN (...) query
+    Keys requested during one event loop iteration (or during the window) are loaded together,
+    every caller gets its row or None, when row does not exist.
+    Loaded rows are cached by key when cache is enabled, so create a loader per request to scope the cache.
+    Rows already present in identity map of the active session are returned without query.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        table: Any,
+        executor: AbstractExecutor,
+        window: float = 0.0,
+        cache: bool = False,
+        max_batch: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """
+        Initialize loader
+        :param table: Table model class with pk in config
+        :param executor: Query executor
+        :param window: Seconds to collect keys before loading, 0 to load on the next event loop iteration
+        :param cache: Cache loaded rows by key
+        :param max_batch: Maximum number of keys per query
+        """
+        if not table.config.pk:
+            raise UndefinedPrimaryKey(f"Loader requires pk in config of table '{table.sql}'")
+
+        self.table: Any = table
+        self.executor: AbstractExecutor = executor
+        self.window: float = window
+        self.cache: bool = cache
+        self.max_batch: int = max_batch
+        self.__cache: dict[Any, TM | None] = {}
+        self.__pending: WeakKeyDictionary[asyncio.AbstractEventLoop, dict[Any, asyncio.Future[TM | None]]] = (
+            WeakKeyDictionary()
+        )
+        self.__tasks: set[asyncio.Task[None]] = set()
+
+    async def load(self, key: Any) -> TM | None:
+        """
+        Load row by primary key
+        :param key: Primary key value
+        :return: Table model instance or None
+        """
+        if self.cache and key in self.__cache:
+            return self.__cache[key]
+
+        session = current_session()
+        known = session.get(self.table, key) if session is not None else None
+        if known is not None:
+            return known
+
+        loop = asyncio.get_running_loop()
+        pending = self.__pending.get(loop)
+        if pending is None:
+            pending = self.__pending[loop] = {}
+            if self.window > 0:
+                loop.call_later(self.window, self.__dispatch, loop)
+            else:
+                loop.call_soon(self.__dispatch, loop)
+
+        if key not in pending:
+            pending[key] = loop.create_future()
+        return await asyncio.shield(pending[key])
+
+    async def load_many(self, keys: Iterable[Any]) -> list[TM | None]:
+        """
+        Load rows by primary keys
+        :param keys: Primary key values
+        :return: Table model instances or None in order of keys
+        """
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Any, value: TM | None) -> None:
+        """
+        Put row to the cache
+        :param key: Primary key value
+        :param value: Table model instance or None
+        :return: None
+        """
+        if self.cache:
+            self.__cache[key] = value
+
+    def clear(self, key: Any = None) -> None:
+        """
+        Remove row from the cache
+        :param key: Primary key value, the whole cache is cleared if not provided
+        :return: None
+        """
+        if key is None:
+            self.__cache.clear()
+        else:
+            self.__cache.pop(key, None)
+
+    def __dispatch(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Start loading of collected keys
+        :param loop: Event loop of collected keys
+        :return: None
+        """
+        pending = self.__pending.pop(loop, {})
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch):
+            batch = {key: pending[key] for key in keys[start:start + self.max_batch]}
+            task = loop.create_task(self.__load_batch(batch))
+            self.__tasks.add(task)
+            task.add_done_callback(self.__tasks.discard)
+
+    async def __load_batch(self, batch: dict[Any, "asyncio.Future[TM | None]"]) -> None:
+        """
+        Load batch of keys by one query and resolve futures of callers
+        :param batch: Futures by primary key value
+        :return: None
+        """
+        pk = self.table.config.pk
+        try:
+            rows = await self.table.objects.fetch(self.executor, getattr(self.table, pk) == list(batch))
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        found = {getattr(row, pk): row for row in rows}
+        for key, future in batch.items():
+            value = found.get(key)
+            self.prime(key, value)
+            if not future.done():
+                future.set_result(value)
@@ -0,0 +1,318 @@
+"""Embedded SQLite mirror of reference tables"""
+import asyncio
+import json
+import re
+import sqlite3
+import time
+from datetime import date, datetime, time as time_of_day, timezone
+from decimal import Decimal
+from typing import Any, Callable, Iterable
+from uuid import UUID
+
+from upy.core.abstract_executor import AbstractExecutor, Row
+from upy.utils import Query
+
+DEFAULT_REFRESH_INTERVAL = 60.0
+
+TABLES_PATTERN = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+([\w.]+)", re.IGNORECASE)
+PLACEHOLDER_PATTERN = re.compile(r"%([s%])")
+ORDER_BY_PATTERN = re.compile(r"\bORDER BY (.+?)(?= LIMIT | OFFSET |\)|$)")
+
+
+# Conversions of SQLite values back to types of mirrored column values, other types are stored as is
+SQLITE_CONVERTERS: dict[type, Callable[[Any], Any]] = {
+    bool: bool,
+    Decimal: lambda value: Decimal(str(value)),
+    datetime: datetime.fromisoformat,
+    date: date.fromisoformat,
+    time_of_day: time_of_day.fromisoformat,
+    UUID: UUID,
+    dict: json.loads,
+    list: json.loads,
+}
+
+
+def query_tables(sql: str) -> set[str]:
+    """
+    Resolve tables referenced by the query
+    :param sql: SQL-string
+    :return: Set of table names
+    """
+    return set(TABLES_PATTERN.findall(sql))
+
+
+def to_sqlite(sql: str) -> str:
+    """
+    Translate rendered SQL-string to SQLite dialect: %s placeholders to ?, escaped %% to %,
+    NULL ordering of PostgreSQL (last in ascending order, first in descending) is added to ORDER BY items
+    :param sql: SQL-string
+    :return: SQL-string
+    """
+    sql = ORDER_BY_PATTERN.sub(_order_nulls, sql)
+    return PLACEHOLDER_PATTERN.sub(lambda match: "?" if match.group(1) == "s" else "%", sql)
+
+
+def _order_nulls(match: re.Match[str]) -> str:
+    """
+    Add explicit NULL ordering to items of ORDER BY clause
+    :param match: Match of ORDER BY clause
+    :return: SQL-string
+    """
+    items = []
+    for item in match.group(1).split(", "):
+        if "NULLS" not in item.upper():
+            item = f"{item} NULLS {'FIRST' if item.upper().endswith(' DESC') else 'LAST'}"
+        items.append(item)
+    return f"ORDER BY {', '.join(items)}"
+
+
+def to_sqlite_value(value: Any) -> Any:
+    """
+    Convert value to the type stored by SQLite
+    Values of the same type are converted equally, so comparisons of stored values and parameters are consistent.
+    Aware datetime is converted to UTC, so ISO strings of different offsets are ordered as instants
+    :param value: Python value
+    :return: SQLite value
+    """
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime | date | time_of_day):
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, dict | list):
+        return json.dumps(value)
+    return value
+
+
+def from_sqlite_value(value: Any, kind: type | None) -> Any:
+    """
+    Convert SQLite value back to the type of the mirrored column, inverse of to_sqlite_value()
+    :param value: SQLite value
+    :param kind: Type of the column values loaded from the primary, None if it is unknown
+    :return: Python value
+    """
+    convert = SQLITE_CONVERTERS.get(kind) if value is not None and kind is not None else None
+    return value if convert is None else convert(value)
+
+
+class SqliteMirror(AbstractExecutor):  # pylint: disable=too-many-instance-attributes
+    """
+    Executor wrapper, serving read-only queries of small read-heavy tables from the local SQLite copy. Example:
+        mirror = SqliteMirror(pool, [Country, Plan], refresh_interval=30)
+        await Country.objects.fetch(mirror, Country.code == "NL")  # SQLite, no round trip
+        await Order.objects.fetch(mirror)  # not mirrored table, primary
+    Read-only query is served from the mirror, when all tables of the query are mirrored. Mirrored table is
+    loaded from the primary on the first read and reloaded, when it is older than refresh interval
+    or invalidated by invalidate() (for example, from LISTEN/NOTIFY handler). Writes go to the primary and
+    invalidate mirrored tables they modify. Query using syntax, which is not supported by SQLite,
+    falls back to the primary.
+    Types of column values are recorded on load and result columns are converted back to them (bool, Decimal,
+    datetime, UUID, JSON), Decimal keeps float precision. Computed columns (count, EXISTS) are returned as SQLite
+    computes them, so query computing columns from values of converted types falls back to the primary.
+    NULL values are ordered as in PostgreSQL.
+    Table names of mirrored tables should not be schema-qualified.
+    """
+
+    def __init__(
+        self,
+        executor: AbstractExecutor,
+        tables: Iterable[Any],
+        refresh_interval: float | None = DEFAULT_REFRESH_INTERVAL,
+        path: str = ":memory:",
+    ) -> None:
+        """
+        Initialize mirror
+        :param executor: Primary executor
+        :param tables: Mirrored table model classes
+        :param refresh_interval: Maximum age of the mirrored table in seconds, None to reload only invalidated tables
+        :param path: Path to the SQLite database, in-memory database by default
+        """
+        self.executor: AbstractExecutor = executor
+        self.tables: dict[str, Any] = {table.config.tablename: table for table in tables}
+        self.refresh_interval: float | None = refresh_interval
+        self.database: sqlite3.Connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.database.row_factory = sqlite3.Row
+        self.database.execute("PRAGMA case_sensitive_like = ON")
+        self.__loaded: dict[str, float] = {}
+        self.__versions: dict[str, int] = {}
+        self.__types: dict[str, dict[str, type | None]] = {}
+        self.__locks: dict[str, asyncio.Lock] = {}
+
+    async def fetch(self, query: Query) -> list[Row]:
+        """
+        Execute query on the mirror or the primary and return result rows
+        :param query: Query object
+        :return: List of rows
+        """
+        tables = query_tables(query.sql)
+        if not query.readonly:
+            rows = await self.executor.fetch(query)
+            self.invalidate(*tables)
+            return rows
+        if not tables or not tables.issubset(self.tables):
+            return await self.executor.fetch(query)
+
+        for name in tables:
+            await self.__ensure_loaded(name)
+        try:
+            cursor = self.database.execute(to_sqlite(query.sql), [to_sqlite_value(param) for param in query.params])
+        except sqlite3.Error:
+            return await self.executor.fetch(query)
+
+        names = [description[0] for description in cursor.description]
+        kinds = self.__result_types(tables, names, query.sql)
+        if kinds is None:
+            return await self.executor.fetch(query)
+        return [
+            {name: from_sqlite_value(value, kind) for name, kind, value in zip(names, kinds, row)}
+            for row in cursor.fetchall()
+        ]
+
+    async def execute(self, query: Query) -> None:
+        """
+        Execute query on the primary and invalidate modified mirrored tables
+        :param query: Query object
+        :return: None
+        """
+        await self.executor.execute(query)
+        if not query.readonly:
+            self.invalidate(*query_tables(query.sql))
+
+    async def refresh(self, *tables: Any) -> None:
+        """
+        Reload mirrored tables from the primary
+        :param tables: Table model classes, all mirrored tables if not provided
+        :return: None
+        """
+        for name in [table.config.tablename for table in tables] or list(self.tables):
+            async with self.__lock(name):
+                await self.__load(name)
+
+    def invalidate(self, *tables: Any) -> None:
+        """
+        Mark mirrored tables stale, so they are reloaded on the next read
+        :param tables: Table model classes or table names
+        :return: None
+        """
+        for table in tables:
+            name = table if isinstance(table, str) else table.config.tablename
+            self.__loaded.pop(name, None)
+            self.__versions[name] = self.__versions.get(name, 0) + 1
+
+    def close(self) -> None:
+        """
+        Close SQLite database
+        :return: None
+        """
+        self.database.close()
+
+    async def __ensure_loaded(self, name: str) -> None:
+        """
+        Load mirrored table, when it is not loaded or outdated
+        Concurrent readers of the stale table wait for the single reload
+        :param name: Table name
+        :return: None
+        """
+        if not self.__stale(name):
+            return
+        async with self.__lock(name):
+            if self.__stale(name):
+                await self.__load(name)
+
+    def __stale(self, name: str) -> bool:
+        """
+        Check that mirrored table should be reloaded
+        :param name: Table name
+        :return: Bool
+        """
+        loaded = self.__loaded.get(name)
+        if loaded is None:
+            return True
+        return self.refresh_interval is not None and time.monotonic() - loaded >= self.refresh_interval
+
+    def __result_types(self, tables: set[str], names: list[str], sql: str) -> list[type | None] | None:
+        """
+        Types of result columns, resolved by name of mirrored table column (<table>__<column> with joins)
+        :param tables: Names of the query tables
+        :param names: Result column names
+        :param sql: SQL-string
+        :return: List of types (None if type is unknown) or None, if computed column can use values of converted types
+        """
+        kinds: list[type | None] = []
+        for name in names:
+            table, _, column = name.partition("__")
+            if column and column in self.__types.get(table, {}):
+                kinds.append(self.__types[table][column])
+                continue
+            owners = [self.__types[table][name] for table in tables if name in self.__types[table]]
+            if len(owners) == 1:
+                kinds.append(owners[0])
+                continue
+            if self.__computes_converted(tables, sql):
+                return None
+            kinds.append(None)
+        return kinds
+
+    def __computes_converted(self, tables: set[str], sql: str) -> bool:
+        """
+        Check that selected expressions use columns, which values are converted for SQLite
+        :param tables: Names of the query tables
+        :param sql: SQL-string
+        :return: Bool
+        """
+        selected = sql.split(" FROM ", 1)[0]
+        return any(
+            f"{table}.{column}" in selected
+            for table in tables
+            for column, kind in self.__types[table].items()
+            if kind in SQLITE_CONVERTERS
+        )
+
+    def __lock(self, name: str) -> asyncio.Lock:
+        """
+        Lock of reloading the table
+        :param name: Table name
+        :return: asyncio.Lock
+        """
+        return self.__locks.setdefault(name, asyncio.Lock())
+
+    async def __load(self, name: str) -> None:
+        """
+        Fetch all rows of the table from the primary and replace its copy in one SQLite transaction,
+        so readers never see partially loaded table. Table invalidated during fetching stays stale.
+        Type of the first not NULL value of every column is recorded to convert results back
+        :param name: Table name
+        :return: None
+        """
+        table = self.tables[name]
+        columns = list(table.model_fields)
+        started, version = time.monotonic(), self.__versions.get(name, 0)
+        rows = await self.executor.fetch(table.objects.build_select())
+        kinds = {
+            column: next((type(row[column]) for row in rows if row[column] is not None), None) for column in columns
+        }
+
+        self.database.execute("BEGIN")
+        try:
+            self.database.execute(f"DROP TABLE IF EXISTS {name}")
+            self.database.execute(f"CREATE TABLE {name} ({', '.join(columns)})")
+            if table.config.pk:
+                self.database.execute(f"CREATE UNIQUE INDEX {name}_pk ON {name} ({table.config.pk})")
+            for number, index in enumerate(table.config.indexes):
+                self.database.execute(f"CREATE INDEX {name}_{number} ON {name} ({', '.join(index.columns)})")
+            self.database.executemany(
+                f"INSERT INTO {name} VALUES ({', '.join('?' for _ in columns)})",
+                ([to_sqlite_value(row[column]) for column in columns] for row in rows),
+            )
+            self.database.execute("COMMIT")
+        except BaseException:
+            self.database.execute("ROLLBACK")
+            raise
+        self.__types[name] = kinds
+        if self.__versions.get(name, 0) == version:
+            self.__loaded[name] = started
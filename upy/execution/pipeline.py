@@ -0,0 +1,156 @@
+"""Pipelined execution of independent queries"""
+import asyncio
+from types import TracebackType
+from typing import Type
+
+from upy.core.abstract_connection import AbstractConnection, AbstractPool
+from upy.core.abstract_executor import AbstractExecutor, Row
+from upy.utils import Query
+
+DEFAULT_CONCURRENCY = 10
+
+
+class Pipeline:
+    """
+    Collect independent queries and send them without waiting for each response
+    Pipeline mode of the connection is used when the driver supports it,
+    otherwise queries are executed concurrently (over pooled connections for pools).
+    Every added query gets its own future, so an error of one query does not affect others.
+    Example:
+        async with pipeline(pool) as p:
+            first = p.add(query)
+            second = p.add(other_query)
+        rows = first.result()
+    """
+
+    def __init__(self, executor: AbstractExecutor, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        """
+        Initialize pipeline
+        :param executor: Query executor
+        :param concurrency: Maximum number of concurrently executed queries, when pipeline mode is not supported
+        """
+        self.executor: AbstractExecutor = executor
+        self.concurrency: int = concurrency
+        self.__pending: list[tuple[Query, asyncio.Future[list[Row]]]] = []
+
+    def add(self, query: Query) -> "asyncio.Future[list[Row]]":
+        """
+        Add query to the pipeline
+        :param query: Query object
+        :return: Future with result rows of the query
+        """
+        future: asyncio.Future[list[Row]] = asyncio.get_running_loop().create_future()
+        self.__pending.append((query, future))
+        return future
+
+    async def flush(self) -> None:
+        """
+        Send all pending queries and resolve their futures
+        :return: None
+        """
+        pending, self.__pending = self.__pending, []
+        if not pending:
+            return
+
+        queries = [query for query, _ in pending]
+        futures = [future for _, future in pending]
+
+        if isinstance(self.executor, AbstractConnection) and self.executor.supports_pipeline:
+            self.__resolve(futures, await self.__fetch_pipeline(self.executor, queries))
+        elif isinstance(self.executor, AbstractPool) and self.executor.supports_pipeline:
+            async with self.executor.acquire() as connection:
+                self.__resolve(futures, await self.__fetch_pipeline(connection, queries))
+        else:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            await asyncio.gather(*[self.__fetch(semaphore, query, future) for query, future in pending])
+
+    def cancel(self) -> None:
+        """
+        Cancel all pending queries
+        :return: None
+        """
+        pending, self.__pending = self.__pending, []
+        for _, future in pending:
+            future.cancel()
+
+    async def __aenter__(self) -> "Pipeline":
+        """
+        Enter pipeline context
+        :return: Pipeline
+        """
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        """
+        Flush pending queries on exit or cancel them if context exited with error
+        :return: None
+        """
+        if exc_type is not None:
+            self.cancel()
+            return
+
+        await self.flush()
+
+    async def __fetch(self, semaphore: asyncio.Semaphore, query: Query, future: "asyncio.Future[list[Row]]") -> None:
+        """
+        Execute one query and resolve its future
+        :param semaphore: Concurrency limiter
+        :param query: Query object
+        :param future: Future of the query
+        :return: None
+        """
+        async with semaphore:
+            try:
+                result = await self.executor.fetch(query)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                if not future.done():
+                    future.set_exception(exc)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    @staticmethod
+    async def __fetch_pipeline(
+        connection: AbstractConnection, queries: list[Query]
+    ) -> list[list[Row] | BaseException]:
+        """
+        Send queries in pipeline mode, an error of the whole pipeline is propagated to every query
+        :param connection: Connection with pipeline support
+        :param queries: Query objects
+        :return: List of result rows or exceptions
+        """
+        try:
+            return await connection.fetch_pipeline(queries)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            return [exc for _ in queries]
+
+    @staticmethod
+    def __resolve(futures: list["asyncio.Future[list[Row]]"], results: list[list[Row] | BaseException]) -> None:
+        """
+        Resolve futures by pipeline results
+        :param futures: Futures of queries
+        :param results: Result rows or exceptions
+        :return: None
+        """
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def pipeline(executor: AbstractExecutor, concurrency: int = DEFAULT_CONCURRENCY) -> Pipeline:
+    """
+    Create pipeline context for independent queries
+    :param executor: Query executor
+    :param concurrency: Maximum number of concurrently executed queries, when pipeline mode is not supported
+    :return: Pipeline
+    """
+    return Pipeline(executor, concurrency=concurrency)
@@ -0,0 +1,218 @@
+"""Per-connection cache of server-side prepared statements"""
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from weakref import WeakKeyDictionary
+
+from upy.core.abstract_connection import AbstractConnection, AbstractPool
+from upy.core.abstract_executor import Row
+from upy.execution.templates import TEMPLATES, Template
+from upy.utils import Query
+
+DEFAULT_CAPACITY = 256
+
+
+class PreparedStatementStats:
+    """
+    Counters of prepared statement cache
+    """
+
+    __slots__ = ("hits", "misses", "evictions")
+
+    def __init__(self, hits: int = 0, misses: int = 0, evictions: int = 0) -> None:
+        """
+        Initialize counters
+        :param hits: Number of queries executed by already prepared statement
+        :param misses: Number of prepared statements
+        :param evictions: Number of deallocated statements
+        """
+        self.hits: int = hits
+        self.misses: int = misses
+        self.evictions: int = evictions
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Part of queries executed by already prepared statement
+        :return: Float from 0 to 1
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __add__(self, other: "PreparedStatementStats") -> "PreparedStatementStats":
+        """
+        Sum counters
+        :param other: Other counters
+        :return: PreparedStatementStats
+        """
+        return PreparedStatementStats(
+            self.hits + other.hits, self.misses + other.misses, self.evictions + other.evictions
+        )
+
+
+def statement_name(sql: str) -> str:
+    """
+    Stable prepared statement name for the query shape
+    Rendered and normalized SQL-strings of the same shape have the same name
+    :param sql: Rendered or normalized SQL-string
+    :return: Statement name
+    """
+    return f"upy_{TEMPLATES.compile(sql).fingerprint}"
+
+
+class PreparedConnection(AbstractConnection):  # pylint: disable=abstract-method
+    """
+    Connection wrapper, executing queries by server-side prepared statements
+    Statements are kept in LRU cache keyed by normalized SQL, so lists of values (IN) of different length
+    share one statement. Least recently used statement is deallocated when the cache is full.
+    Cache is disabled when enabled is False (for example behind pgbouncer in transaction pooling mode)
+    or when connection does not support prepared statements.
+    """
+
+    def __init__(self, connection: AbstractConnection, capacity: int = DEFAULT_CAPACITY, enabled: bool = True) -> None:
+        """
+        Initialize prepared connection
+        :param connection: Driver connection
+        :param capacity: Maximum number of prepared statements on the connection
+        :param enabled: Use prepared statements
+        """
+        self.connection: AbstractConnection = connection
+        self.capacity: int = capacity
+        self.enabled: bool = enabled and connection.supports_prepare
+        self.supports_pipeline = connection.supports_pipeline
+        self.supports_cancel = connection.supports_cancel
+        self.stats: PreparedStatementStats = PreparedStatementStats()
+        self.__statements: OrderedDict[str, str] = OrderedDict()
+
+    @property
+    def statements(self) -> list[str]:
+        """
+        Names of prepared statements from least to most recently used
+        :return: List of statement names
+        """
+        return list(self.__statements.keys())
+
+    async def fetch(self, query: Query) -> list[Row]:
+        """
+        Execute query by prepared statement and return result rows
+        :param query: Query object
+        :return: List of rows
+        """
+        if not self.enabled:
+            return await self.connection.fetch(query)
+
+        template = TEMPLATES.compile(query.sql)
+        name = await self.__prepare(template)
+        return await self.connection.fetch_prepared(name, template.apply(query.params))
+
+    async def execute(self, query: Query) -> None:
+        """
+        Execute query by prepared statement, or by the wrapped connection when cache is disabled
+        :param query: Query object
+        :return: None
+        """
+        if not self.enabled:
+            await self.connection.execute(query)
+            return
+        await self.fetch(query)
+
+    async def fetch_pipeline(self, queries: list[Query]) -> list[list[Row] | BaseException]:
+        """
+        Send queries in pipeline mode of the wrapped connection
+        :param queries: Query objects
+        :return: List of result rows or exceptions
+        """
+        return await self.connection.fetch_pipeline(queries)
+
+    async def cancel(self) -> None:
+        """
+        Cancel query running on the wrapped connection
+        :return: None
+        """
+        await self.connection.cancel()
+
+    async def copy_out(self, query: Query) -> AsyncIterator[bytes]:  # pylint: disable=invalid-overridden-method
+        """
+        Stream output of COPY query from the wrapped connection, COPY is never prepared
+        :param query: Query object with COPY statement
+        :return: Async iterator of output chunks
+        """
+        async for chunk in self.connection.copy_out(query):
+            yield chunk
+
+    async def clear(self) -> None:
+        """
+        Deallocate all prepared statements
+        :return: None
+        """
+        while self.__statements:
+            await self.__evict()
+
+    async def __prepare(self, template: Template) -> str:
+        """
+        Get prepared statement from the cache or prepare new one
+        :param template: Compiled query template
+        :return: Statement name
+        """
+        name = statement_name(template.sql)
+        if name in self.__statements:
+            self.__statements.move_to_end(name)
+            self.stats.hits += 1
+            return name
+
+        while len(self.__statements) >= self.capacity:
+            await self.__evict()
+
+        await self.connection.prepare(name, template.sql)
+        self.__statements[name] = template.sql
+        self.stats.misses += 1
+        return name
+
+    async def __evict(self) -> None:
+        """
+        Deallocate least recently used statement
+        :return: None
+        """
+        name, _ = self.__statements.popitem(last=False)
+        self.stats.evictions += 1
+        await self.connection.deallocate(name)
+
+
+class PreparedPool(AbstractPool):
+    """
+    Pool wrapper, keeping prepared statement cache for every pooled connection
+    """
+
+    def __init__(self, pool: AbstractPool, capacity: int = DEFAULT_CAPACITY, enabled: bool = True) -> None:
+        """
+        Initialize prepared pool
+        :param pool: Driver pool
+        :param capacity: Maximum number of prepared statements per connection
+        :param enabled: Use prepared statements
+        """
+        self.pool: AbstractPool = pool
+        self.capacity: int = capacity
+        self.enabled: bool = enabled
+        self.supports_pipeline = pool.supports_pipeline
+        self.__connections: WeakKeyDictionary[AbstractConnection, PreparedConnection] = WeakKeyDictionary()
+
+    @property
+    def stats(self) -> PreparedStatementStats:
+        """
+        Counters summed over all pooled connections
+        :return: PreparedStatementStats
+        """
+        return sum((connection.stats for connection in self.__connections.values()), PreparedStatementStats())
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[AbstractConnection]:  # pylint: disable=invalid-overridden-method
+        """
+        Acquire connection with prepared statement cache
+        :return: Async context manager with connection
+        """
+        async with self.pool.acquire() as connection:
+            prepared = self.__connections.get(connection)
+            if prepared is None:
+                prepared = PreparedConnection(connection, capacity=self.capacity, enabled=self.enabled)
+                self.__connections[connection] = prepared
+            yield prepared
@@ -0,0 +1,138 @@
+"""Read replica routing"""
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+from typing import Awaitable, Callable, Iterator
+
+from upy.core.abstract_executor import AbstractExecutor, Row
+from upy.utils import Query
+
+LagProbe = Callable[[AbstractExecutor], Awaitable[float]]
+
+LAG_QUERY = Query(
+    "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) AS lag", readonly=True
+)
+DEFAULT_MAX_LAG = 5.0
+DEFAULT_LAG_INTERVAL = 1.0
+
+
+async def probe_replication_lag(replica: AbstractExecutor) -> float:
+    """
+    Measure replication lag of PostgreSQL replica
+    :param replica: Replica executor
+    :return: Lag in seconds
+    """
+    rows = await replica.fetch(LAG_QUERY)
+    return float(rows[0]["lag"]) if rows else 0.0
+
+
+class ReplicaRouter(AbstractExecutor):  # pylint: disable=too-many-instance-attributes
+    """
+    Route read-only queries (SELECT) to replicas and all other queries to the primary
+    Replica is used only when its replication lag is below max_lag, otherwise query falls back to the primary.
+    Read-your-writes: after a write in the current context (asyncio task), reads of this context go to
+    a replica only when its lag is lower than the time passed since the write.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        primary: AbstractExecutor,
+        replicas: list[AbstractExecutor],
+        max_lag: float = DEFAULT_MAX_LAG,
+        lag_interval: float = DEFAULT_LAG_INTERVAL,
+        lag_probe: LagProbe = probe_replication_lag,
+    ) -> None:
+        """
+        Initialize router
+        :param primary: Primary executor
+        :param replicas: Replica executors
+        :param max_lag: Maximum replication lag in seconds for replica to be used
+        :param lag_interval: Interval in seconds between lag measurements of the replica
+        :param lag_probe: Async function measuring lag of the replica
+        """
+        self.primary: AbstractExecutor = primary
+        self.replicas: list[AbstractExecutor] = replicas
+        self.max_lag: float = max_lag
+        self.lag_interval: float = lag_interval
+        self.lag_probe: LagProbe = lag_probe
+        self.__lags: dict[int, tuple[float, float]] = {}
+        self.__counter: Iterator[int] = count()
+        self.__last_write: ContextVar[float | None] = ContextVar(f"upy_last_write_{id(self)}", default=None)
+        self.__force_primary: ContextVar[bool] = ContextVar(f"upy_force_primary_{id(self)}", default=False)
+
+    @contextmanager
+    def use_primary(self) -> Iterator[None]:
+        """
+        Route all queries of the current context to the primary
+        :return: Context manager
+        """
+        token = self.__force_primary.set(True)
+        try:
+            yield
+        finally:
+            self.__force_primary.reset(token)
+
+    async def route(self, query: Query) -> AbstractExecutor:
+        """
+        Choose executor for the query
+        :param query: Query object
+        :return: Primary or replica executor
+        """
+        if not query.readonly:
+            self.__last_write.set(time.monotonic())
+            return self.primary
+
+        if self.__force_primary.get() or not self.replicas:
+            return self.primary
+
+        last_write = self.__last_write.get()
+        allowed_lag = self.max_lag if last_write is None else min(self.max_lag, time.monotonic() - last_write)
+
+        start = next(self.__counter)
+        for offset in range(len(self.replicas)):
+            index = (start + offset) % len(self.replicas)
+            if await self.__lag(index) < allowed_lag:
+                return self.replicas[index]
+
+        return self.primary
+
+    async def fetch(self, query: Query) -> list[Row]:
+        """
+        Execute query on routed executor and return result rows
+        :param query: Query object
+        :return: List of rows
+        """
+        executor = await self.route(query)
+        return await executor.fetch(query)
+
+    async def execute(self, query: Query) -> None:
+        """
+        Execute query on routed executor
+        :param query: Query object
+        :return: None
+        """
+        executor = await self.route(query)
+        await executor.execute(query)
+
+    async def __lag(self, index: int) -> float:
+        """
+        Replication lag of the replica, measured not more often than lag_interval
+        Age of the last measurement is added to the measured lag as upper bound of staleness.
+        Unavailable replica has infinite lag
+        :param index: Replica index
+        :return: Lag in seconds
+        """
+        now = time.monotonic()
+        measured = self.__lags.get(index)
+        if measured is not None and now - measured[0] < self.lag_interval:
+            return measured[1] + now - measured[0]
+
+        try:
+            lag = await self.lag_probe(self.replicas[index])
+        except Exception:  # pylint: disable=broad-exception-caught
+            lag = math.inf
+
+        self.__lags[index] = (now, lag)
+        return lag
@@ -0,0 +1,111 @@
+"""Shard routing"""
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, TypeVar
+
+from upy.core.abstract_executor import AbstractExecutor, Row
+from upy.exceptions import UndefinedShard
+from upy.utils import Query, ShardedQuery
+
+T = TypeVar("T")
+
+DEFAULT_CONCURRENCY = 8
+
+
+def _sort_key(column: str, row: Row) -> tuple[bool, Any]:
+    """
+    Sort key of the merged row, NULL values are ordered last as in PostgreSQL ascending order
+    :param column: Result column name
+    :param row: Row
+    :return: Sort key
+    """
+    return row[column] is None, row[column]
+
+
+class ShardRouter(AbstractExecutor):
+    """
+    Route queries of sharded tables to database nodes
+    Query with resolved nodes (filtered by shard key) is executed only on these nodes,
+    otherwise it fans out to all nodes. Results of multiple nodes are merged in ORDER BY order
+    and LIMIT/OFFSET are applied to the merged result.
+    Aggregates are not merged by the router: QueryBuilder merges count, exists and aggregates of multiple nodes,
+    raw aggregate queries of multiple nodes are returned as separate rows.
+    """
+
+    def __init__(self, nodes: dict[str, AbstractExecutor], concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        """
+        Initialize router
+        :param nodes: Executors by node name
+        :param concurrency: Maximum number of nodes queried at the same time
+        """
+        self.nodes: dict[str, AbstractExecutor] = nodes
+        self.concurrency: int = concurrency
+
+    def route(self, query: Query) -> list[AbstractExecutor]:
+        """
+        Choose executors for the query
+        Read-only query without routing information fans out to all nodes
+        :param query: Query object
+        :return: List of executors
+        """
+        if not isinstance(query, ShardedQuery):
+            if not query.readonly:
+                raise UndefinedShard("Writing query without shard routing information can not be executed")
+            return list(self.nodes.values())
+
+        if query.nodes is None:
+            return list(self.nodes.values())
+
+        unknown = query.nodes - self.nodes.keys()
+        if unknown:
+            raise UndefinedShard(f"Unknown database nodes: {', '.join(sorted(unknown))}")
+        return [self.nodes[name] for name in sorted(query.nodes)]
+
+    async def fetch(self, query: Query) -> list[Row]:
+        """
+        Execute query on routed nodes and merge result rows
+        :param query: Query object
+        :return: List of rows
+        """
+        results = await self.__gather([executor.fetch(query) for executor in self.route(query)])
+        rows: list[Row] = [row for result in results for row in result]
+        if not isinstance(query, ShardedQuery):
+            return rows
+
+        if len(results) > 1:
+            for column, descending in reversed(query.ordering):
+                rows.sort(key=partial(_sort_key, column), reverse=descending)
+
+        end = None if query.limit is None else query.offset + query.limit
+        rows = rows[query.offset:end]
+        if query.hidden:
+            rows = [{key: value for key, value in row.items() if key not in query.hidden} for row in rows]
+        return rows
+
+    async def execute(self, query: Query) -> None:
+        """
+        Execute query on routed nodes
+        :param query: Query object
+        :return: None
+        """
+        await self.__gather([executor.execute(query) for executor in self.route(query)])
+
+    async def __gather(self, awaitables: list[Awaitable[T]]) -> list[T]:
+        """
+        Run awaitables concurrently, limited by concurrency of the router
+        :param awaitables: Awaitables of node executors
+        :return: List of results in order of awaitables
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return list(await asyncio.gather(*(self.__limited(semaphore, awaitable) for awaitable in awaitables)))
+
+    @staticmethod
+    async def __limited(semaphore: asyncio.Semaphore, awaitable: Awaitable[T]) -> T:
+        """
+        Await under concurrency limiter
+        :param semaphore: Concurrency limiter
+        :param awaitable: Awaitable of node executor
+        :return: Result of awaitable
+        """
+        async with semaphore:
+            return await awaitable
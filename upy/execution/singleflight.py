@@ -0,0 +1,163 @@
+"""Single-flight deduplication of identical read queries"""
+import asyncio
+from collections import Counter
+from functools import partial
+from typing import Any, Hashable, Sequence
+
+from upy.core.abstract_executor import AbstractExecutor, Row
+from upy.execution.templates import TEMPLATES
+from upy.utils import Query
+
+
+class SingleFlightStats:  # pylint: disable=too-few-public-methods
+    """
+    Counters of deduplicated queries by query fingerprint
+        executed - Queries sent to the wrapped executor
+        shared - Callers served by result of the query already in flight
+        peak - Maximum number of callers waiting for the same query
+    """
+
+    __slots__ = ("executed", "shared", "peak")
+
+    def __init__(self) -> None:
+        """
+        Initialize counters
+        """
+        self.executed: Counter[str] = Counter()
+        self.shared: Counter[str] = Counter()
+        self.peak: Counter[str] = Counter()
+
+
+class _Flight:  # pylint: disable=too-few-public-methods
+    """
+    Query in flight, its fingerprint and number of its callers
+    """
+
+    __slots__ = ("task", "fingerprint", "callers")
+
+    def __init__(self, task: asyncio.Task[list[Row]], fingerprint: str) -> None:
+        """
+        Initialize flight
+        :param task: Task executing the query
+        :param fingerprint: Fingerprint of the query
+        """
+        self.task: asyncio.Task[list[Row]] = task
+        self.fingerprint: str = fingerprint
+        self.callers: int = 0
+
+
+class SingleFlight(AbstractExecutor):
+    """
+    Executor wrapper, sharing result of the read-only query between concurrent callers. Example:
+        executor = SingleFlight(pool)
+        await asyncio.gather(*(Table.objects.fetch(executor, Table.id == 1) for _ in range(100)))  # one query
+    Queries are identical, when they have the same normalized SQL and parameters. Caller of the query, which is
+    already in flight, awaits its result instead of sending another query, so the result can be as old as
+    the start of the first query. Every caller gets own copy of the rows.
+    Modifying queries and queries with unhashable parameters are always executed.
+    Query is cancelled only when all its callers are cancelled.
+    """
+
+    def __init__(self, executor: AbstractExecutor) -> None:
+        """
+        Initialize single-flight executor
+        :param executor: Wrapped executor
+        """
+        self.executor: AbstractExecutor = executor
+        self.stats: SingleFlightStats = SingleFlightStats()
+        self.__flights: dict[tuple[str, Hashable], _Flight] = {}
+
+    @property
+    def in_flight(self) -> dict[str, int]:
+        """
+        Number of callers of queries in flight by query fingerprint
+        :return: Mapping of fingerprint to number of callers
+        """
+        callers: Counter[str] = Counter()
+        for flight in self.__flights.values():
+            callers[flight.fingerprint] += flight.callers
+        return dict(callers)
+
+    async def fetch(self, query: Query) -> list[Row]:
+        """
+        Execute query or join identical query in flight and return result rows
+        :param query: Query object
+        :return: List of rows
+        """
+        if not query.readonly:
+            return await self.executor.fetch(query)
+
+        template = TEMPLATES.compile(query.sql)
+        key = self.__key(template.sql, template.apply(query.params))
+        if key is None:
+            return await self.executor.fetch(query)
+
+        flight = self.__flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(self.executor.fetch(query)), template.fingerprint)
+            flight.task.add_done_callback(partial(self.__land, key))
+            self.__flights[key] = flight
+            self.stats.executed[flight.fingerprint] += 1
+        else:
+            self.stats.shared[flight.fingerprint] += 1
+
+        flight.callers += 1
+        self.stats.peak[flight.fingerprint] = max(self.stats.peak[flight.fingerprint], flight.callers)
+        try:
+            rows = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.callers == 1 and not flight.task.done():
+                self.__forget(key, flight.task)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.callers -= 1
+        return [dict(row) for row in rows]
+
+    async def execute(self, query: Query) -> None:
+        """
+        Execute query, it is never deduplicated
+        :param query: Query object
+        :return: None
+        """
+        await self.executor.execute(query)
+
+    def __land(self, key: tuple[str, Hashable], task: asyncio.Task[list[Row]]) -> None:
+        """
+        Remove finished query, so the next caller sends new query
+        Error is marked retrieved, because all callers could be cancelled before query failed
+        :param key: Key of the query
+        :param task: Finished task
+        :return: None
+        """
+        self.__forget(key, task)
+        if not task.cancelled():
+            task.exception()
+
+    def __forget(self, key: tuple[str, Hashable], task: asyncio.Task[list[Row]]) -> None:
+        """
+        Remove query from flights, unless the key is already taken by the next query
+        Cancelled query is removed before cancellation, so new callers do not join it
+        :param key: Key of the query
+        :param task: Task of the query
+        :return: None
+        """
+        flight = self.__flights.get(key)
+        if flight is not None and flight.task is task:
+            del self.__flights[key]
+
+    @staticmethod
+    def __key(sql: str, params: Sequence[Any]) -> tuple[str, Hashable] | None:
+        """
+        Key of identical queries: SQL and parameters of normalized query
+        Parameters are normalized, because different lists of placeholders have the same SQL
+        :param sql: Normalized SQL-string
+        :param params: Normalized execution parameters
+        :return: Tuple or None, if parameters are not hashable
+        """
+        key_params: tuple[Any, ...] = tuple(tuple(param) if isinstance(param, list) else param for param in params)
+        try:
+            hash(key_params)
+        except TypeError:
+            return None
+        return sql, key_params
@@ -0,0 +1,239 @@
+"""Slow query log"""
+import asyncio
+import logging
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+from pydantic import BaseModel
+
+from upy.core.abstract_connection import AbstractConnection, AbstractPool
+from upy.core.abstract_executor import AbstractExecutor, Row
+from upy.execution.templates import TEMPLATES
+from upy.utils import Query
+
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+TABLE_PATTERN = re.compile(r"\b(?:FROM|UPDATE|INTO)\s+([\w.\"]+)", re.IGNORECASE)
+
+
+class SlowQuery(BaseModel):
+    """
+    Record of the slow query
+        fingerprint - Fingerprint of normalized query shape
+        sql - Normalized SQL-string
+        table - First table of the query
+        params - Number of execution parameters
+        rows - Number of returned rows, None for executed and failed queries
+        duration - Duration in seconds
+        started - Start time of the query
+        error - Error of the failed query, for example timeout or cancellation
+        plan - Output of EXPLAIN (ANALYZE, BUFFERS) for sampled queries
+        plan_error - Error of capturing the plan
+    """
+
+    fingerprint: str
+    sql: str
+    table: str | None
+    params: int
+    rows: int | None
+    duration: float
+    started: datetime
+    error: str | None = None
+    plan: Any = None
+    plan_error: str | None = None
+
+
+def query_table(sql: str) -> str | None:
+    """
+    Resolve first table of the query
+    :param sql: SQL-string
+    :return: Table name or None
+    """
+    match = TABLE_PATTERN.search(sql)
+    return match.group(1) if match else None
+
+
+class SlowQueryLog(AbstractExecutor):  # pylint: disable=too-many-instance-attributes
+    """
+    Executor wrapper, recording queries slower than threshold to the rotating file or callback
+    Failed queries are recorded with error, when they fail after threshold (for example by timeout).
+    For sampled part of slow successful queries the plan is captured by EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)
+    on the separate explain executor in background, so the caller is not delayed.
+    Modifying queries are explained inside transaction, which is rolled back. Explain connection,
+    which is not a pool, runs one EXPLAIN at a time, so transactions of explained queries do not interleave.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        executor: AbstractExecutor,
+        threshold: float = DEFAULT_THRESHOLD,
+        sample_rate: float = 0.0,
+        explain_executor: AbstractConnection | AbstractPool | None = None,
+        callback: Callable[[SlowQuery], None] | None = None,
+        path: str | Path | None = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+    ) -> None:
+        """
+        Initialize slow query log
+        :param executor: Wrapped executor
+        :param threshold: Minimum duration of logged query in seconds
+        :param sample_rate: Part of slow queries, explained by EXPLAIN ANALYZE, from 0 to 1
+        :param explain_executor: Separate connection or pool for EXPLAIN queries
+        :param callback: Function receiving slow query records
+        :param path: Path to the log file, records are written as JSON lines
+        :param max_bytes: Maximum size of the log file before rotation
+        :param backup_count: Number of rotated log files
+        """
+        self.executor: AbstractExecutor = executor
+        self.threshold: float = threshold
+        self.sample_rate: float = sample_rate
+        self.explain_executor: AbstractConnection | AbstractPool | None = explain_executor
+        self.callback: Callable[[SlowQuery], None] | None = callback
+        self.logger: logging.Logger = logging.Logger("upy.slow_queries")
+        if path is not None:
+            self.logger.addHandler(RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count))
+        self.__tasks: set[asyncio.Task[None]] = set()
+        self.__explain_lock: asyncio.Lock = asyncio.Lock()
+
+    async def fetch(self, query: Query) -> list[Row]:
+        """
+        Execute query and return result rows, record it when it is slow
+        :param query: Query object
+        :return: List of rows
+        """
+        started, clock = datetime.now(timezone.utc), time.perf_counter()
+        try:
+            rows = await self.executor.fetch(query)
+        except BaseException as exc:
+            self.__observe(query, started, time.perf_counter() - clock, None, exc)
+            raise
+        self.__observe(query, started, time.perf_counter() - clock, len(rows))
+        return rows
+
+    async def execute(self, query: Query) -> None:
+        """
+        Execute query, record it when it is slow
+        :param query: Query object
+        :return: None
+        """
+        started, clock = datetime.now(timezone.utc), time.perf_counter()
+        try:
+            await self.executor.execute(query)
+        except BaseException as exc:
+            self.__observe(query, started, time.perf_counter() - clock, None, exc)
+            raise
+        self.__observe(query, started, time.perf_counter() - clock, None)
+
+    async def flush(self) -> None:
+        """
+        Wait for capturing of pending plans
+        :return: None
+        """
+        while self.__tasks:
+            await asyncio.gather(*self.__tasks)
+
+    async def close(self) -> None:
+        """
+        Wait for pending plans and close log file
+        :return: None
+        """
+        await self.flush()
+        for handler in list(self.logger.handlers):
+            handler.close()
+            self.logger.removeHandler(handler)
+
+    def __observe(  # pylint: disable=too-many-arguments
+        self,
+        query: Query,
+        started: datetime,
+        duration: float,
+        rows: int | None,
+        error: BaseException | None = None,
+    ) -> None:
+        """
+        Record query, when it is slower than threshold. Plan of failed query is not captured
+        :param query: Executed query
+        :param started: Start time
+        :param duration: Duration in seconds
+        :param rows: Number of returned rows
+        :param error: Error of the failed query
+        :return: None
+        """
+        if duration < self.threshold:
+            return
+
+        template = TEMPLATES.compile(query.sql)
+        record = SlowQuery(
+            fingerprint=template.fingerprint,
+            sql=template.sql,
+            table=query_table(query.sql),
+            params=len(query.params),
+            rows=rows,
+            duration=duration,
+            started=started,
+            error=None if error is None else repr(error),
+        )
+        if error is not None or self.explain_executor is None or random.random() >= self.sample_rate:
+            self.__emit(record)
+            return
+
+        task = asyncio.get_running_loop().create_task(self.__explain(query, record))
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+
+    async def __explain(self, query: Query, record: SlowQuery) -> None:
+        """
+        Capture plan of the query and emit record
+        :param query: Explained query
+        :param record: Slow query record
+        :return: None
+        """
+        explain = Query(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query.sql}", query.params, readonly=query.readonly)
+        try:
+            async with self.__explain_connection() as connection:
+                if query.readonly:
+                    rows = await connection.fetch(explain)
+                else:
+                    await connection.execute(Query("BEGIN"))
+                    try:
+                        rows = await connection.fetch(explain)
+                    finally:
+                        await connection.execute(Query("ROLLBACK"))
+            record.plan = next(iter(rows[0].values())) if rows else None
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            record.plan_error = repr(exc)
+        self.__emit(record)
+
+    @asynccontextmanager
+    async def __explain_connection(self) -> AsyncIterator[AbstractConnection]:
+        """
+        Connection for EXPLAIN queries, acquired from the pool when explain executor is a pool.
+        Single explain connection is locked, so background explains do not share it concurrently
+        :return: Async context manager with connection
+        """
+        if isinstance(self.explain_executor, AbstractPool):
+            async with self.explain_executor.acquire() as connection:
+                yield connection
+        else:
+            async with self.__explain_lock:
+                yield self.explain_executor  # type: ignore[misc]
+
+    def __emit(self, record: SlowQuery) -> None:
+        """
+        Pass record to the callback and the log file
+        :param record: Slow query record
+        :return: None
+        """
+        if self.callback is not None:
+            self.callback(record)
+        if self.logger.handlers:
+            self.logger.warning(record.model_dump_json())
@@ -0,0 +1,272 @@
+"""Compiled query templates and their persistent cache"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, NamedTuple, Sequence
+
+IN_LIST_PATTERN = re.compile(r"\b(NOT )?IN \((%s(?:, %s)*)\)")
+PLACEHOLDER = "%s"
+
+TEMPLATE_CACHE_MAGIC = b"UPYT"
+TEMPLATE_CACHE_VERSION = 1
+DEFAULT_TEMPLATE_CACHE_SIZE = 4096
+
+HEADER = struct.Struct("<4sHH16sI")
+INDEX_ENTRY = struct.Struct("<QII")
+
+
+def fingerprint(sql: str) -> str:
+    """
+    Stable fingerprint of SQL query shape
+    :param sql: SQL-string, normalized by normalize() to ignore number of values in lists
+    :return: Hex string
+    """
+    return hashlib.blake2b(sql.encode(), digest_size=8).hexdigest()
+
+
+def template_key(sql: str) -> int:
+    """
+    Key of the raw SQL-string in the cache file
+    :param sql: SQL-string
+    :return: Unsigned 64-bit integer
+    """
+    return int.from_bytes(hashlib.blake2b(sql.encode(), digest_size=8).digest(), "little")
+
+
+class Template(NamedTuple):
+    """
+    Compiled shape of the rendered query
+        sql - Normalized SQL-string, lists of placeholders in IN (...) are collapsed to a single array parameter
+        fingerprint - Fingerprint of normalized SQL-string
+        layout - Number of rendered parameters per normalized parameter, 0 for parameter passed as is
+    """
+
+    sql: str
+    fingerprint: str
+    layout: tuple[int, ...]
+
+    @property
+    def collapsed(self) -> bool:
+        """
+        Template collapses some parameters to arrays
+        :return: Bool
+        """
+        return any(self.layout)
+
+    def apply(self, params: Sequence[Any]) -> tuple[Any, ...]:
+        """
+        Build parameters of normalized query from rendered parameters
+        :param params: Parameters of rendered query
+        :return: Parameters of normalized query
+        """
+        if not self.collapsed:
+            return tuple(params)
+
+        result: list[Any] = []
+        position = 0
+        for size in self.layout:
+            if size:
+                result.append(list(params[position:position + size]))
+                position += size
+            else:
+                result.append(params[position])
+                position += 1
+        return tuple(result)
+
+
+def compile_template(sql: str) -> Template:
+    """
+    Compile rendered SQL-string to the template
+        table.field IN (%s, %s, %s) -> table.field = ANY(%s)
+        table.field NOT IN (%s, %s) -> table.field <> ALL(%s)
+    :param sql: Rendered SQL-string
+    :return: Template
+    """
+    if " IN (%s" not in sql:
+        return Template(sql, fingerprint(sql), (0,) * sql.count(PLACEHOLDER))
+
+    parts: list[str] = []
+    layout: list[int] = []
+    position = 0
+    for match in IN_LIST_PATTERN.finditer(sql):
+        before = sql[position:match.start()]
+        layout.extend([0] * before.count(PLACEHOLDER))
+        layout.append(match.group(2).count(PLACEHOLDER))
+        parts.append(before)
+        parts.append("<> ALL(%s)" if match.group(1) else "= ANY(%s)")
+        position = match.end()
+
+    parts.append(sql[position:])
+    layout.extend([0] * sql[position:].count(PLACEHOLDER))
+    normalized = "".join(parts)
+    return Template(normalized, fingerprint(normalized), tuple(layout))
+
+
+def schema_hash(tables: Iterable[Any]) -> bytes:
+    """
+    Hash of table model schemas, cache file of other schemas is ignored
+    Schema covers fields with their types, relations, indexes and options affecting rendered SQL
+    :param tables: Table model classes
+    :return: 16 bytes digest
+    """
+    schema = sorted(
+        (
+            table.config.tablename,
+            table.config.pk,
+            [(name, repr(field.annotation)) for name, field in table.model_fields.items()],
+            sorted(
+                (name, relation.field, relation.remote, relation.many)
+                for name, relation in table.config.relations.items()
+            ),
+            table.config.shard_key,
+            table.config.index_ddl(),
+            table.config.collation,
+            table.config.rewrite_like,
+        )
+        for table in tables
+    )
+    return hashlib.blake2b(json.dumps([TEMPLATE_CACHE_VERSION, schema]).encode(), digest_size=16).digest()
+
+
+class TemplateCache:
+    """
+    LRU cache of compiled templates by rendered SQL-string
+    Templates can be dumped to the versioned file and loaded by other worker processes. Loaded file is
+    memory-mapped and templates are decoded on the first lookup, so loading does not depend on the file size.
+    File is ignored when its version or schema hash of table models differs.
+    Cache is shared by threads, every operation holds the lock of the cache.
+    File layout (little-endian):
+        header - magic, version, reserved, schema hash (16 bytes), number of templates
+        index - (key of raw SQL, offset, length) sorted by key
+        data - JSON arrays [raw SQL, normalized SQL, fingerprint, layout]
+    """
+
+    def __init__(self, max_size: int = DEFAULT_TEMPLATE_CACHE_SIZE) -> None:
+        """
+        Initialize cache
+        :param max_size: Maximum number of templates kept in memory
+        """
+        self.max_size: int = max_size
+        self.__templates: OrderedDict[str, Template] = OrderedDict()
+        self.__lock: threading.RLock = threading.RLock()
+        self.__mapped: mmap.mmap | None = None
+        self.__count: int = 0
+
+    def __len__(self) -> int:
+        """
+        Number of templates in memory
+        :return: Int
+        """
+        return len(self.__templates)
+
+    def compile(self, sql: str) -> Template:
+        """
+        Get template of the rendered SQL-string from memory, loaded file or compile it
+        :param sql: Rendered SQL-string
+        :return: Template
+        """
+        with self.__lock:
+            template = self.__templates.get(sql)
+            if template is not None:
+                self.__templates.move_to_end(sql)
+                return template
+
+            template = self.__lookup(sql) or compile_template(sql)
+            self.__templates[sql] = template
+            if len(self.__templates) > self.max_size:
+                self.__templates.popitem(last=False)
+            return template
+
+    def clear(self) -> None:
+        """
+        Remove templates from memory and unmap loaded file
+        :return: None
+        """
+        with self.__lock:
+            self.__templates.clear()
+            if self.__mapped is not None:
+                self.__mapped.close()
+            self.__mapped, self.__count = None, 0
+
+    def dump(self, path: str | Path, tables: Iterable[Any]) -> None:
+        """
+        Write templates in memory to the file, file is replaced atomically
+        :param path: Path to the cache file
+        :param tables: Table model classes of the schema
+        :return: None
+        """
+        with self.__lock:
+            templates = list(self.__templates.items())
+        entries = sorted(
+            (template_key(sql), json.dumps([sql, *template[:2], template.layout]).encode())
+            for sql, template in templates
+        )
+        offset = HEADER.size + INDEX_ENTRY.size * len(entries)
+        index, data = bytearray(), bytearray()
+        for key, payload in entries:
+            index += INDEX_ENTRY.pack(key, offset + len(data), len(payload))
+            data += payload
+
+        header = HEADER.pack(TEMPLATE_CACHE_MAGIC, TEMPLATE_CACHE_VERSION, 0, schema_hash(tables), len(entries))
+        temporary = Path(f"{path}.{os.getpid()}.tmp")
+        temporary.write_bytes(header + index + data)
+        os.replace(temporary, path)
+
+    def load(self, path: str | Path, tables: Iterable[Any]) -> bool:
+        """
+        Memory-map templates file
+        :param path: Path to the cache file
+        :param tables: Table model classes of the schema
+        :return: True if file is loaded, False if it is missing, outdated or built for other schema
+        """
+        try:
+            with open(path, "rb") as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        if len(mapped) < HEADER.size:
+            mapped.close()
+            return False
+
+        magic, version, _, digest, count = HEADER.unpack_from(mapped)
+        if (magic, version, digest) != (TEMPLATE_CACHE_MAGIC, TEMPLATE_CACHE_VERSION, schema_hash(tables)):
+            mapped.close()
+            return False
+
+        with self.__lock:
+            self.clear()
+            self.__mapped, self.__count = mapped, count
+        return True
+
+    def __lookup(self, sql: str) -> Template | None:
+        """
+        Find template in the loaded file by binary search over the index
+        :param sql: Rendered SQL-string
+        :return: Template or None
+        """
+        if self.__mapped is None:
+            return None
+
+        key = template_key(sql)
+        low, high = 0, self.__count
+        while low < high:
+            middle = (low + high) // 2
+            current, offset, length = INDEX_ENTRY.unpack_from(self.__mapped, HEADER.size + middle * INDEX_ENTRY.size)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                raw, normalized, digest, layout = json.loads(self.__mapped[offset:offset + length])
+                return Template(normalized, digest, tuple(layout)) if raw == sql else None
+        return None
+
+
+TEMPLATES = TemplateCache()
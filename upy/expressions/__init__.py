@@ -1,4 +1,5 @@
 """Init"""
 from upy.expressions.expression import Expression
+from upy.expressions.subquery import Selectable, Subquery
 
-__all__ = ["Expression"]
+__all__ = ["Expression", "Selectable", "Subquery"]
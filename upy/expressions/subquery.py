@@ -0,0 +1,51 @@
+"""Subquery"""
+from abc import ABC, abstractmethod
+from typing import Any
+
+from upy.exceptions import InvalidSubquery
+from upy.expressions.expression import Expression
+
+
+class Selectable(ABC):  # pylint: disable=too-few-public-methods
+    """
+    Interface for objects, that can be rendered as SELECT query (for example QueryBuilder)
+    Selectable objects can be used as operands of field comparison and in exists()
+    """
+
+    @abstractmethod
+    def build_select(self, *args: Any) -> Any:
+        """
+        Build SQL SELECT query
+        :param args: Filter arguments
+        :return: Query object with sql and params
+        """
+
+    def selected_columns(self) -> int | None:
+        """
+        Number of columns of SELECT query
+        :return: Int or None, if it is unknown
+        """
+        return None
+
+
+class Subquery(Expression):
+    """
+    SELECT query used as part of other query. Example:
+        Subquery(Other.objects.filter(Other.flag == True).select(Other.table_id)) -> "(SELECT other.table_id ...)"
+    Query is rendered on initialization, parameters keep their order
+    """
+
+    def __init__(self, selectable: Selectable, single_column: bool = False):
+        """
+        Initialize subquery
+        :param selectable: Select-shaped object, for example QueryBuilder
+        :param single_column: Require exactly one selected column, as IN and scalar comparisons do
+        """
+        columns = selectable.selected_columns()
+        if single_column and columns is not None and columns != 1:
+            raise InvalidSubquery(
+                f"Subquery compared with field must select exactly one column, {columns} columns are selected. "
+                "Use select() to choose the column"
+            )
+        query = selectable.build_select()
+        super().__init__(f"({query.sql})", *query.params)
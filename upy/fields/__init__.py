@@ -1,4 +1,4 @@
 """Init"""
-from upy.fields.field import TableField
+from upy.fields.field import Aggregate, Ordering, TableField
 
-__all__ = ["TableField"]
+__all__ = ["Aggregate", "Ordering", "TableField"]
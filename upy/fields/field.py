@@ -1,9 +1,10 @@
 """Table field"""
 from typing import Any
 
-from upy.conditions.condition import Condition
+from upy.conditions.condition import Condition, Predicate
+from upy.conditions.utils import LIKE_ESCAPE, like_prefix, prefix_upper_bound
 from upy.exceptions import InvalidOperatorComparison
-from upy.expressions import Expression
+from upy.expressions import Expression, Selectable, Subquery
 
 
 class TableField:
@@ -12,15 +13,17 @@ class TableField:
     Used only for query building and does not affect to validation and result model building
     """
 
-    def __init__(self, name: str, prefix: str):
+    def __init__(self, name: str, prefix: str, rewrite_like: bool = False):
         """
         Initialize table field
         :param name: String field name
         :param prefix: String field prefix. Used to restrict access to fields when querying with multiple tables
+        :param rewrite_like: Rewrite literal LIKE and ILIKE patterns by default, see like()
         """
         self.name: str = name
         self.prefix: str = prefix
         self.alias: str = f"{prefix}.{name}"
+        self.rewrite_like: bool = rewrite_like
 
     @classmethod
     def from_alias(cls, field: str) -> "TableField":
@@ -40,53 +43,137 @@ class TableField:
 
         raise RuntimeError("Invalid alias")
 
-    def __eq__(self, other: Any) -> Condition:  # type: ignore[override]
+    def excluded(self) -> "TableField":
+        """
+        Reference to the value proposed for insertion in INSERT ... ON CONFLICT DO UPDATE
+        :return: TableField object with EXCLUDED prefix
+        """
+        return TableField(name=self.name, prefix="EXCLUDED")
+
+    def asc(self) -> "Ordering":
+        """
+        Ascending ordering by field for ORDER BY clause
+        :return: Ordering object
+        """
+        return Ordering(self)
+
+    def desc(self) -> "Ordering":
+        """
+        Descending ordering by field for ORDER BY clause
+        :return: Ordering object
+        """
+        return Ordering(self, descending=True)
+
+    def count(self) -> "Aggregate":
+        """
+        Number of non-NULL values
+        :return: Aggregate expression
+        """
+        return Aggregate("count", self)
+
+    def count_distinct(self) -> "Aggregate":
+        """
+        Number of distinct non-NULL values
+        :return: Aggregate expression
+        """
+        return Aggregate("count", self, distinct=True)
+
+    def sum(self) -> "Aggregate":
+        """
+        Sum of values
+        :return: Aggregate expression
+        """
+        return Aggregate("sum", self)
+
+    def min(self) -> "Aggregate":
+        """
+        Minimal value
+        :return: Aggregate expression
+        """
+        return Aggregate("min", self)
+
+    def max(self) -> "Aggregate":
+        """
+        Maximal value
+        :return: Aggregate expression
+        """
+        return Aggregate("max", self)
+
+    def avg(self) -> "Aggregate":
+        """
+        Average value
+        :return: Aggregate expression
+        """
+        return Aggregate("avg", self)
+
+    def __hash__(self) -> int:
+        """
+        Hash of the field, so fields can be used as mapping keys
+        :return: Hash of field alias
+        """
+        return hash(self.alias)
+
+    def __eq__(self, other: Any) -> Condition:  # type: ignore[override] # pylint: disable=too-many-return-statements
         """
         Resolve EQUAL (==) operator for fields comparison
         :param other: Instance for comparison
         :return: Condition
         """
         if other is None:
-            return Condition(f"{self.alias} IS NULL")
+            return Condition(f"{self.alias} IS NULL", predicate=Predicate(self.alias, "IS NULL"))
+
+        if isinstance(other, Selectable):
+            subquery = Subquery(other, single_column=True)
+            return Condition(f"{self.alias} IN {subquery.sql}", subquery.params, predicate=Predicate(self.alias, "IN"))
 
         if isinstance(other, TableField):
-            return Condition(f"{self.alias} = {other.alias}")
+            return Condition(f"{self.alias} = {other.alias}", predicate=Predicate(self.alias, "="))
 
         if isinstance(other, Expression):
-            return Condition(f"{self.alias} = {other.sql}", other.params)
+            return Condition(f"{self.alias} = {other.sql}", other.params, predicate=Predicate(self.alias, "="))
 
         if isinstance(other, list | tuple | set):
             if len(other) == 0:  # TODO: Maybe not needed?
-                return Condition("FALSE")
+                return Condition("FALSE", predicate=Predicate(self.alias, "IN", ()))
 
             sql = ", ".join(["%s" for _ in range(len(other))])
-            return Condition(f"{self.alias} IN ({sql})", list(other))
+            return Condition(
+                f"{self.alias} IN ({sql})", list(other), predicate=Predicate(self.alias, "IN", tuple(other))
+            )
 
-        return Condition(f"{self.alias} = %s", [other])
+        return Condition(f"{self.alias} = %s", [other], predicate=Predicate(self.alias, "=", (other,)))
 
-    def __ne__(self, other: Any) -> Condition:  # type: ignore[override]
+    def __ne__(self, other: Any) -> Condition:  # type: ignore[override] # pylint: disable=too-many-return-statements
         """
         Resolve NOT_EQUAL (!=) operator for fields comparison
         :param other: Instance for comparison
         :return: Condition
         """
         if other is None:
-            return Condition(f"{self.alias} IS NOT NULL")
+            return Condition(f"{self.alias} IS NOT NULL", predicate=Predicate(self.alias, "IS NOT NULL"))
+
+        if isinstance(other, Selectable):
+            subquery = Subquery(other, single_column=True)
+            return Condition(
+                f"{self.alias} NOT IN {subquery.sql}", subquery.params, predicate=Predicate(self.alias, "NOT IN")
+            )
 
         if isinstance(other, TableField):
-            return Condition(f"{self.alias} <> {other.alias}")
+            return Condition(f"{self.alias} <> {other.alias}", predicate=Predicate(self.alias, "<>"))
 
         if isinstance(other, Expression):
-            return Condition(f"{self.alias} <> {other.sql}", other.params)
+            return Condition(f"{self.alias} <> {other.sql}", other.params, predicate=Predicate(self.alias, "<>"))
 
         if isinstance(other, list | tuple | set):
             if len(other) < 1:  # TODO: Maybe not needed?
                 return Condition("TRUE")
 
             sql = ", ".join(["%s" for _ in range(len(other))])
-            return Condition(f"{self.alias} NOT IN ({sql})", list(other))
+            return Condition(
+                f"{self.alias} NOT IN ({sql})", list(other), predicate=Predicate(self.alias, "NOT IN", tuple(other))
+            )
 
-        return Condition(f"{self.alias} <> %s", [other])
+        return Condition(f"{self.alias} <> %s", [other], predicate=Predicate(self.alias, "<>", (other,)))
 
     def __gt__(self, other: Any) -> Condition:
         """
@@ -97,17 +184,20 @@ class TableField:
         if other is None:
             raise InvalidOperatorComparison("Can not use '>' operator with None")
 
+        if isinstance(other, Selectable):
+            other = Subquery(other, single_column=True)
+
         if isinstance(other, list | tuple | set):
             raise InvalidOperatorComparison("Can not use '>' operator with list, tuple or set object")
 
         # TODO: String objects validation
         if isinstance(other, TableField):
-            return Condition(f"{self.alias} > {other.alias}")
+            return Condition(f"{self.alias} > {other.alias}", predicate=Predicate(self.alias, ">"))
 
         if isinstance(other, Expression):
-            return Condition(f"{self.alias} > {other.sql}", other.params)
+            return Condition(f"{self.alias} > {other.sql}", other.params, predicate=Predicate(self.alias, ">"))
 
-        return Condition(f"{self.alias} > %s", [other])
+        return Condition(f"{self.alias} > %s", [other], predicate=Predicate(self.alias, ">", (other,)))
 
     def __lt__(self, other: Any) -> Condition:
         """
@@ -118,17 +208,20 @@ class TableField:
         if other is None:
             raise InvalidOperatorComparison("Can not use '<' operator with None")
 
+        if isinstance(other, Selectable):
+            other = Subquery(other, single_column=True)
+
         if isinstance(other, list | tuple | set):
             raise InvalidOperatorComparison("Can not use '<' operator with list, tuple or set object")
 
         # TODO: String objects validation
         if isinstance(other, TableField):
-            return Condition(f"{self.alias} < {other.alias}")
+            return Condition(f"{self.alias} < {other.alias}", predicate=Predicate(self.alias, "<"))
 
         if isinstance(other, Expression):
-            return Condition(f"{self.alias} < {other.sql}", other.params)
+            return Condition(f"{self.alias} < {other.sql}", other.params, predicate=Predicate(self.alias, "<"))
 
-        return Condition(f"{self.alias} < %s", [other])
+        return Condition(f"{self.alias} < %s", [other], predicate=Predicate(self.alias, "<", (other,)))
 
     def __ge__(self, other: Any) -> Condition:
         """
@@ -139,17 +232,20 @@ class TableField:
         if other is None:
             raise InvalidOperatorComparison("Can not use '>=' operator with None")
 
+        if isinstance(other, Selectable):
+            other = Subquery(other, single_column=True)
+
         if isinstance(other, list | tuple | set):
             raise InvalidOperatorComparison("Can not use '>=' operator with list, tuple or set object")
 
         # TODO: String objects validation
         if isinstance(other, TableField):
-            return Condition(f"{self.alias} >= {other.alias}")
+            return Condition(f"{self.alias} >= {other.alias}", predicate=Predicate(self.alias, ">="))
 
         if isinstance(other, Expression):
-            return Condition(f"{self.alias} >= {other.sql}", other.params)
+            return Condition(f"{self.alias} >= {other.sql}", other.params, predicate=Predicate(self.alias, ">="))
 
-        return Condition(f"{self.alias} >= %s", [other])
+        return Condition(f"{self.alias} >= %s", [other], predicate=Predicate(self.alias, ">=", (other,)))
 
     def __le__(self, other: Any) -> Condition:
         """
@@ -160,35 +256,201 @@ class TableField:
         if other is None:
             raise InvalidOperatorComparison("Can not use '<=' operator with None")
 
+        if isinstance(other, Selectable):
+            other = Subquery(other, single_column=True)
+
         if isinstance(other, list | tuple | set):
             raise InvalidOperatorComparison("Can not use '<=' operator with list, tuple or set object")
 
         # TODO: String objects validation
         if isinstance(other, TableField):
-            return Condition(f"{self.alias} <= {other.alias}")
+            return Condition(f"{self.alias} <= {other.alias}", predicate=Predicate(self.alias, "<="))
 
         if isinstance(other, Expression):
-            return Condition(f"{self.alias} <= {other.sql}", other.params)
+            return Condition(f"{self.alias} <= {other.sql}", other.params, predicate=Predicate(self.alias, "<="))
 
-        return Condition(f"{self.alias} <= %s", [other])
+        return Condition(f"{self.alias} <= %s", [other], predicate=Predicate(self.alias, "<=", (other,)))
 
     def __mod__(self, other: Any) -> Condition:
         """
         Resolve MOD (%) operator for fields comparison
-        Override initial logic to SQL-LIKE operator
+        Override initial logic to SQL-LIKE operator, see like()
         :param other: Instance for comparison
         :return: Condition
         """
+        return self.like(other)
+
+    def like(self, other: Any, escape: str | None = None, rewrite: bool | None = None) -> Condition:
+        """
+        Resolve SQL-LIKE operator
+        Rewriting of literal pattern (enabled by table config rewrite_like or rewrite argument) produces predicates,
+        which can use B-tree index of the field:
+            table.name LIKE 'abc' -> table.name = 'abc'
+            table.name LIKE 'abc%' -> (table.name >= 'abc' AND table.name < 'abd' AND table.name LIKE 'abc%')
+        Prefix range is valid only for C or POSIX collation of the field, in linguistic collations it can skip
+        matching rows. Pattern is kept as recheck of the range
+        :param other: Pattern, field or expression
+        :param escape: Escape character of the pattern, empty string disables escaping. Default is backslash
+        :param rewrite: Rewrite literal pattern, table config rewrite_like is used if not provided.
+            Pass True only for fields compared in C or POSIX collation
+        :return: Condition
+        """
+        return self.__pattern("LIKE", other, escape, rewrite)
+
+    def ilike(self, other: Any, escape: str | None = None, rewrite: bool | None = None) -> Condition:
+        """
+        Resolve SQL-ILIKE (case-insensitive LIKE) operator
+        Rewritten predicates can use expression index on lower(field), pattern is rewritten only when
+        its literal prefix is ASCII. Rewriting requires C or POSIX collation, as like() does:
+            table.name ILIKE 'Abc' -> lower(table.name) = 'abc'
+            table.name ILIKE 'Abc%' -> (lower(table.name) >= 'abc' AND lower(table.name) < 'abd' AND ...)
+        :param other: Pattern, field or expression
+        :param escape: Escape character of the pattern, empty string disables escaping. Default is backslash
+        :param rewrite: Rewrite literal pattern, table config rewrite_like is used if not provided.
+            Pass True only for fields compared in C or POSIX collation
+        :return: Condition
+        """
+        return self.__pattern("ILIKE", other, escape, rewrite)
+
+    def __pattern(self, operator: str, other: Any, escape: str | None, rewrite: bool | None) -> Condition:
+        """
+        Resolve pattern matching operator
+        :param operator: LIKE or ILIKE
+        :param other: Pattern, field or expression
+        :param escape: Escape character of the pattern
+        :param rewrite: Rewrite literal pattern
+        :return: Condition
+        """
         if other is None:
-            raise InvalidOperatorComparison("Can not use '%' (LIKE) operator with None")
+            raise InvalidOperatorComparison(f"Can not use '{operator}' operator with None")
+
+        if isinstance(other, Selectable):
+            other = Subquery(other, single_column=True)
 
         if isinstance(other, list | tuple | set):
-            raise InvalidOperatorComparison("Can not use '%' (LIKE) operator with list, tuple or set object")
+            raise InvalidOperatorComparison(f"Can not use '{operator}' operator with list, tuple or set object")
 
+        escape_sql, escape_params = ("", []) if escape is None else (" ESCAPE %s", [escape])
         if isinstance(other, TableField):
-            return Condition(f"{self.alias} LIKE {other.alias}")
+            return Condition(
+                f"{self.alias} {operator} {other.alias}{escape_sql}",
+                escape_params,
+                predicate=Predicate(self.alias, operator),
+            )
 
         if isinstance(other, Expression):
-            return Condition(f"{self.alias} LIKE {other.sql}", other.params)
+            return Condition(
+                f"{self.alias} {operator} {other.sql}{escape_sql}",
+                [*other.params, *escape_params],
+                predicate=Predicate(self.alias, operator),
+            )
+
+        condition = Condition(
+            f"{self.alias} {operator} %s{escape_sql}",
+            [other, *escape_params],
+            predicate=Predicate(self.alias, operator, (other,)),
+        )
+        if not (self.rewrite_like if rewrite is None else rewrite) or not isinstance(other, str):
+            return condition
+        return self.__rewrite_pattern(condition, operator, other, LIKE_ESCAPE if escape is None else escape)
+
+    def __rewrite_pattern(self, condition: Condition, operator: str, pattern: str, escape: str) -> Condition:
+        """
+        Rewrite literal pattern to equality or range of its prefix
+        :param condition: Condition with pattern matching operator
+        :param operator: LIKE or ILIKE
+        :param pattern: Literal pattern
+        :param escape: Escape character of the pattern
+        :return: Rewritten condition or initial condition, if pattern has no literal prefix
+        """
+        split = like_prefix(pattern, escape)
+        if split is None or not split[0]:
+            return condition
+
+        field, (prefix, exact) = self.alias, split
+        if operator == "ILIKE":
+            if not prefix.isascii():
+                return condition
+            field, prefix = f"lower({self.alias})", prefix.lower()
+
+        if exact:
+            return Condition(f"{field} = %s", [prefix], predicate=Predicate(field, "=", (prefix,)))
+
+        upper = prefix_upper_bound(prefix)
+        if upper is None:
+            return condition
+        return Condition(
+            f"({field} >= %s AND {field} < %s AND {condition.sql})",
+            [prefix, upper, *condition.params],
+            predicate=Predicate(field, ">=", (prefix,)),
+        )
+
+
+class Aggregate(TableField):
+    """
+    Aggregate function over table field. Example:
+        Table.id.count() -> count(table.id)
+    Supports the same comparison operators as TableField, so it can be used in HAVING conditions:
+        Table.id.count() > 5 -> Condition("count(table.id) > %s", [5])
+    """
+
+    def __init__(self, function: str, field: TableField, distinct: bool = False):
+        """
+        Initialize aggregate
+        :param function: SQL aggregate function name
+        :param field: Aggregated field
+        :param distinct: Aggregate only distinct values
+        """
+        super().__init__(name=field.name, prefix=field.prefix)
+        self.function: str = function
+        self.field: TableField = field
+        self.distinct: bool = distinct
+        self.alias = f"{function}({'DISTINCT ' if distinct else ''}{field.alias})"
+
+    @property
+    def sql(self) -> str:
+        """
+        SQL-string of aggregate expression
+        :return: SQL-string object
+        """
+        return self.alias
+
+    @property
+    def params(self) -> list[Any]:
+        """
+        Execution parameters, related to the aggregate expression
+        :return: List of parameters
+        """
+        return []
+
+
+class Ordering:
+    """
+    Ordering by table field for ORDER BY clause. Example:
+        Table.id.desc() -> "table.id DESC"
+    """
 
-        return Condition(f"{self.alias} LIKE %s", [other])
+    def __init__(self, field: TableField, descending: bool = False):
+        """
+        Initialize ordering
+        :param field: Ordered field
+        :param descending: Descending order
+        """
+        self.field: TableField = field
+        self.descending: bool = descending
+
+    @property
+    def sql(self) -> str:
+        """
+        SQL-string of ordering
+        :return: SQL-string object
+        """
+        return f"{self.field.alias} DESC" if self.descending else f"{self.field.alias} ASC"
+
+    @property
+    def params(self) -> list[Any]:
+        """
+        Execution parameters, related to the ordering
+        :return: List of parameters
+        """
+        return []
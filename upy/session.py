@@ -0,0 +1,137 @@
+"""Session with identity map of table model instances"""
+from collections import OrderedDict
+from contextvars import ContextVar, Token
+from typing import Any
+
+DEFAULT_SESSION_SIZE = 10000
+
+_current_session: ContextVar["Session | None"] = ContextVar("upy_session", default=None)
+
+
+def current_session() -> "Session | None":
+    """
+    Session activated in the current context
+    :return: Session object or None
+    """
+    return _current_session.get()
+
+
+class Session:
+    """
+    Unit of work scope with identity map of hydrated table model instances, keyed by (table, pk). Example:
+        with Session():
+            first = await Table.objects.fetch(executor, Table.id == 1)
+            second = await Table.objects.fetch(executor, Table.id == 1)  # no query, the same instance
+    Rows fetched by any query inside the session are deduplicated into the map: already known instance is
+    refreshed with fetched values (except its unsaved changes) and returned instead of the new one.
+    Size of the map is bounded, least recently used instances are evicted.
+    Tables without pk in config are not tracked.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_SESSION_SIZE) -> None:
+        """
+        Initialize session
+        :param max_size: Maximum number of instances in identity map
+        """
+        self.max_size: int = max_size
+        self.__identities: OrderedDict[tuple[Any, Any], Any] = OrderedDict()
+        self.__tokens: list[Token["Session | None"]] = []
+
+    def __enter__(self) -> "Session":
+        """
+        Activate session in the current context
+        :return: Session object
+        """
+        self.__tokens.append(_current_session.set(self))
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """
+        Restore previous session of the current context
+        :param args: Exception info
+        :return: None
+        """
+        _current_session.reset(self.__tokens.pop())
+
+    def __len__(self) -> int:
+        """
+        Number of instances in identity map
+        :return: Int
+        """
+        return len(self.__identities)
+
+    def __contains__(self, instance: Any) -> bool:
+        """
+        Check that instance is in identity map
+        :param instance: Table model instance
+        :return: Bool
+        """
+        key = self.__identity(instance)
+        return key is not None and self.__identities.get(key) is instance
+
+    def get(self, table: Any, pk: Any) -> Any:
+        """
+        Get instance from identity map
+        :param table: Table model class
+        :param pk: Primary key value
+        :return: Table model instance or None
+        """
+        key = (table, pk)
+        instance = self.__identities.get(key)
+        if instance is not None:
+            self.__identities.move_to_end(key)
+        return instance
+
+    def add(self, instance: Any) -> Any:
+        """
+        Put instance to identity map
+        :param instance: Table model instance
+        :return: Instance from identity map, refreshed with values of provided instance
+        """
+        key = self.__identity(instance)
+        if key is None:
+            return instance
+
+        known = self.__identities.get(key)
+        if known is None:
+            self.__identities[key] = instance
+            if len(self.__identities) > self.max_size:
+                self.__identities.popitem(last=False)
+            return instance
+
+        self.__identities.move_to_end(key)
+        if known is not instance:
+            dirty = known.dirty_fields
+            known.__dict__.update({name: value for name, value in instance.__dict__.items() if name not in dirty})
+            known._related.update(instance._related)  # pylint: disable=protected-access
+        return known
+
+    def expunge(self, instance: Any) -> None:
+        """
+        Remove instance from identity map
+        :param instance: Table model instance
+        :return: None
+        """
+        key = self.__identity(instance)
+        if key is not None and self.__identities.get(key) is instance:
+            del self.__identities[key]
+
+    def clear(self) -> None:
+        """
+        Remove all instances from identity map
+        :return: None
+        """
+        self.__identities.clear()
+
+    @staticmethod
+    def __identity(instance: Any) -> tuple[Any, Any] | None:
+        """
+        Identity map key of the instance
+        :param instance: Table model instance
+        :return: Table class and primary key value or None, if table has no pk
+        """
+        table = type(instance)
+        pk = table.config.pk
+        if not pk:
+            return None
+        return table, getattr(instance, pk)
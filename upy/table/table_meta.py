@@ -6,7 +6,7 @@ from pydantic._internal._model_construction import ModelMetaclass
 
 from upy.core.abstract_builder import AbstractQueryBuilder
 from upy.core.table_model import BaseTableModel
-from upy.exceptions import TableConfigRequired
+from upy.exceptions import TableConfigRequired, UnsupportedCollation
 from upy.fields.field import TableField
 
 
@@ -32,12 +32,20 @@ class TableMetaclass(ModelMetaclass):
         if bases[0] != BaseTableModel:
             if not hasattr(new_model, "config"):
                 raise TableConfigRequired()
+            if new_model.config.rewrite_like and not new_model.config.binary_collation:
+                raise UnsupportedCollation(
+                    f"LIKE rewriting of table '{new_model.config.tablename}' requires C or POSIX collation"
+                )
 
             for field_name, _ in new_model.model_fields.items():
                 setattr(
                     new_model,
                     field_name,
-                    TableField(name=field_name, prefix=new_model.config.tablename),
+                    TableField(
+                        name=field_name,
+                        prefix=new_model.config.tablename,
+                        rewrite_like=new_model.config.rewrite_like,
+                    ),
                 )
 
         return new_model
@@ -1,5 +1,6 @@
 """Common utils"""
-from typing import Any
+import copy
+from typing import Any, Iterable, Sequence
 
 from pydantic import BaseModel
 
@@ -20,15 +21,182 @@ def quote(value: str) -> str:
     return f"`{value.replace('`', '``')}`"
 
 
-class Query(BaseModel):
+def render_literal(value: Any) -> str:
     """
-    Part of SQL code representation
+    Render value as SQL literal, used where execution parameters are not allowed (DDL)
+    :param value: None, bool, number or string value
+    :return: SQL-string
+    """
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class QueryModel(BaseModel):
+    """
+    Part of SQL code representation as pydantic model
+    Used for validation and serialization, see Query.to_model()
     """
 
     sql: str
     params: list[Any]
 
 
+class BatchQueryModel(BaseModel):
+    """
+    SQL code with a matrix of parameters as pydantic model
+    """
+
+    sql: str
+    params: list[Sequence[Any]]
+
+
+class QueryParams(tuple):
+    """
+    Immutable execution parameters of the query
+    Equal to list or tuple with the same items, so parameters can be compared with lists
+    """
+
+    __slots__ = ()
+
+    def __eq__(self, other: Any) -> bool:
+        """
+        Compare parameters with tuple or list
+        :param other: Instance for comparison
+        :return: Bool
+        """
+        if isinstance(other, list):
+            return tuple.__eq__(self, tuple(other))
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other: Any) -> bool:
+        """
+        Compare parameters with tuple or list
+        :param other: Instance for comparison
+        :return: Bool
+        """
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = tuple.__hash__
+
+
+class Query:
+    """
+    Part of SQL code representation
+    Lightweight immutable object for the query building hot path: no validation, parameters are stored as
+    QueryParams tuple, which is equal to the list with the same items
+    """
+
+    __slots__ = ("sql", "params", "readonly")
+
+    sql: str
+    params: tuple[Any, ...]
+    readonly: bool
+
+    def __init__(self, sql: str, params: Iterable[Any] = (), readonly: bool = False) -> None:
+        """
+        Initialize query
+        :param sql: SQL-string
+        :param params: Execution parameters
+        :param readonly: Query does not modify data (SELECT), so it can be executed on read replicas
+        """
+        object.__setattr__(self, "sql", sql)
+        object.__setattr__(self, "params", QueryParams(params))
+        object.__setattr__(self, "readonly", readonly)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """
+        Restrict attribute modification
+        :param name: Attribute name
+        :param value: Attribute value
+        :return: None
+        """
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        """
+        Restrict attribute deletion
+        :param name: Attribute name
+        :return: None
+        """
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other: Any) -> bool:
+        """
+        Compare queries by SQL and parameters
+        :param other: Instance for comparison
+        :return: Bool
+        """
+        if not isinstance(other, Query):
+            return NotImplemented
+        return type(self) is type(other) and self.sql == other.sql and self.params == other.params
+
+    def __hash__(self) -> int:
+        """
+        Hash of the query. Raise TypeError when parameters are not hashable
+        :return: Hash
+        """
+        return hash((type(self), self.sql, self.params))
+
+    def __repr__(self) -> str:
+        """
+        Query representation
+        :return: String
+        """
+        return f"{type(self).__name__}(sql={self.sql!r}, params={self.params!r})"
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """
+        Support pickling of the immutable object
+        :return: Reduce tuple
+        """
+        return type(self), (self.sql, self.params, self.readonly)
+
+    def replace(self, sql: str | None = None, params: Iterable[Any] | None = None) -> "Query":
+        """
+        Copy query with replaced SQL-string or parameters, other attributes (like routing information) are kept
+        :param sql: New SQL-string
+        :param params: New execution parameters
+        :return: Query object of the same type
+        """
+        query = copy.copy(self)
+        if sql is not None:
+            object.__setattr__(query, "sql", sql)
+        if params is not None:
+            object.__setattr__(query, "params", QueryParams(params))
+        return query
+
+    def to_model(self) -> QueryModel:
+        """
+        Convert query to validated pydantic model
+        :return: QueryModel
+        """
+        return QueryModel(sql=self.sql, params=list(self.params))
+
+
+class BatchQuery(Query):  # pylint: disable=too-few-public-methods
+    """
+    SQL code with a matrix of parameters, one row per statement execution
+    Used with executemany or COPY
+    """
+
+    __slots__ = ()
+
+    params: tuple[Sequence[Any], ...]
+
+    def to_model(self) -> BatchQueryModel:  # type: ignore[override]
+        """
+        Convert batch query to validated pydantic model
+        :return: BatchQueryModel
+        """
+        return BatchQueryModel(sql=self.sql, params=list(self.params))
+
+
 def generate_condition_group_by_arguments(*args: FilterType, default: str | None = None) -> ConditionGroup:
     """
     Generate WHERE condition group by provided arguments
@@ -53,3 +221,108 @@ def generate_condition_group_by_arguments(*args: FilterType, default: str | None
         raise InvalidFilterArgument(f"Object of type '{type(arg)}' can not be used in filtering")
 
     return condition
+
+
+class ShardedQuery(Query):
+    """
+    Query of the sharded table with routing information
+        nodes - Names of database nodes, that can contain matched rows. None if all nodes should be queried
+        ordering - Result column names with descending flag, used to merge sorted results of multiple nodes
+        limit - Maximum number of rows in merged result
+        offset - Number of rows skipped in merged result
+        hidden - Result column names, selected only to merge results and removed from merged rows
+    """
+
+    __slots__ = ("nodes", "ordering", "limit", "offset", "hidden")
+
+    nodes: frozenset[str] | None
+    ordering: tuple[tuple[str, bool], ...]
+    limit: int | None
+    offset: int
+    hidden: tuple[str, ...]
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        sql: str,
+        params: Iterable[Any] = (),
+        readonly: bool = False,
+        *,
+        nodes: Iterable[str] | None = None,
+        ordering: Iterable[tuple[str, bool]] = (),
+        limit: int | None = None,
+        offset: int = 0,
+        hidden: Iterable[str] = (),
+    ) -> None:
+        """
+        Initialize sharded query
+        :param sql: SQL-string
+        :param params: Execution parameters
+        :param readonly: Query does not modify data
+        :param nodes: Names of database nodes
+        :param ordering: Result column names with descending flag
+        :param limit: Maximum number of rows in merged result
+        :param offset: Number of rows skipped in merged result
+        :param hidden: Result column names removed from merged rows
+        """
+        super().__init__(sql, params, readonly)
+        object.__setattr__(self, "nodes", None if nodes is None else frozenset(nodes))
+        object.__setattr__(self, "ordering", tuple(ordering))
+        object.__setattr__(self, "limit", limit)
+        object.__setattr__(self, "offset", offset)
+        object.__setattr__(self, "hidden", tuple(hidden))
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """
+        Support pickling of the immutable object
+        :return: Reduce tuple
+        """
+        return _restore_sharded_query, (
+            self.sql,
+            self.params,
+            self.readonly,
+            self.nodes,
+            self.ordering,
+            self.limit,
+            self.offset,
+            self.hidden,
+        )
+
+
+def _restore_sharded_query(  # pylint: disable=too-many-arguments
+    sql: str,
+    params: tuple[Any, ...],
+    readonly: bool,
+    nodes: frozenset[str] | None,
+    ordering: tuple[tuple[str, bool], ...],
+    limit: int | None,
+    offset: int,
+    hidden: tuple[str, ...] = (),
+) -> ShardedQuery:
+    """
+    Restore pickled sharded query
+    :param sql: SQL-string
+    :param params: Execution parameters
+    :param readonly: Query does not modify data
+    :param nodes: Names of database nodes
+    :param ordering: Result column names with descending flag
+    :param limit: Maximum number of rows in merged result
+    :param offset: Number of rows skipped in merged result
+    :param hidden: Result column names removed from merged rows
+    :return: ShardedQuery object
+    """
+    return ShardedQuery(
+        sql, params, readonly, nodes=nodes, ordering=ordering, limit=limit, offset=offset, hidden=hidden
+    )
+
+
+def columns_to_rows(*columns: Iterable[Any]) -> tuple[Sequence[Any], ...]:
+    """
+    Transpose columnar data to the matrix of rows
+    Array-like columns (for example numpy.ndarray) are converted by their own tolist() method,
+    so values become native python objects without element-wise iteration in python code
+    Matrix length is defined by the shortest column, so constant values can be provided as itertools.repeat
+    :param columns: Columns
+    :return: Tuple of rows
+    """
+    native = [column.tolist() if hasattr(column, "tolist") else column for column in columns]
+    return tuple(zip(*native))